@@ -0,0 +1,35 @@
+from typing import Dict, List, NamedTuple, Optional
+
+
+class Assignment(NamedTuple):
+    """Result of placing a paid player in a tournament"""
+    bracket_id: int
+    bracket: int  # bracket number within the tier (1, 2, ...)
+    slot: Optional[int]  # None when the player went to the overflow queue
+    duplicate: bool = False  # the payment had already been placed by an earlier call
+
+    @property
+    def queued(self) -> bool:
+        return self.slot is None
+
+
+class SlotAllocator:
+    """Free-slot allocator for one bracket with O(1) take
+
+    Free slots are kept on a stack (lowest slot number on top), so taking
+    one never scans the board. The allocator is only a fast in-process
+    view: the store still confirms every take with a compare-and-set and
+    rebuilds the allocator when it turns out stale.
+    """
+
+    __slots__ = ('bracket_id', 'number', 'capacity', 'free')
+
+    def __init__(self, bracket_id: int, number: int, capacity: int, board: Dict[int, Optional[int]]):
+        self.bracket_id = bracket_id
+        self.number = number
+        self.capacity = capacity
+        self.free: List[int] = [slot for slot in sorted(board, reverse=True) if board[slot] is None]
+
+    def take(self) -> Optional[int]:
+        """Pop the lowest free slot, or None if the bracket is full"""
+        return self.free.pop() if self.free else None
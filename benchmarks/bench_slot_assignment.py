@@ -0,0 +1,45 @@
+"""Slot assignment: seating a paid player through the matchmaker into the store
+
+Runs against a fresh database per benchmark. Brackets fill up and spill
+into new ones as the rounds go on, as they do in production.
+"""
+import os
+import itertools
+
+import pytest
+
+from conftest import BATCH_SIZE, DATA_DIR
+
+
+@pytest.fixture
+def matchmaker(request, gateway):
+    from store import SlotStore
+    from matchmaking import Matchmaker
+
+    store = SlotStore(os.path.join(DATA_DIR, f"{request.node.name}.db"))
+    store.ensure_tournaments(gateway.TOURNAMENTS)
+    return Matchmaker(store, gateway.TOURNAMENTS)
+
+
+@pytest.mark.benchmark(group='slot-assignment')
+def test_assign(benchmark, matchmaker, tiers):
+    users = itertools.count(800000000)
+
+    def assign():
+        user_id = next(users)
+        seats = matchmaker.submit(tiers[0], user_id, f"pay_{user_id}")
+        assert seats and seats[0].user_id == user_id
+
+    benchmark(assign)
+
+
+@pytest.mark.benchmark(group='slot-assignment')
+def test_assign_batch(benchmark, matchmaker, tiers):
+    users = itertools.count(900000000)
+
+    def assign_batch():
+        for n in range(BATCH_SIZE):
+            user_id = next(users)
+            matchmaker.submit(tiers[n % len(tiers)], user_id, f"pay_{user_id}")
+
+    benchmark(assign_batch)
@@ -0,0 +1,59 @@
+"""Gateway webhook hot path: signature check, parsing and user/tier extraction
+
+Each stage is measured on its own and as the full ingestion of one
+delivery, for a single event and for a batch of ``BATCH_SIZE``. Parsing
+and extraction are one step: ``parse_webhook`` decodes the body straight
+into a ``WebhookEvent`` that carries the user and requested tier, and the
+paid tier comes from the same amount lookup the gateway's workers use.
+"""
+import pytest
+
+from conftest import WEBHOOK_SECRET
+
+SECRET = WEBHOOK_SECRET.encode()
+
+
+def verify(gateway, body: bytes, signature: str) -> bytes:
+    assert gateway.verify_razorpay_signature(body, signature, SECRET)
+    return body
+
+
+def parse(gateway, body: bytes):
+    webhook = gateway.parse_webhook(body)
+    tournament_type = gateway.tournament_for_amount(webhook.amount)
+    return webhook, tournament_type
+
+
+def ingest(gateway, body: bytes, signature: str):
+    return parse(gateway, verify(gateway, body, signature))
+
+
+@pytest.mark.benchmark(group='signature')
+def test_signature(benchmark, gateway, webhook):
+    benchmark(verify, gateway, *webhook)
+
+
+@pytest.mark.benchmark(group='signature')
+def test_signature_batch(benchmark, gateway, webhook_batch):
+    benchmark(lambda: [verify(gateway, body, signature) for body, signature in webhook_batch])
+
+
+@pytest.mark.benchmark(group='parse')
+def test_parse(benchmark, gateway, webhook):
+    webhook, tournament_type = benchmark(parse, gateway, webhook[0])
+    assert webhook.user_id == webhook.authorized_user == 700000001 and tournament_type
+
+
+@pytest.mark.benchmark(group='parse')
+def test_parse_batch(benchmark, gateway, webhook_batch):
+    benchmark(lambda: [parse(gateway, body) for body, _ in webhook_batch])
+
+
+@pytest.mark.benchmark(group='ingest')
+def test_ingest(benchmark, gateway, webhook):
+    benchmark(ingest, gateway, *webhook)
+
+
+@pytest.mark.benchmark(group='ingest')
+def test_ingest_batch(benchmark, gateway, webhook_batch):
+    benchmark(lambda: [ingest(gateway, body, signature) for body, signature in webhook_batch])
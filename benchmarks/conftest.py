@@ -0,0 +1,86 @@
+"""Shared setup for the pytest-benchmark suite
+
+The gateway is imported against a throwaway database with tracing off and
+no Telegram token, so benchmarks never touch real services.
+"""
+import os
+import sys
+import hmac
+import json
+import hashlib
+import tempfile
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix='benchmarks-')
+WEBHOOK_SECRET = 'benchmark-webhook-secret'
+
+os.environ['DATABASE_PATH'] = os.path.join(DATA_DIR, 'gateway.db')
+os.environ['PAYMENT_GATEWAY_SECRET'] = WEBHOOK_SECRET
+os.environ['TRACE_FILE'] = ''
+os.environ.pop('TELEGRAM_TOKEN', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BATCH_SIZE = 100
+
+
+def paid_webhook(user_id: int, tier: int) -> bytes:
+    """A ``payment_link.paid`` delivery as the bot's payment links come back from Razorpay"""
+    link_id = f"plink_{user_id:014d}"
+    notes = {'user_id': str(user_id), 'tournament_type': str(tier), 'authorized_user': str(user_id)}
+    return json.dumps({
+        'entity': 'event',
+        'account_id': 'acc_BenchmarkAcct01',
+        'event': 'payment_link.paid',
+        'contains': ['payment_link', 'order', 'payment'],
+        'payload': {
+            'payment_link': {
+                'id': link_id, 'amount': tier * 100, 'amount_paid': tier * 100, 'currency': 'INR',
+                'status': 'paid', 'accept_partial': False, 'reference_id': '',
+                'description': f"eFootball Tournament ₹{tier} - User {user_id}",
+                'customer': {'name': f"User {user_id}", 'contact': '+919999999999',
+                             'email': f"user{user_id}@example.com"},
+                'notes': notes, 'short_url': f"https://rzp.io/l/{link_id}",
+            },
+            'order': {'entity': {'id': f"order_{user_id:014d}", 'amount': tier * 100, 'amount_paid': tier * 100,
+                                 'currency': 'INR', 'status': 'paid', 'attempts': 1, 'notes': notes}},
+            'payment': {'entity': {
+                'id': f"pay_{user_id:014d}", 'amount': tier * 100, 'currency': 'INR', 'status': 'captured',
+                'order_id': f"order_{user_id:014d}", 'method': 'upi', 'captured': True,
+                'description': f"eFootball Tournament ₹{tier} - User {user_id}",
+                'vpa': 'player@upi', 'email': f"user{user_id}@example.com", 'contact': '+919999999999',
+                'notes': notes, 'fee': tier * 2, 'tax': 0, 'created_at': 1760000000,
+            }},
+        },
+        'created_at': 1760000000,
+    }).encode()
+
+
+def sign(body: bytes) -> str:
+    return hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture(scope='session')
+def gateway():
+    import gateway
+    return gateway
+
+
+@pytest.fixture(scope='session')
+def tiers(gateway):
+    return sorted(gateway.TOURNAMENTS)
+
+
+@pytest.fixture(scope='session')
+def webhook(tiers):
+    """One signed delivery: ``(body, signature)``"""
+    body = paid_webhook(700000001, tiers[0])
+    return body, sign(body)
+
+
+@pytest.fixture(scope='session')
+def webhook_batch(tiers):
+    """``BATCH_SIZE`` signed deliveries from different users, across every tier"""
+    bodies = [paid_webhook(700000100 + n, tiers[n % len(tiers)]) for n in range(BATCH_SIZE)]
+    return [(body, sign(body)) for body in bodies]
@@ -0,0 +1,216 @@
+"""Local stand-ins for the Telegram Bot API and Razorpay payment links
+
+Both are stdlib HTTP servers meant for load tests: every response can be
+delayed and a share of requests can be answered with 429 or 5xx errors.
+Point the bot and gateway at them with ``TELEGRAM_API_URL`` and
+``RAZORPAY_API_URL``.
+"""
+import json
+import time
+import random
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl
+
+
+class Faults(NamedTuple):
+    """Latency and error injection for a fake API"""
+    latency_ms: float = 0.0
+    jitter: float = 0.5  # latency varies uniformly by this share either way
+    rate_limit_rate: float = 0.0  # share of requests answered with 429
+    server_error_rate: float = 0.0  # share of requests answered with 503
+    retry_after: int = 1
+
+    def delay(self) -> None:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000 * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def error(self) -> Optional[int]:
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.server_error_rate:
+            return 503
+        return None
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeServer:
+    """Runs a request handler on a local port in a background thread"""
+
+    def __init__(self, faults: Faults = Faults(), port: int = 0):
+        self.faults = faults
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _body(self) -> dict:
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if not raw:
+                    return {}
+                if 'json' in (self.headers.get('Content-Type') or ''):
+                    return json.loads(raw)
+                return {key: _maybe_json(value) for key, value in parse_qsl(raw.decode())}
+
+            def _reply(self, status: int, data: dict) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self) -> None:
+                data = self._body()
+                with fake._lock:
+                    fake.requests += 1
+                fake.faults.delay()
+                status = fake.faults.error()
+                if status is not None:
+                    with fake._lock:
+                        fake.errors += 1
+                    self._reply(status, fake.error_body(status))
+                    return
+                self._reply(*fake.handle(self.command, self.path, data))
+
+            do_GET = do_POST = _handle
+
+        self.server = _Server(('127.0.0.1', port), Handler)
+        self.port = self.server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True).start()
+
+    def handle(self, method: str, path: str, data: dict):
+        raise NotImplementedError
+
+    def error_body(self, status: int) -> dict:
+        return {'error': {'code': 'SERVER_ERROR', 'description': 'Injected failure'}}
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _maybe_json(value: str):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class SentMessage(NamedTuple):
+    at: float  # time.perf_counter() when the fake received it
+    method: str
+    chat_id: int
+    text: str
+    reply_markup: Optional[dict]
+
+
+class FakeTelegram(FakeServer):
+    """Telegram Bot API for bot tokens at ``/bot<token>/<method>``
+
+    Outgoing messages are recorded per chat. ``expect`` returns a future for
+    the next message to a chat that matches a predicate, which is how a
+    load test times a bot's reply.
+    """
+
+    def __init__(self, faults: Faults = Faults(), port: int = 0):
+        self.messages: Dict[int, List[SentMessage]] = defaultdict(list)
+        self._waiters: Dict[int, List] = defaultdict(list)
+        self._message_id = 0
+        self.calls: Dict[str, int] = defaultdict(int)
+        super().__init__(faults, port)
+
+    def error_body(self, status: int) -> dict:
+        if status == 429:
+            return {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after '
+                    f'{self.faults.retry_after}', 'parameters': {'retry_after': self.faults.retry_after}}
+        return {'ok': False, 'error_code': status, 'description': 'Internal Server Error'}
+
+    def expect(self, chat_id: int, predicate: Callable[[SentMessage], bool]) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._waiters[chat_id].append((predicate, future))
+        return future
+
+    def _record(self, message: SentMessage) -> None:
+        with self._lock:
+            self.messages[message.chat_id].append(message)
+            waiters = self._waiters.get(message.chat_id, [])
+            matched = [(predicate, future) for predicate, future in waiters if predicate(message)]
+            for waiter in matched:
+                waiters.remove(waiter)
+        for _, future in matched:
+            future.set_result(message)
+
+    def handle(self, method: str, path: str, data: dict):
+        api_method = path.rsplit('/', 1)[-1]
+        with self._lock:
+            self.calls[api_method] += 1
+            self._message_id += 1
+            message_id = self._message_id
+
+        if api_method == 'getMe':
+            return 200, {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'Load Test Bot',
+                                                'username': 'load_test_bot'}}
+        if api_method in ('sendMessage', 'editMessageText'):
+            chat_id = int(data.get('chat_id') or 0)
+            self._record(SentMessage(time.perf_counter(), api_method, chat_id, str(data.get('text', '')),
+                                     data.get('reply_markup')))
+            return 200, {'ok': True, 'result': {
+                'message_id': int(data.get('message_id') or message_id), 'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'supergroup'},
+                'text': data.get('text', '')
+            }}
+        # answerCallbackQuery, setWebhook, pinChatMessage, ...
+        return 200, {'ok': True, 'result': True}
+
+
+class FakeRazorpay(FakeServer):
+    """Razorpay ``POST /payment_links``; created links are kept by ID for the test to pay
+
+    Like Razorpay, a second link with the same ``reference_id`` is refused
+    and ``GET /payment_links?reference_id=...`` finds the existing one.
+    """
+
+    def __init__(self, faults: Faults = Faults(), port: int = 0):
+        self.links: Dict[str, dict] = {}
+        super().__init__(faults, port)
+
+    def error_body(self, status: int) -> dict:
+        return {'error': {'code': 'SERVER_ERROR' if status >= 500 else 'TOO_MANY_REQUESTS',
+                          'description': 'Injected failure'}}
+
+    def handle(self, method: str, path: str, data: dict):
+        path, _, query = path.partition('?')
+        if not path.rstrip('/').endswith('/payment_links'):
+            return 404, {'error': {'code': 'NOT_FOUND'}}
+        if method == 'GET':
+            reference_id = dict(parse_qsl(query)).get('reference_id')
+            with self._lock:
+                links = [link for link in self.links.values() if link.get('reference_id') == reference_id]
+            return 200, {'payment_links': links}
+        with self._lock:
+            if data.get('reference_id') and any(link.get('reference_id') == data['reference_id']
+                                                for link in self.links.values()):
+                return 400, {'error': {'code': 'BAD_REQUEST_ERROR',
+                                       'description': 'reference_id already exists'}}
+            link_id = f"plink_load{len(self.links) + 1:08d}"
+            link = dict(data, id=link_id, status='created', short_url=f"https://rzp.io/l/{link_id}")
+            self.links[link_id] = link
+        return 200, link
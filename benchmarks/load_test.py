@@ -0,0 +1,323 @@
+"""End-to-end load test of the registration path against local fakes
+
+Starts stand-ins for the Telegram Bot API and Razorpay (see fakes.py),
+runs the unified runtime (runtime.py) against them and replays synthetic
+registrations at a fixed arrival rate:
+
+    /register -> "Start Registration" tap -> tier tap -> signed payment_link.paid webhook
+
+Reports throughput, p50/p95/p99 latency per stage, and checks the store
+afterwards: no user seated twice, and no paid user left without a seat or
+a waiting-list entry. Run from the repository root, e.g.:
+
+    python benchmarks/load_test.py --flows 500 --rate 25 --telegram-latency-ms 40 --razorpay-latency-ms 150
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import random
+import signal
+import sqlite3
+import hashlib
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import Faults, FakeRazorpay, FakeTelegram, SentMessage  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tournament_config import load_tournaments  # noqa: E402
+
+TOKEN = '123456:load-test-token'
+WEBHOOK_SECRET = 'load-test-webhook-secret'
+ADMIN_ID = 1
+GROUP_CHAT_ID = '-1001000000000'
+USER_BASE = 700_000_000
+STAGES = ('register', 'choose_tier', 'payment_link', 'webhook', 'assignment', 'flow')
+
+
+class StageFailed(Exception):
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{stage}: {reason}")
+        self.stage = stage
+
+
+def has_button(message: SentMessage, fragment: str) -> bool:
+    return fragment in json.dumps(message.reply_markup or {})
+
+
+def payment_link_id(message: SentMessage) -> str:
+    return message.reply_markup['inline_keyboard'][0][0]['url'].rsplit('/', 1)[-1]
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.tiers = list(load_tournaments())
+        self.telegram = FakeTelegram(Faults(args.telegram_latency_ms, rate_limit_rate=args.telegram_429_rate,
+                                            server_error_rate=args.telegram_5xx_rate))
+        self.razorpay = FakeRazorpay(Faults(args.razorpay_latency_ms, rate_limit_rate=args.razorpay_429_rate,
+                                            server_error_rate=args.razorpay_5xx_rate))
+        self.workdir = tempfile.mkdtemp(prefix='load-test-')
+        self.database = os.path.join(self.workdir, 'tournament.db')
+        self.base_url = f"http://127.0.0.1:{args.port}"
+        self.update_id = 0
+        self.timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+        self.failures: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self.paid_users: List[int] = []
+        self.process: Optional[subprocess.Popen] = None
+
+    # Runtime under test
+
+    def start_runtime(self) -> None:
+        env = dict(
+            os.environ,
+            PORT=str(self.args.port),
+            TELEGRAM_TOKEN=TOKEN,
+            WEBHOOK_URL=self.base_url,
+            TELEGRAM_API_URL=self.telegram.url,
+            RAZORPAY_API_URL=self.razorpay.url,
+            PAYMENT_GATEWAY_KEY='rzp_test_load',
+            PAYMENT_GATEWAY_SECRET=WEBHOOK_SECRET,
+            ADMIN_ID=str(ADMIN_ID),
+            GROUP_CHAT_ID=GROUP_CHAT_ID,
+            DATABASE_PATH=self.database,
+            TRACE_FILE=os.path.join(self.workdir, 'traces.jsonl'),
+        )
+        env.update(setting.split('=', 1) for setting in self.args.env)
+        log = open(os.path.join(self.workdir, 'runtime.log'), 'w')
+        self.process = subprocess.Popen([sys.executable, 'runtime.py'], cwd=ROOT, env=env,
+                                        stdout=log, stderr=subprocess.STDOUT)
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"runtime.py exited early, see {log.name}")
+            try:
+                if httpx.get(f"{self.base_url}/health", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("runtime.py did not become healthy within 30s")
+
+    def stop_runtime(self) -> None:
+        if self.process and self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    # Synthetic Telegram updates and Razorpay webhooks
+
+    def _next_update_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    def command(self, user_id: int, text: str) -> dict:
+        return {'update_id': self._next_update_id(), 'message': {
+            'message_id': self.update_id, 'date': int(time.time()), 'text': text,
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Load {user_id}'},
+            'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}],
+        }}
+
+    def tap(self, user_id: int, data: str) -> dict:
+        return {'update_id': self._next_update_id(), 'callback_query': {
+            'id': str(self.update_id), 'chat_instance': str(user_id), 'data': data,
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'Load {user_id}'},
+            'message': {'message_id': 1, 'date': int(time.time()), 'text': '',
+                        'chat': {'id': user_id, 'type': 'private'}},
+        }}
+
+    def paid_webhook(self, link: dict) -> bytes:
+        """payment_link.paid as gateway.process_payment_event reads it, with the link's notes"""
+        payment_id = f"pay_{link['id'][6:]}"
+        return json.dumps({'event': 'payment_link.paid', 'payload': {
+            'payment_link': {'id': link['id'], 'amount': link['amount'], 'status': 'paid',
+                             'description': link['description'], 'notes': link['notes'],
+                             'customer': link.get('customer', {})},
+            'payment': {'entity': {'id': payment_id, 'amount': link['amount'], 'notes': link['notes']}},
+        }}).encode()
+
+    def expect(self, user_id: int, predicate, stage: str) -> Tuple[Future, str]:
+        """Watch for a reply; call before sending the update so a fast reply is not missed"""
+        return self.telegram.expect(user_id, predicate), stage
+
+    async def reply(self, expected: Tuple[Future, str]) -> SentMessage:
+        future, stage = expected
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.args.timeout)
+        except asyncio.TimeoutError:
+            raise StageFailed(stage, f"no reply within {self.args.timeout}s")
+
+    async def send_update(self, client: httpx.AsyncClient, update: dict, stage: str) -> None:
+        response = await client.post(f"/{TOKEN}", json=update)
+        if response.status_code != 200:
+            raise StageFailed(stage, f"webhook returned {response.status_code}")
+
+    # One registration
+
+    async def flow(self, client: httpx.AsyncClient, user_id: int) -> None:
+        tier = random.choice(self.tiers)
+        timings = {}
+        started = time.perf_counter()
+
+        reply = self.expect(user_id, lambda m: has_button(m, 'start_registration'), 'register')
+        await self.send_update(client, self.command(user_id, '/register'), 'register')
+        timings['register'] = (await self.reply(reply)).at - started
+
+        step = time.perf_counter()
+        reply = self.expect(user_id, lambda m: has_button(m, f'register_{tier}_'), 'choose_tier')
+        await self.send_update(client, self.tap(user_id, 'start_registration'), 'choose_tier')
+        timings['choose_tier'] = (await self.reply(reply)).at - step
+
+        step = time.perf_counter()
+        reply = self.expect(user_id, lambda m: has_button(m, 'rzp.io'), 'payment_link')
+        await self.send_update(client, self.tap(user_id, f'register_{tier}_{user_id}'), 'payment_link')
+        message = await self.reply(reply)
+        timings['payment_link'] = message.at - step
+        link = self.razorpay.links[payment_link_id(message)]
+
+        body = self.paid_webhook(link)
+        headers = {'X-Razorpay-Signature': hmac.new(WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest(),
+                   'Content-Type': 'application/json'}
+        assigned = self.expect(user_id, lambda m: m.method == 'sendMessage' and (
+            'Registration Successful' in m.text or 'Payment Confirmed' in m.text), 'assignment')
+        step = time.perf_counter()
+        response = await client.post('/payment-webhook', content=body, headers=headers)
+        timings['webhook'] = time.perf_counter() - step
+        if response.status_code != 200:
+            raise StageFailed('webhook', f"gateway returned {response.status_code}")
+        self.paid_users.append(user_id)
+        if random.random() < self.args.duplicate_rate:
+            # Razorpay retries deliveries; a retry must never seat the player twice
+            await client.post('/payment-webhook', content=body, headers=headers)
+        timings['assignment'] = (await self.reply(assigned)).at - step
+        timings['flow'] = time.perf_counter() - started
+
+        for stage, seconds in timings.items():
+            self.timings[stage].append(seconds)
+
+    async def guarded_flow(self, client: httpx.AsyncClient, user_id: int) -> None:
+        try:
+            await self.flow(client, user_id)
+        except StageFailed as e:
+            self.failures[e.stage] += 1
+            self.failures['flow'] += 1
+        except httpx.HTTPError as e:
+            self.failures['flow'] += 1
+            print(f"user {user_id}: {e!r}", file=sys.stderr)
+
+    async def replay(self) -> float:
+        """Start one flow every 1/rate seconds; returns the wall time until all finished"""
+        limits = httpx.Limits(max_connections=self.args.connections, max_keepalive_connections=self.args.connections)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits,
+                                     timeout=self.args.timeout) as client:
+            started = time.perf_counter()
+            tasks = []
+            for number in range(self.args.flows):
+                delay = started + number / self.args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(self.guarded_flow(client, USER_BASE + number)))
+            await asyncio.gather(*tasks)
+            return time.perf_counter() - started
+
+    # Results
+
+    def check_store(self) -> Dict[str, int]:
+        """Seat and payment invariants, read from the store after the runtime drained"""
+        conn = sqlite3.connect(self.database)
+        try:
+            seats = dict(conn.execute(
+                'SELECT user_id, COUNT(*) FROM bracket_slots WHERE user_id >= ? GROUP BY user_id', (USER_BASE,)
+            ).fetchall())
+            waiting = {row[0] for row in conn.execute(
+                'SELECT user_id FROM overflow_queue WHERE user_id >= ?', (USER_BASE,)
+            )}
+            unfinished = conn.execute("SELECT COUNT(*) FROM webhook_events WHERE status != 'done'").fetchone()[0]
+        finally:
+            conn.close()
+        return {
+            'paid': len(self.paid_users),
+            'seated': len(seats),
+            'waiting_list': len(waiting),
+            'double_assigned': sum(1 for count in seats.values() if count > 1),
+            'lost_payments': sum(1 for user_id in self.paid_users if user_id not in seats and user_id not in waiting),
+            'unfinished_webhooks': unfinished,
+        }
+
+    def report(self, elapsed: float, store: Dict[str, int]) -> str:
+        completed = len(self.timings['flow'])
+        lines = [
+            f"flows: {self.args.flows} started at {self.args.rate}/s, {completed} completed in {elapsed:.1f}s "
+            f"({completed / elapsed:.1f} registrations/s)",
+            f"fakes: telegram {self.telegram.requests} requests ({self.telegram.errors} injected errors), "
+            f"razorpay {self.razorpay.requests} requests ({self.razorpay.errors} injected errors)",
+            '',
+            f"{'stage':<14}{'ok':>7}{'failed':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+        ]
+        for stage in STAGES:
+            values = sorted(self.timings[stage])
+            if values:
+                p50, p95, p99 = (values[min(int(len(values) * q), len(values) - 1)] * 1000 for q in (0.5, 0.95, 0.99))
+                lines.append(f"{stage:<14}{len(values):>7}{self.failures[stage]:>8}"
+                             f"{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{values[-1] * 1000:>10.1f}")
+            else:
+                lines.append(f"{stage:<14}{0:>7}{self.failures[stage]:>8}")
+        lines.append('')
+        lines.append('store: ' + ', '.join(f"{key}={value}" for key, value in store.items()))
+        ok = store['double_assigned'] == 0 and store['lost_payments'] == 0
+        lines.append('correctness: ' + ('OK' if ok else 'FAILED'))
+        lines.append(f"runtime log and traces: {self.workdir}")
+        return '\n'.join(lines)
+
+    def run(self) -> bool:
+        self.start_runtime()
+        try:
+            elapsed = asyncio.run(self.replay())
+            time.sleep(self.args.settle)
+        finally:
+            self.stop_runtime()
+            self.telegram.stop()
+            self.razorpay.stop()
+        store = self.check_store()
+        print(self.report(elapsed, store))
+        return store['double_assigned'] == 0 and store['lost_payments'] == 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--flows', type=int, default=200, help='registrations to replay')
+    parser.add_argument('--rate', type=float, default=20.0, help='registrations started per second')
+    parser.add_argument('--port', type=int, default=18080, help='port for the runtime under test')
+    parser.add_argument('--connections', type=int, default=100, help='HTTP connections to the runtime')
+    parser.add_argument('--timeout', type=float, default=30.0, help='seconds to wait for each reply')
+    parser.add_argument('--settle', type=float, default=3.0, help='seconds to let queues drain before stopping')
+    parser.add_argument('--duplicate-rate', type=float, default=0.1, help='share of webhooks delivered twice')
+    parser.add_argument('--telegram-latency-ms', type=float, default=30.0)
+    parser.add_argument('--telegram-429-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-5xx-rate', type=float, default=0.0)
+    parser.add_argument('--razorpay-latency-ms', type=float, default=150.0)
+    parser.add_argument('--razorpay-429-rate', type=float, default=0.0)
+    parser.add_argument('--razorpay-5xx-rate', type=float, default=0.0)
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the runtime, e.g. CONCURRENT_UPDATES=32')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if LoadTest(parse_args()).run() else 1)
@@ -0,0 +1,109 @@
+"""Allocation and timing micro-benchmark for the message template cache
+
+Compares building the registration reply inline (as the handlers used to)
+with the pre-compiled ``MessageTemplates``. Run from the repository root:
+
+    python benchmarks/template_allocations.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup  # noqa: E402
+
+from message_templates import MessageTemplates  # noqa: E402
+from slot_board import render_board  # noqa: E402
+from tournament_config import load_tournaments  # noqa: E402
+
+TOURNAMENTS = load_tournaments()
+templates = MessageTemplates(TOURNAMENTS, '@eFootball_Tournamentsbot', 'efootballtournamentX')
+USERS = 1000
+CALLS = 20_000
+
+
+def inline_register_reply(user_id):
+    """The /register reply as register_command built it before templates"""
+    keyboard = [
+        [InlineKeyboardButton("💰 ₹15 Tournament (Win ₹25)", callback_data=f"register_15_{user_id}")],
+        [InlineKeyboardButton("💰 ₹30 Tournament (Win ₹50)", callback_data=f"register_30_{user_id}")],
+        [InlineKeyboardButton("💰 ₹50 Tournament (Win ₹80)", callback_data=f"register_50_{user_id}")],
+    ]
+    text = (
+        "🏆 <b>Choose Your Tournament</b>\n\n"
+        "Select the tournament you want to join:"
+    )
+    return text, InlineKeyboardMarkup(keyboard)
+
+
+def template_register_reply(user_id):
+    return templates.choose_tournament_text, templates.tier_keyboard(user_id)
+
+
+def inline_welcome_reply(user_id):
+    keyboard = InlineKeyboardMarkup([
+        [InlineKeyboardButton("Join Tournament Group", url="https://t.me/efootballtournamentX")]
+    ])
+    text = (
+        "🏆 <b>Welcome to eFootball Tournament Bot!</b>\n\n"
+        "🎮 Join exciting tournaments with real prizes!\n"
+        "💰 Entry fees: ₹15, ₹30, ₹50\n"
+        "🏅 Win amazing cash prizes!\n\n"
+        "Click below to join the tournament group and use /register to participate."
+    )
+    return text, keyboard
+
+
+def template_welcome_reply(user_id):
+    return templates.welcome_text, templates.welcome_keyboard
+
+
+def inline_board(user_id):
+    """The slot board as it was rendered before the cached frame and lines"""
+    slots = {1: user_id, 2: None}
+    message = "🛑 <b>₹15 Tournament Slots</b> 🛑\n\n"
+    for slot, holder in slots.items():
+        player = f'<a href="tg://user?id={holder}">Player {holder}</a>' if holder else "_______"
+        message += f"⚽ Slot {slot}: {player}\n"
+    message += "\n🏆 Winner receives ₹25. All the best!"
+    return message
+
+
+def template_board(user_id):
+    return render_board(15, {1: user_id, 2: None}, 25)
+
+
+def bytes_per_call(build):
+    """Memory held by the reply objects one update produces"""
+    for user_id in range(USERS):  # warm caches with the same users the run uses
+        build(user_id)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    replies = [build(user_id % USERS) for user_id in range(CALLS)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del replies
+    # Subtract the list that keeps the replies alive
+    return (allocated - sys.getsizeof([None] * CALLS)) / CALLS
+
+
+def microseconds_per_call(build):
+    counter = iter(range(10 ** 9))
+    return min(timeit.repeat(lambda: build(next(counter) % USERS), number=CALLS, repeat=3)) / CALLS * 1e6
+
+
+def main():
+    print(f"{'reply':<20}{'inline B':>10}{'cached B':>10}{'inline us':>11}{'cached us':>11}")
+    for name, inline, cached in (
+        ('/register tiers', inline_register_reply, template_register_reply),
+        ('/start welcome', inline_welcome_reply, template_welcome_reply),
+        ('slot board', inline_board, template_board),
+    ):
+        print(f"{name:<20}{bytes_per_call(inline):>10.0f}{bytes_per_call(cached):>10.0f}"
+              f"{microseconds_per_call(inline):>11.2f}{microseconds_per_call(cached):>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
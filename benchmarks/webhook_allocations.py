@@ -0,0 +1,91 @@
+"""Allocation and timing micro-benchmark for webhook ingestion
+
+Compares how receive_webhook used to read a delivery (decode the body to
+text, verify it re-encoded, parse the whole JSON tree and walk it for the
+key, trace ID, user and tier) with the raw-bytes path: verify the bytes,
+then decode once into a ``WebhookEvent``. Run from the repository root:
+
+    python benchmarks/webhook_allocations.py
+"""
+import os
+import sys
+import hmac
+import json
+import timeit
+import hashlib
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import WEBHOOK_SECRET, paid_webhook, sign  # noqa: E402
+
+from webhooks import parse_webhook, verify_signature  # noqa: E402
+
+TIERS = (15, 30, 50)
+SECRET = WEBHOOK_SECRET.encode()
+DELIVERIES = [(body, sign(body)) for body in (paid_webhook(700000000 + n, TIERS[n % 3]) for n in range(1000))]
+CALLS = 20_000
+
+
+def text_ingest(body, signature):
+    """The request path before: text body, dict tree, description split for the user"""
+    payload = body.decode('utf-8')
+    expected = hmac.new(WEBHOOK_SECRET.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
+    assert hmac.compare_digest(expected, signature)
+    webhook_data = json.loads(payload)
+    entities = webhook_data.get('payload', {})
+    key = entities.get('payment', {}).get('entity', {}).get('id') or entities.get('payment_link', {}).get('id')
+    for entity in (entities.get('payment_link', {}), entities.get('payment_link', {}).get('entity', {}),
+                   entities.get('payment', {}).get('entity', {})):
+        notes = entity.get('notes')
+        if isinstance(notes, dict) and notes.get('trace_id'):
+            break
+    payment_data = entities.get('payment_link', {})
+    amount = payment_data.get('amount', 0) // 100
+    description = payment_data.get('description', '')
+    user_id = int(description.split('User ')[1].split(' ')[0]) if 'User ' in description else None
+    authorized_user = int(payment_data['notes'].get('authorized_user', '0'))
+    return webhook_data, key, user_id, authorized_user, amount
+
+
+def bytes_ingest(body, signature):
+    assert verify_signature(body, signature, SECRET)
+    return parse_webhook(body)
+
+
+def allocated_per_call(ingest):
+    """Peak bytes allocated while ingesting one delivery, and bytes still held by its result"""
+    for body, signature in DELIVERIES:
+        ingest(body, signature)
+    peaks, held = [], []
+    tracemalloc.start()
+    for body, signature in DELIVERIES:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        result = ingest(body, signature)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+        held.append(current - before)
+        del result
+    tracemalloc.stop()
+    return sum(peaks) / len(peaks), sum(held) / len(held)
+
+
+def microseconds_per_call(ingest):
+    counter = iter(range(10 ** 9))
+
+    def once():
+        ingest(*DELIVERIES[next(counter) % len(DELIVERIES)])
+    return min(timeit.repeat(once, number=CALLS, repeat=3)) / CALLS * 1e6
+
+
+def main():
+    print(f"{'path':<12}{'peak B':>10}{'held B':>10}{'us':>9}")
+    for name, ingest in (('text', text_ingest), ('raw bytes', bytes_ingest)):
+        peak, held = allocated_per_call(ingest)
+        print(f"{name:<12}{peak:>10.0f}{held:>10.0f}{microseconds_per_call(ingest):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
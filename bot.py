@@ -1,13 +1,28 @@
 import os
 import asyncio
-from typing import Final, Dict, List
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters, CallbackContext
+import functools
+import random
+import time
+from typing import Final, Dict, List, Optional
+from telegram import Update
+from telegram.ext import AIORateLimiter, Application, CommandHandler, CallbackQueryHandler, MessageHandler, TypeHandler, CallbackContext
 from telegram.constants import ParseMode
-from datetime import datetime, timedelta
-import requests
-import json
+import httpx
 import logging
+from store import SlotStore
+from slot_board import SlotBoard, AsyncBoardUpdater, RENDER_CACHES
+from tournament_config import tournament_catalog
+from bracket import BYE
+from bracket_journal import BracketJournal
+from matchmaking import Matchmaker, render_fixtures
+from events import PaymentEvent, PaymentStreamConsumer
+from user_tracking import UserTracker
+from rate_limit import RateLimit, RateLimiter, RateLimitHandler
+from message_templates import MessageTemplates
+from message_filters import AddressedToBot
+from update_processing import PerUserUpdateProcessor, UpdateQueue
+import metrics
+from tracing import Tracer, TRACE_NOTE, DEFAULT_TRACE_FILE, DEFAULT_TRACE_MAX_BYTES
 
 # Configure logging
 logging.basicConfig(
@@ -24,157 +39,331 @@ GROUP_CHAT_ID: Final = os.getenv('GROUP_CHAT_ID', '-1002143662557')
 PAYMENT_GATEWAY_KEY: Final = os.getenv('PAYMENT_GATEWAY_KEY')
 PAYMENT_GATEWAY_SECRET: Final = os.getenv('PAYMENT_GATEWAY_SECRET')
 WEBHOOK_URL: Final = os.getenv('WEBHOOK_URL')
+# API endpoints; overridden to point at local stand-ins in load tests
+TELEGRAM_API_URL: Final = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+RAZORPAY_API_URL: Final = os.getenv('RAZORPAY_API_URL', 'https://api.razorpay.com/v1')
+BOARD_DEBOUNCE_SECONDS: Final = float(os.getenv('BOARD_DEBOUNCE_SECONDS', '2'))
+PAYMENT_HTTP_TIMEOUT: Final = float(os.getenv('PAYMENT_HTTP_TIMEOUT', '10'))
+PAYMENT_HTTP_MAX_CONNECTIONS: Final = int(os.getenv('PAYMENT_HTTP_MAX_CONNECTIONS', '100'))
+PAYMENT_LINK_TTL: Final = int(os.getenv('PAYMENT_LINK_TTL', str(24 * 60 * 60)))
+GROUP_USERNAME: Final = os.getenv('GROUP_USERNAME', 'efootballtournamentX')
+# Gateway to follow for payment events when it runs as a separate process
+GATEWAY_URL: Final = os.getenv('GATEWAY_URL')
+PAYMENT_STREAM_CONSUMER: Final = os.getenv('PAYMENT_STREAM_CONSUMER', 'bot')
+EVENT_STREAM_TOKEN: Final = os.getenv('EVENT_STREAM_TOKEN')
+# Update processing: handlers running at once, updates taken off the queue, queued updates
+CONCURRENT_UPDATES: Final = int(os.getenv('CONCURRENT_UPDATES', '16'))
+MAX_UPDATES_IN_FLIGHT: Final = int(os.getenv('MAX_UPDATES_IN_FLIGHT', '256'))
+UPDATE_QUEUE_SIZE: Final = int(os.getenv('UPDATE_QUEUE_SIZE', '1024'))
+# Times a bot reply is retried after Telegram's flood control answers with retry_after
+TELEGRAM_MAX_RETRIES: Final = int(os.getenv('TELEGRAM_MAX_RETRIES', '3'))
+# Port for /metrics when the bot runs as its own process (the unified runtime serves it on PORT)
+METRICS_PORT: Final = int(os.getenv('METRICS_PORT', '0'))
+# Sampled registration traces (tap -> Razorpay -> webhook -> slot), appended as JSON lines
+TRACE_FILE: Final = os.getenv('TRACE_FILE', DEFAULT_TRACE_FILE)
+# Size at which the trace file is rotated to TRACE_FILE.1 (0 = never)
+TRACE_MAX_BYTES: Final = int(os.getenv('TRACE_MAX_BYTES', str(DEFAULT_TRACE_MAX_BYTES)))
+TRACE_SAMPLE_RATE: Final = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+# Seconds between snapshots of running brackets; results in between are replayed from the journal
+BRACKET_SNAPSHOT_SECONDS: Final = float(os.getenv('BRACKET_SNAPSHOT_SECONDS', '60'))
 
-# Tournament configuration
-TOURNAMENTS = {
-    15: {
-        "slots": {1: None, 2: None},
-        "prize": 25,
-        "entry_fee": 15
-    },
-    30: {
-        "slots": {1: None, 2: None},
-        "prize": 50,
-        "entry_fee": 30
-    },
-    50: {
-        "slots": {1: None, 2: None},
-        "prize": 80,
-        "entry_fee": 50
-    },
-}
-
-# User tracking
-user_last_register_time: Dict[int, datetime] = {}
-interacted_users = set()
-first_time_users = set()
-waiting_approvals: Dict[int, List[int]] = {15: [], 30: [], 50: []}
+# Tournament configuration (tournaments.json), reloaded when the file changes
+TOURNAMENTS = tournament_catalog()
 
-class PaymentGateway:
-    """Payment gateway integration (Razorpay example)"""
-    
-    @staticmethod
-    def create_payment_link(amount: int, user_id: int, tournament_type: int) -> Dict:
-        """Create a payment link using Razorpay API"""
+# Slot boards live in the store shared with gateway.py
+store = SlotStore()
+store.ensure_tournaments(TOURNAMENTS)
+board_updater = AsyncBoardUpdater(SlotBoard(store, TOURNAMENTS, GROUP_CHAT_ID), delay=BOARD_DEBOUNCE_SECONDS)
+
+# Static message bodies and keyboards, compiled once per version of the tiers
+templates = MessageTemplates(TOURNAMENTS, BOT_USERNAME, GROUP_USERNAME, PAYMENT_LINK_TTL, TOURNAMENTS.offered)
+
+def apply_tournaments(catalog) -> None:
+    """Open brackets for new tiers and swap in templates built from the reloaded config"""
+    global templates
+    store.ensure_tournaments(catalog)
+    templates = MessageTemplates(catalog, BOT_USERNAME, GROUP_USERNAME, PAYMENT_LINK_TTL, catalog.offered)
+
+TOURNAMENTS.on_reload(apply_tournaments)
+
+# Running brackets of filled tournaments, keyed by the store's bracket ID; results are journaled
+brackets = BracketJournal(store)
+
+# User tracking: who has used the bot and /register cooldowns
+REGISTER_COOLDOWN_SECONDS: Final = 10 * 60
+users = UserTracker(store, cooldown=REGISTER_COOLDOWN_SECONDS)
+
+def is_command_or_callback(update: Update) -> bool:
+    if update.callback_query:
+        return True
+    return bool(update.message and update.message.text and update.message.text.startswith('/'))
+
+def requests_payment_link(update: Update) -> bool:
+    return bool(update.callback_query and (update.callback_query.data or '').startswith('register_'))
+
+# Group messages reach handle_message only when they are meant for the bot
+addressed_to_bot = AddressedToBot(BOT_USERNAME)
+
+# Per-user limits shared by every bot worker through the store
+rate_limiter = RateLimiter(store, [
+    RateLimit('updates', int(os.getenv('RATE_LIMIT_BURST', '20')),
+              float(os.getenv('RATE_LIMIT_PER_MINUTE', '30')), is_command_or_callback),
+    RateLimit('payment_links', int(os.getenv('PAYMENT_LINK_BURST', '3')),
+              float(os.getenv('PAYMENT_LINKS_PER_MINUTE', '2')), requests_payment_link),
+])
+
+# Per-tier queues of paid players waiting to be seated
+matchmaker = Matchmaker(store, TOURNAMENTS)
+
+tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE, service='bot', max_bytes=TRACE_MAX_BYTES)
+
+# Instrumentation, scraped from /metrics
+HANDLER_SECONDS = metrics.histogram('bot_handler_seconds', 'Time spent in each bot handler', ['handler'])
+HANDLER_ERRORS = metrics.counter('bot_handler_errors_total', 'Bot handler calls that raised', ['handler'])
+RAZORPAY_REQUEST_SECONDS = metrics.histogram('razorpay_request_seconds', 'Razorpay API calls by operation and HTTP status',
+                                             ['operation', 'status'])
+PAYMENT_LINK_CACHE = metrics.counter('bot_payment_link_cache_total', 'Payment link requests served from the cache or not',
+                                     ['result'])
+def cache_info(field: str) -> List:
+    # Read through the current templates, which a config reload replaces
+    return metrics.cache_info_reader(templates.caches() + RENDER_CACHES, field)()
+
+metrics.callback('bot_cache_hits_total', 'Hits of the in-process template caches',
+                 lambda: cache_info('hits'), ['cache'], 'counter')
+metrics.callback('bot_cache_misses_total', 'Misses of the in-process template caches',
+                 lambda: cache_info('misses'), ['cache'], 'counter')
+metrics.callback('bot_group_messages_checked_total', 'Group messages run through the addressed-to-bot filter',
+                 lambda: addressed_to_bot.checked, metric_type='counter')
+metrics.callback('bot_group_messages_rejected_total', 'Group messages dropped by the filter before any handler ran',
+                 lambda: addressed_to_bot.rejected, metric_type='counter')
+metrics.callback('bot_cached_users', 'Users whose flags are cached in memory', lambda: users.stats()['cached_users'])
+metrics.callback('bot_active_cooldowns', 'Users in a /register cooldown', lambda: users.stats()['cooldowns'])
+metrics.callback('bot_matchmaking_queue_depth', 'Paid players waiting for a seat in this process', lambda: [
+    ((tier,), matchmaker.depth(tier)) for tier in TOURNAMENTS
+], ['tier'])
+
+def instrumented(callback):
+    """Record a handler's latency and errors under its function name"""
+    latency = HANDLER_SECONDS.labels(callback.__name__)
+    errors = HANDLER_ERRORS.labels(callback.__name__)
+    
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        started = time.perf_counter()
         try:
-            url = "https://api.razorpay.com/v1/payment_links"
-            
-            payload = {
-                "amount": amount * 100,  # Amount in paise
-                "currency": "INR",
-                "accept_partial": False,
-                "description": f"eFootball Tournament ₹{tournament_type} - User {user_id}",
-                "customer": {
-                    "name": f"User {user_id}",
-                    "contact": "+919999999999",  # Default contact
-                    "email": f"user{user_id}@example.com"
-                },
-                "notes": {
-                    "user_id": str(user_id),
-                    "tournament_type": str(tournament_type),
-                    "authorized_user": str(user_id)  # Additional security
-                },
-                "notify": {
-                    "sms": False,
-                    "email": False
-                },
-                "reminder_enable": False,
-                "callback_url": f"{WEBHOOK_URL}/payment-success?user_id={user_id}&tournament={tournament_type}",
-                "callback_method": "get"
-            }
-            
-            response = requests.post(
-                url,
-                json=payload,
-                auth=(PAYMENT_GATEWAY_KEY, PAYMENT_GATEWAY_SECRET),
-                headers={'Content-Type': 'application/json'}
+            return await callback(update, context)
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            latency.observe(time.perf_counter() - started)
+    
+    return wrapper
+
+class PaymentGateway:
+    """Payment gateway integration (Razorpay example)
+
+    All calls share one long-lived ``httpx.AsyncClient`` so that keep-alive
+    connections and TLS sessions to Razorpay are reused across registrations
+    instead of paying a full handshake per payment link.
+    """
+
+    API_URL = RAZORPAY_API_URL
+    MAX_RETRIES = 3
+    BACKOFF_BASE = 0.5  # seconds, doubled on every retry
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    # A cached link is only handed out again if it stays valid at least this long
+    REUSE_MARGIN = 10 * 60
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """Return the shared pooled HTTP client, creating it on first use"""
+        if cls._client is None or cls._client.is_closed:
+            cls._client = httpx.AsyncClient(
+                base_url=cls.API_URL,
+                auth=(PAYMENT_GATEWAY_KEY or '', PAYMENT_GATEWAY_SECRET or ''),
+                headers={'Content-Type': 'application/json'},
+                timeout=httpx.Timeout(PAYMENT_HTTP_TIMEOUT, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=PAYMENT_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=PAYMENT_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=60.0
+                )
             )
-            
-            if response.status_code == 200:
-                return response.json()
+        return cls._client
+
+    @classmethod
+    async def close(cls) -> None:
+        """Close the shared HTTP client and its connection pool"""
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+        cls._client = None
+
+    @classmethod
+    async def get_payment_link(cls, amount: int, user_id: int, tournament_type: int,
+                               trace_id: Optional[str] = None) -> Optional[Dict]:
+        """Return the user's unpaid link for this tier, creating one only if there is none
+
+        Links are cached per (user, tier) in the shared store; the gateway
+        drops the entry when the webhook reports the link paid, expired or
+        cancelled.
+        """
+        with tracer.span(trace_id, 'payment_link.lookup') as span:
+            cached = store.get_payment_link(user_id, tournament_type, int(time.time()) + cls.REUSE_MARGIN)
+            span.set(cached=bool(cached))
+        PAYMENT_LINK_CACHE.labels('hit' if cached else 'miss').inc()
+        if cached:
+            return {'id': cached['link_id'], 'short_url': cached['short_url'], 'expire_by': cached['expires_at']}
+        
+        payment_data = await cls.create_payment_link(amount, user_id, tournament_type, trace_id)
+        if payment_data and payment_data.get('id') and payment_data.get('short_url'):
+            store.save_payment_link(
+                user_id, tournament_type, payment_data['id'], payment_data['short_url'],
+                payment_data.get('expire_by') or int(time.time()) + PAYMENT_LINK_TTL
+            )
+        return payment_data
+
+    @classmethod
+    async def create_payment_link(cls, amount: int, user_id: int, tournament_type: int,
+                                  trace_id: Optional[str] = None) -> Optional[Dict]:
+        """Create a payment link using Razorpay API"""
+        payload = {
+            "amount": amount * 100,  # Amount in paise
+            "currency": "INR",
+            "accept_partial": False,
+            "description": f"eFootball Tournament ₹{tournament_type} - User {user_id}",
+            "customer": {
+                "name": f"User {user_id}",
+                "contact": "+919999999999",  # Default contact
+                "email": f"user{user_id}@example.com"
+            },
+            "notes": {
+                "user_id": str(user_id),
+                "tournament_type": str(tournament_type),
+                "authorized_user": str(user_id)  # Additional security
+            },
+            "notify": {
+                "sms": False,
+                "email": False
+            },
+            "reminder_enable": False,
+            "expire_by": int(time.time()) + PAYMENT_LINK_TTL,
+            "callback_url": f"{WEBHOOK_URL}/payment-success?user_id={user_id}&tournament={tournament_type}",
+            "callback_method": "get"
+        }
+
+        if trace_id:
+            # Razorpay hands the notes back in the webhook, so the gateway joins this trace
+            payload['notes'][TRACE_NOTE] = trace_id
+
+        # Razorpay refuses a second link with the same reference_id, so retries of
+        # this request can never create (and charge for) two links
+        payload['reference_id'] = f"{user_id}-{tournament_type}-{payload['expire_by']}"
+        
+        client = cls.get_client()
+        maybe_created = False
+
+        for attempt in range(1, cls.MAX_RETRIES + 1):
+            if maybe_created:
+                # A 5xx can arrive after the link was created; hand that one out instead
+                existing = await cls.find_payment_link(payload['reference_id'], trace_id)
+                if existing:
+                    return existing
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                response = await client.post("/payment_links", json=payload)
+                status = response.status_code
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached Razorpay, so retrying cannot create a duplicate link
+                status = 'connect_error'
+                logger.warning(f"Payment link request failed to connect (attempt {attempt}): {e}")
+            except Exception as e:
+                logger.error(f"Error creating payment link: {e}")
+                return None
             else:
-                logger.error(f"Payment link creation failed: {response.text}")
+                if response.status_code == 200:
+                    return response.json()
+                if response.status_code not in cls.RETRY_STATUS_CODES:
+                    logger.error(f"Payment link creation failed: {response.text}")
+                    return None
+                maybe_created = maybe_created or response.status_code >= 500
+                logger.warning(f"Payment link creation returned {response.status_code} (attempt {attempt})")
+            finally:
+                elapsed = time.perf_counter() - started
+                RAZORPAY_REQUEST_SECONDS.labels('create_payment_link', status).observe(elapsed)
+                tracer.record(trace_id, 'razorpay.create_payment_link', time.time() - elapsed, elapsed,
+                              attempt=attempt, status=status)
+
+            if attempt < cls.MAX_RETRIES:
+                delay = cls.BACKOFF_BASE * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+        logger.error(f"Payment link creation gave up after {cls.MAX_RETRIES} attempts")
+        return None
+
+    @classmethod
+    async def find_payment_link(cls, reference_id: str, trace_id: Optional[str] = None) -> Optional[Dict]:
+        """Return the payment link created with ``reference_id``, or None if there is none"""
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = await cls.get_client().get("/payment_links", params={'reference_id': reference_id})
+            status = response.status_code
+            if response.status_code != 200:
+                logger.warning(f"Payment link lookup returned {response.status_code}")
                 return None
-                
+            links = response.json().get('payment_links') or []
+            return links[0] if links else None
         except Exception as e:
-            logger.error(f"Error creating payment link: {e}")
+            logger.warning(f"Error looking up payment link {reference_id}: {e}")
             return None
-    
+        finally:
+            elapsed = time.perf_counter() - started
+            RAZORPAY_REQUEST_SECONDS.labels('fetch_payment_link', status).observe(elapsed)
+            tracer.record(trace_id, 'razorpay.fetch_payment_link', time.time() - elapsed, elapsed, status=status)
+
 
 async def start_command(update: Update, context: CallbackContext) -> None:
     """Handle /start command"""
-    global interacted_users
-    
     chat_type = update.message.chat.type
     user_id = update.effective_user.id
     
     if chat_type == "private":
-        interacted_users.add(user_id)
-        
-        group_chat_username = "efootballtournamentX"  # Replace with your group username
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("Join Tournament Group", url=f"https://t.me/{group_chat_username}")]
-        ])
-        
-        welcome_text = (
-            "🏆 <b>Welcome to eFootball Tournament Bot!</b>\n\n"
-            "🎮 Join exciting tournaments with real prizes!\n"
-            "💰 Entry fees: ₹15, ₹30, ₹50\n"
-            "🏅 Win amazing cash prizes!\n\n"
-            "Click below to join the tournament group and use /register to participate."
-        )
+        users.mark_interacted(user_id)
         
         await update.message.reply_text(
-            welcome_text,
-            reply_markup=keyboard,
+            templates.welcome_text,
+            reply_markup=templates.welcome_keyboard,
             parse_mode=ParseMode.HTML
         )
         
     elif chat_type in ["group", "supergroup"]:
-        bot_username = BOT_USERNAME.replace('@', '')
-        start_url = f"https://t.me/{bot_username}?start=registration"
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🎮 Start Registration", url=start_url)]
-        ])
-        
         await update.message.reply_text(
-            "🏆 Ready to join the tournament? Click below to register!",
-            reply_markup=keyboard
+            templates.group_start_text,
+            reply_markup=templates.group_start_keyboard
         )
 
 async def register_command(update: Update, context: CallbackContext) -> None:
     """Handle /register command"""
-    global user_last_register_time, first_time_users, interacted_users
-    
     user = update.effective_user
     user_id = user.id
-    now = datetime.utcnow()
-    
-    # Add user to interacted users
-    interacted_users.add(user_id)
     
-    # Check if first-time user
-    if user_id not in first_time_users:
-        first_time_users.add(user_id)
-        
-        keyboard = InlineKeyboardMarkup([
-            [InlineKeyboardButton("🎮 Start Registration", callback_data="start_registration")]
-        ])
-        
+    # Check if first-time user (also records the user as interacted)
+    if users.first_visit(user_id):
         await update.message.reply_text(
-            "🎉 <b>Welcome to your first tournament!</b>\n\n"
-            "Click below to begin the registration process.",
-            reply_markup=keyboard,
+            templates.first_tournament_text,
+            reply_markup=templates.first_tournament_keyboard,
             parse_mode=ParseMode.HTML
         )
         return
     
     # Check cooldown (10 minutes)
-    last_register_time = user_last_register_time.get(user_id)
-    if last_register_time and now - last_register_time < timedelta(minutes=10):
-        cooldown_remaining = (last_register_time + timedelta(minutes=10)) - now
-        minutes = cooldown_remaining.seconds // 60
-        seconds = cooldown_remaining.seconds % 60
+    cooldown_remaining = users.cooldown_remaining(user_id)
+    if cooldown_remaining:
+        minutes, seconds = divmod(cooldown_remaining, 60)
         
         await update.message.reply_text(
             f"⏰ <b>Cooldown Active</b>\n\n"
@@ -183,20 +372,13 @@ async def register_command(update: Update, context: CallbackContext) -> None:
         )
         return
     
-    # Update last register time
-    user_last_register_time[user_id] = now
+    # Start the cooldown
+    users.start_cooldown(user_id)
     
     # Show tournament options
-    keyboard = [
-        [InlineKeyboardButton("💰 ₹15 Tournament (Win ₹25)", callback_data=f"register_15_{user_id}")],
-        [InlineKeyboardButton("💰 ₹30 Tournament (Win ₹50)", callback_data=f"register_30_{user_id}")],
-        [InlineKeyboardButton("💰 ₹50 Tournament (Win ₹80)", callback_data=f"register_50_{user_id}")],
-    ]
-    
     await update.message.reply_text(
-        "🏆 <b>Choose Your Tournament</b>\n\n"
-        "Select the tournament you want to join:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        templates.choose_tournament_text,
+        reply_markup=templates.tier_keyboard(user_id),
         parse_mode=ParseMode.HTML
     )
 
@@ -204,16 +386,9 @@ async def start_registration_callback(update: Update, context: CallbackContext)
     """Handle start registration callback"""
     await update.callback_query.answer()
     
-    keyboard = [
-        [InlineKeyboardButton("💰 ₹15 Tournament (Win ₹25)", callback_data=f"register_15_{update.callback_query.from_user.id}")],
-        [InlineKeyboardButton("💰 ₹30 Tournament (Win ₹50)", callback_data=f"register_30_{update.callback_query.from_user.id}")],
-        [InlineKeyboardButton("💰 ₹50 Tournament (Win ₹80)", callback_data=f"register_50_{update.callback_query.from_user.id}")],
-    ]
-    
     await update.callback_query.edit_message_text(
-        "🏆 <b>Choose Your Tournament</b>\n\n"
-        "Select the tournament you want to join:",
-        reply_markup=InlineKeyboardMarkup(keyboard),
+        templates.choose_tournament_text,
+        reply_markup=templates.tier_keyboard(update.callback_query.from_user.id),
         parse_mode=ParseMode.HTML
     )
 
@@ -242,38 +417,38 @@ async def register_tournament_callback(update: Update, context: CallbackContext)
         logger.error(f"Error parsing callback data: {data}")
         return
     
-    # Create payment link
-    payment_data = PaymentGateway.create_payment_link(
-        amount=tournament_type,
-        user_id=user_id,
-        tournament_type=tournament_type
-    )
-    
-    if not payment_data:
-        await query.edit_message_text(
-            "❌ <b>Payment Error</b>\n\n"
-            "Unable to create payment link. Please try again later.",
-            parse_mode=ParseMode.HTML
-        )
+    # Retired tiers still resolve, so keyboards sent before a config reload keep working
+    tournament = TOURNAMENTS.get(tournament_type)
+    if tournament is None:
+        logger.warning(f"Registration for unknown tournament ₹{tournament_type} from user {user_id}")
         return
     
-    # Send payment link to user
-    keyboard = InlineKeyboardMarkup([
-        [InlineKeyboardButton("💳 Pay Now", url=payment_data.get('short_url'))],
-        [InlineKeyboardButton("⚠️ Payment Security", callback_data="payment_security")]
-    ])
-    
-    await query.edit_message_text(
-        f"💳 <b>Payment Required</b>\n\n"
-        f"🏆 Tournament: ₹{tournament_type}\n"
-        f"💰 Entry Fee: ₹{tournament_type}\n"
-        f"🏅 Prize: ₹{TOURNAMENTS[tournament_type]['prize']}\n\n"
-        f"Click below to complete your payment:\n\n"
-        f"⚠️ <b>IMPORTANT:</b> This payment link is personalized for you only.\n"
-        f"⏰ <i>You will be automatically registered after payment.</i>",
-        reply_markup=keyboard,
-        parse_mode=ParseMode.HTML
-    )
+    trace_id = tracer.new_trace()
+    with tracer.span(trace_id, 'register.tap', user_id=user_id, tournament_type=tournament_type) as span:
+        # Create payment link
+        payment_data = await PaymentGateway.get_payment_link(
+            amount=tournament['entry_fee'],
+            user_id=user_id,
+            tournament_type=tournament_type,
+            trace_id=trace_id
+        )
+        
+        if not payment_data:
+            span.set(outcome='payment_error')
+            await query.edit_message_text(
+                templates.payment_error_text,
+                parse_mode=ParseMode.HTML
+            )
+            return
+        
+        # Send payment link to user
+        span.set(payment_link_id=payment_data.get('id'))
+        with tracer.span(trace_id, 'telegram.edit_message'):
+            await query.edit_message_text(
+                templates.payment_required_text[tournament_type],
+                reply_markup=templates.payment_keyboard(payment_data.get('short_url')),
+                parse_mode=ParseMode.HTML
+            )
 
 async def payment_security_callback(update: Update, context: CallbackContext):
     """Handle payment security info callback"""
@@ -281,17 +456,9 @@ async def payment_security_callback(update: Update, context: CallbackContext):
     await query.answer()
     
     await query.edit_message_text(
-        "🔒 <b>Payment Security Information</b>\n\n"
-        "• Each payment link is personalized and can only be used by the requesting user\n"
-        "• Payment links expire after 24 hours\n"
-        "• Only you can complete payment using your link\n"
-        "• After successful payment, you'll be automatically registered\n"
-        "• Your slot will be assigned immediately\n\n"
-        "🛡️ <i>Your payment is secure and protected.</i>",
+        templates.payment_security_text,
         parse_mode=ParseMode.HTML,
-        reply_markup=InlineKeyboardMarkup([
-            [InlineKeyboardButton("← Back to Payment", callback_data="back_to_payment")]
-        ])
+        reply_markup=templates.payment_security_keyboard
     )
 
 async def back_to_payment_callback(update: Update, context: CallbackContext):
@@ -305,60 +472,96 @@ async def back_to_payment_callback(update: Update, context: CallbackContext):
     )
 
 async def approve_decline_callback(update: Update, context: CallbackContext):
-    """Handle admin approval/decline"""
+    """Handle admin approval/decline of a disputed payment"""
     query = update.callback_query
-    await query.answer()
     
-    data = query.data.split("_")
+    # approve_<tier>_<user>_<payment key>; payment keys contain underscores themselves
+    data = query.data.split("_", 3)
     action = data[0]
     
+    if update.effective_user.id != ADMIN_ID:
+        await query.answer("❌ Only the admin can review payments.", show_alert=True)
+        return
+    await query.answer()
+    
     if action == "approve":
         tournament_type = int(data[1])
         user_id = int(data[2])
+        payment_key = data[3] if len(data) > 3 and data[3] else None
         
-        # Assign slot
+        # Approved disputes join the same matchmaking queue as confirmed payments. The seat is
+        # stored under the disputed payment's key, so a repeated or concurrent approval gets it back
         tournament = TOURNAMENTS[tournament_type]
-        slot_assigned = False
-        slot = None
-        
-        if tournament["slots"][1] is None:
-            tournament["slots"][1] = user_id
-            slot = 1
-            slot_assigned = True
-        elif tournament["slots"][2] is None:
-            tournament["slots"][2] = user_id
-            slot = 2
-            slot_assigned = True
-        else:
-            # Both slots filled, overwrite slot 1 and clear slot 2
-            tournament["slots"][1] = user_id
-            tournament["slots"][2] = None
-            slot = 1
-            slot_assigned = True
+        try:
+            seats = matchmaker.submit(tournament_type, user_id, payment_key)
+        except Exception as e:
+            await context.bot.send_message(
+                ADMIN_ID,
+                f"❌ Could not seat user {user_id}: {e}\nTap Approve again to retry."
+            )
+            return
         
-        if slot_assigned:
-            # Notify user
+        for seat in seats:
+            assignment = seat.assignment
+            if assignment.duplicate:
+                # Already announced when this payment was first approved
+                continue
+            
+            if assignment.queued:
+                await context.bot.send_message(
+                    chat_id=seat.user_id,
+                    text=f"✅ <b>Registration Approved!</b>\n\n"
+                         f"🏆 Tournament: ₹{tournament_type}\n"
+                         f"⏳ All slots are currently full.\n"
+                         f"You are on the waiting list and will be seated when the next tournament opens.",
+                    parse_mode=ParseMode.HTML
+                )
+                continue
+            
             await context.bot.send_message(
-                chat_id=user_id,
+                chat_id=seat.user_id,
                 text=f"✅ <b>Registration Approved!</b>\n\n"
                      f"🏆 Tournament: ₹{tournament_type}\n"
-                     f"🎯 Slot: {slot}\n"
+                     f"🎯 Slot: {assignment.slot}\n"
                      f"🏅 Prize: ₹{tournament['prize']}\n\n"
                      f"Good luck in the tournament!",
                 parse_mode=ParseMode.HTML
             )
             
-            # Remove from waiting list
-            if user_id in waiting_approvals[tournament_type]:
-                waiting_approvals[tournament_type].remove(user_id)
-            
+            if seat.lineup:
+                await context.bot.send_message(
+                    GROUP_CHAT_ID,
+                    render_fixtures(tournament_type, assignment.bracket, tournament['format'], seat.lineup),
+                    parse_mode=ParseMode.HTML
+                )
+        
+        if any(not seat.assignment.duplicate for seat in seats):
             # Update group
             await update_group(context, tournament_type)
-            
-            # Update admin message
+        
+        approved = next((seat for seat in seats if seat.user_id == user_id), None)
+        if approved is not None and approved.assignment.duplicate:
+            await query.edit_message_text(
+                f"ℹ️ <b>Already approved</b>\n\n"
+                f"This payment was already registered for the ₹{tournament_type} Tournament",
+                parse_mode=ParseMode.HTML
+            )
+        elif approved is None:
+            await query.edit_message_text(
+                f"⏳ <b>Approved</b>\n\n"
+                f"User is queued for the ₹{tournament_type} Tournament",
+                parse_mode=ParseMode.HTML
+            )
+        elif approved.assignment.queued:
+            await query.edit_message_text(
+                f"⏳ <b>Approved</b>\n\n"
+                f"₹{tournament_type} Tournament is full, user added to the waiting list",
+                parse_mode=ParseMode.HTML
+            )
+        else:
             await query.edit_message_text(
                 f"✅ <b>Approved</b>\n\n"
-                f"User assigned to ₹{tournament_type} Tournament, Slot {slot}",
+                f"User assigned to ₹{tournament_type} Tournament, Slot {approved.assignment.slot}",
                 parse_mode=ParseMode.HTML
             )
     
@@ -376,82 +579,273 @@ async def approve_decline_callback(update: Update, context: CallbackContext):
         await query.edit_message_text("❌ Registration declined.")
 
 async def update_group(context: CallbackContext, tournament_type: int):
-    """Update group with current tournament slots"""
-    tournament = TOURNAMENTS[tournament_type]
+    """Update group with current tournament slots
+
+    Edits the tier's pinned slot board in place; changes that arrive within
+    the debounce window are folded into one edit.
+    """
+    try:
+        board_updater.schedule(context.bot, tournament_type)
+        logger.info(f"Group update scheduled for ₹{tournament_type} tournament")
+    except Exception as e:
+        logger.error(f"Error updating group: {e}")
+        await context.bot.send_message(
+            ADMIN_ID,
+            f"❌ Error updating group: {e}"
+        )
+
+def start_filled_brackets(tournament_type: int) -> List[Dict]:
+    """Start brackets for every filled tournament of a tier; returns them with their store info"""
+    running = []
+    for info in store.filled_brackets(tournament_type):
+        bracket = brackets.start(info['id'], TOURNAMENTS[tournament_type]['format'], info['players'])
+        running.append(dict(info, bracket=bracket))
+    return running
+
+def player_link(user_id: int) -> str:
+    if user_id == BYE:
+        return "BYE"
+    return f'<a href="tg://user?id={user_id}">Player {user_id}</a>'
+
+async def bracket_command(update: Update, context: CallbackContext) -> None:
+    """Handle /bracket command: show the open matches of running brackets"""
+    lines = []
+    
+    for tournament_type in TOURNAMENTS:
+        for info in start_filled_brackets(tournament_type):
+            bracket = info['bracket']
+            lines.append(f"🏆 <b>₹{tournament_type} Tournament #{info['number']}</b> (bracket {info['id']})")
+            for match in bracket.ready_matches():
+                lines.append(
+                    f"⚽ Match {match.match_id} (round {match.round}): "
+                    f"{player_link(match.player_a)} vs {player_link(match.player_b)}"
+                )
+            lines.append("")
+    
+    if not lines:
+        await update.message.reply_text("⏳ No tournament is full yet. Use /register to join one!")
+        return
     
-    message = f"🛑 <b>₹{tournament_type} Tournament Slots</b> 🛑\n\n"
+    await update.message.reply_text("\n".join(lines).strip(), parse_mode=ParseMode.HTML)
+
+async def result_command(update: Update, context: CallbackContext) -> None:
+    """Handle /result <bracket> <match> <winner_id> (admin only)"""
+    if update.effective_user.id != ADMIN_ID:
+        await update.message.reply_text("❌ Only the admin can report results.")
+        return
     
-    for slot, user_id in tournament["slots"].items():
-        if user_id:
-            player = f'<a href="tg://user?id={user_id}">Player {user_id}</a>'
-        else:
-            player = "_______"
-        message += f"⚽ Slot {slot}: {player}\n"
+    try:
+        bracket_id, match_id, winner = (int(arg) for arg in context.args)
+    except ValueError:
+        await update.message.reply_text("Usage: /result <bracket> <match> <winner_user_id>")
+        return
     
-    message += f"\n🏆 Winner receives ₹{tournament['prize']}. All the best!"
+    tournament_type = next(
+        (t for t in TOURNAMENTS for info in start_filled_brackets(t) if info['id'] == bracket_id),
+        None
+    )
+    if tournament_type is None:
+        await update.message.reply_text(f"❌ Bracket {bracket_id} is not running.")
+        return
     
     try:
+        touched = brackets.report(bracket_id, match_id, winner)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    
+    bracket = brackets.get(bracket_id)
+    lines = [f"✅ Result recorded: {player_link(winner)} won match {match_id}"]
+    for touched_id in touched[1:]:
+        match = bracket.match(touched_id)
+        if match.player_a > 0 and match.player_b > 0 and match.winner == 0:
+            lines.append(
+                f"⚽ Next: match {match.match_id}: "
+                f"{player_link(match.player_a)} vs {player_link(match.player_b)}"
+            )
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML)
+    
+    if bracket.champion is not None:
+        seated = store.finish_bracket(tournament_type, bracket_id, bracket.champion)
+        brackets.finish(bracket_id)
         await context.bot.send_message(
             GROUP_CHAT_ID,
-            message,
+            f"🏆 <b>₹{tournament_type} Tournament Champion</b> 🏆\n\n"
+            f"{player_link(bracket.champion)} wins ₹{TOURNAMENTS.prizes[tournament_type]}! Congratulations!",
             parse_mode=ParseMode.HTML
         )
-        logger.info(f"Group updated for ₹{tournament_type} tournament")
-    except Exception as e:
-        logger.error(f"Error updating group: {e}")
+        await seat_waiting_players(context, tournament_type, seated)
+        await update_group(context, tournament_type)
+
+async def seat_waiting_players(context: CallbackContext, tournament_type: int, seated: List) -> None:
+    """Tell waiting-list players the slot the next bracket gave them"""
+    for user_id, assignment in seated:
+        try:
+            await context.bot.send_message(
+                chat_id=user_id,
+                text=f"✅ <b>Registration Successful!</b>\n\n"
+                     f"🏆 Tournament: ₹{tournament_type} #{assignment.bracket}\n"
+                     f"🎯 Slot: {assignment.slot}\n"
+                     f"🏅 Prize: ₹{TOURNAMENTS.prizes[tournament_type]}\n\n"
+                     f"Your place on the waiting list came up. Good luck in the tournament!",
+                parse_mode=ParseMode.HTML
+            )
+        except Exception as e:
+            logger.error(f"Error notifying waiting user {user_id}: {e}")
+    
+    lineup = store.bracket_lineup(seated[0][1].bracket_id) if seated else None
+    if lineup:
         await context.bot.send_message(
-            ADMIN_ID,
-            f"❌ Error updating group: {e}"
+            GROUP_CHAT_ID,
+            render_fixtures(tournament_type, seated[0][1].bracket, TOURNAMENTS[tournament_type]['format'], lineup),
+            parse_mode=ParseMode.HTML
         )
 
+async def stats_command(update: Update, context: CallbackContext) -> None:
+    """Handle /stats command (admin only): user tracking footprint"""
+    if update.effective_user.id != ADMIN_ID:
+        return
+    
+    stats = users.stats()
+    messages = addressed_to_bot.stats()
+    processing = context.application.update_processor.stats()
+    await update.message.reply_text(
+        f"📊 <b>User Tracking</b>\n\n"
+        f"👥 Known users: {stats['known_users']}\n"
+        f"🗂 Cached users: {stats['cached_users']}\n"
+        f"⏰ Active cooldowns: {stats['cooldowns']}\n"
+        f"💾 Memory: {stats['memory_bytes'] / 1024:.1f} KiB\n\n"
+        f"💬 Group messages checked: {messages['checked']}\n"
+        f"🚫 Skipped without a handler: {messages['rejection_rate']:.1%}\n"
+        f"⚙️ Updates in flight: {processing['in_flight']}/{processing['max_in_flight']}",
+        parse_mode=ParseMode.HTML
+    )
+
 async def handle_message(update: Update, context: CallbackContext):
-    """Handle general messages"""
-    message = update.message
-    message_type = message.chat.type
-    text = message.text.lower() if message.text else ""
-    
-    if message_type in ['group', 'supergroup']:
-        if BOT_USERNAME.lower() in text or (
-            message.reply_to_message and 
-            message.reply_to_message.from_user.id == context.bot.id
-        ):
-            await message.reply_text(
-                "🏆 To register for tournaments, use the /register command!"
-            )
+    """Answer group messages that mention or reply to the bot"""
+    await update.message.reply_text(
+        "🏆 To register for tournaments, use the /register command!"
+    )
 
 async def error_handler(update: Update, context: CallbackContext):
     """Handle errors"""
     logger.error(f'Update {update} caused error {context.error}')
 
-def main():
-    """Main function to start the bot"""
-    
-    if not TOKEN:
-        logger.error("TELEGRAM_TOKEN not found in environment variables")
+async def on_startup(application: Application) -> None:
+    """Start metrics, watch the tier config, resume brackets and follow the gateway's payment stream when running as a separate process"""
+    application.create_task(metrics.monitor_event_loop())
+    TOURNAMENTS.watch()
+    resume_brackets(application)
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    if GATEWAY_URL:
+        consumer = PaymentStreamConsumer(GATEWAY_URL, PAYMENT_STREAM_CONSUMER, application.process_update,
+                                         token=EVENT_STREAM_TOKEN)
+        application.create_task(consumer.run())
+        logger.info(f"Following payment events from {GATEWAY_URL}")
+
+async def on_shutdown(application: Application) -> None:
+    """Snapshot running brackets and release shared resources when the application stops"""
+    try:
+        brackets.snapshot()
+    except Exception as e:
+        logger.error(f"Error snapshotting brackets: {e}")
+    await PaymentGateway.close()
+
+def resume_brackets(application: Application) -> None:
+    """Bring running brackets back now rather than on the first /bracket or /result, and keep snapshotting them"""
+    brackets.restore(
+        (info['id'], TOURNAMENTS[tournament_type]['format'], info['players'])
+        for tournament_type in TOURNAMENTS for info in store.filled_brackets(tournament_type)
+    )
+    application.create_task(snapshot_brackets())
+
+async def snapshot_brackets() -> None:
+    """Snapshot changed brackets every BRACKET_SNAPSHOT_SECONDS, so a restart replays a short journal tail"""
+    if BRACKET_SNAPSHOT_SECONDS <= 0:
         return
+    while True:
+        await asyncio.sleep(BRACKET_SNAPSHOT_SECONDS)
+        try:
+            brackets.snapshot()
+        except Exception as e:
+            logger.error(f"Error snapshotting brackets: {e}")
+
+async def payment_received(update: PaymentEvent, context: CallbackContext) -> None:
+    """Handle a payment published by the gateway
+
+    The gateway has already seated and notified the player; the bot keeps
+    its own view in step, so the draw of a bracket the payment just filled
+    is ready before anyone asks for /bracket.
+    """
+    logger.info(f"Payment {update.payment_id} received for ₹{update.tournament_type} tournament")
     
-    logger.info('Starting eFootball Tournament Bot...')
+    if update.user_id:
+        users.mark_interacted(update.user_id)
     
-    # Create application
-    app = Application.builder().token(TOKEN).build()
+    if update.bracket_full:
+        start_filled_brackets(update.tournament_type)
+
+def build_application() -> Application:
+    """Create the bot application with all handlers registered"""
+    # Users are served concurrently; each user's own updates still run in order
+    processor = PerUserUpdateProcessor(CONCURRENT_UPDATES, MAX_UPDATES_IN_FLIGHT)
+    app = (
+        Application.builder()
+        .token(TOKEN)
+        .base_url(f"{TELEGRAM_API_URL}/bot")
+        .concurrent_updates(processor)
+        .update_queue(UpdateQueue(processor, maxsize=UPDATE_QUEUE_SIZE))
+        # Keeps replies within Telegram's send limits and waits out flood control instead of dropping them
+        .rate_limiter(AIORateLimiter(max_retries=TELEGRAM_MAX_RETRIES))
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
+    
+    metrics.callback('bot_update_queue_depth', 'Telegram updates waiting to be processed', app.update_queue.qsize)
+    metrics.callback('bot_updates_in_flight', 'Updates taken off the queue and not finished', lambda: processor.in_flight)
+    
+    # Reject abusive bursts before any handler calls Razorpay or Telegram
+    app.add_handler(RateLimitHandler(rate_limiter), group=-1)
     
     # Add handlers
-    app.add_handler(CommandHandler('start', start_command))
-    app.add_handler(CommandHandler('register', register_command))
+    app.add_handler(CommandHandler('start', instrumented(start_command)))
+    app.add_handler(CommandHandler('register', instrumented(register_command)))
+    app.add_handler(CommandHandler('bracket', instrumented(bracket_command)))
+    app.add_handler(CommandHandler('result', instrumented(result_command)))
+    app.add_handler(CommandHandler('stats', instrumented(stats_command)))
     
     # Callback handlers
-    app.add_handler(CallbackQueryHandler(start_registration_callback, pattern="start_registration"))
-    app.add_handler(CallbackQueryHandler(register_tournament_callback, pattern="register_"))
-    app.add_handler(CallbackQueryHandler(payment_security_callback, pattern="payment_security"))
-    app.add_handler(CallbackQueryHandler(back_to_payment_callback, pattern="back_to_payment"))
-    app.add_handler(CallbackQueryHandler(approve_decline_callback, pattern="(approve|decline)_"))
+    app.add_handler(CallbackQueryHandler(instrumented(start_registration_callback), pattern="start_registration"))
+    app.add_handler(CallbackQueryHandler(instrumented(register_tournament_callback), pattern="register_"))
+    app.add_handler(CallbackQueryHandler(instrumented(payment_security_callback), pattern="payment_security"))
+    app.add_handler(CallbackQueryHandler(instrumented(back_to_payment_callback), pattern="back_to_payment"))
+    app.add_handler(CallbackQueryHandler(instrumented(approve_decline_callback), pattern="(approve|decline)_"))
     
-    # Message handler
-    app.add_handler(MessageHandler(filters.TEXT, handle_message))
+    # Message handler; the filter drops ordinary group chatter at dispatch time
+    app.add_handler(MessageHandler(addressed_to_bot, instrumented(handle_message)))
+    
+    # Payments pushed by the gateway (in-process, or from its event stream)
+    app.add_handler(TypeHandler(PaymentEvent, instrumented(payment_received)))
     
     # Error handler
     app.add_error_handler(error_handler)
     
+    return app
+
+def main():
+    """Main function to start the bot"""
+    
+    if not TOKEN:
+        logger.error("TELEGRAM_TOKEN not found in environment variables")
+        return
+    
+    logger.info('Starting eFootball Tournament Bot...')
+    
+    # Create application
+    app = build_application()
+    
     # Start webhook
     PORT = int(os.getenv('PORT', '8443'))
     
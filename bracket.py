@@ -0,0 +1,398 @@
+import math
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+
+# Player slots hold Telegram user IDs; these two markers are never valid IDs
+EMPTY = 0  # not decided yet (waiting for an earlier match)
+BYE = -1   # no opponent; the other player advances automatically
+
+# A match feeds its winner/loser into ``target * 2 + side`` of another match
+NO_TARGET = -1
+
+FORMATS = ('single_elimination', 'double_elimination', 'swiss')
+
+
+class Match(NamedTuple):
+    """Read-only view of one match record"""
+    match_id: int
+    round: int
+    player_a: int
+    player_b: int
+    winner: int
+    section: str  # 'W' winners bracket, 'L' losers bracket, 'F' grand final, 'S' Swiss
+
+
+def _seed_positions(size: int) -> List[int]:
+    """Standard bracket seeding (1 vs 8, 4 vs 5, ...) as 0-based seed indices"""
+    positions = [0]
+    while len(positions) < size:
+        mirrored = len(positions) * 2 - 1
+        positions = [seed for position in positions for seed in (position, mirrored - position)]
+    return positions
+
+
+class Bracket:
+    """Base class: matches stored as parallel typed arrays
+
+    Every match is one index into a handful of compact arrays instead of a
+    Python object per match, so a 64-player bracket costs a few kilobytes and
+    thousands of brackets fit comfortably in memory. Reporting a result only
+    walks the winner's and loser's outgoing edges.
+    """
+
+    __slots__ = ('players', 'player_a', 'player_b', 'winner', 'round', 'win_to', 'lose_to',
+                 'section', '_ready')
+
+    format = ''
+
+    def __init__(self, players: Iterable[int]):
+        self.players: List[int] = [player for player in players if player not in (EMPTY, BYE)]
+        if len(self.players) < 2:
+            raise ValueError("A bracket needs at least two players")
+        self.player_a = array('q')
+        self.player_b = array('q')
+        self.winner = array('q')
+        self.round = array('h')
+        self.win_to = array('i')
+        self.lose_to = array('i')
+        self.section = bytearray()
+        self._ready: Set[int] = set()
+
+    def _add_match(self, round_number: int, section: str) -> int:
+        self.player_a.append(EMPTY)
+        self.player_b.append(EMPTY)
+        self.winner.append(EMPTY)
+        self.round.append(round_number)
+        self.win_to.append(NO_TARGET)
+        self.lose_to.append(NO_TARGET)
+        self.section.append(ord(section))
+        return len(self.winner) - 1
+
+    def __len__(self) -> int:
+        return len(self.winner)
+
+    def match(self, match_id: int) -> Match:
+        return Match(match_id, self.round[match_id], self.player_a[match_id], self.player_b[match_id],
+                     self.winner[match_id], chr(self.section[match_id]))
+
+    def matches(self) -> List[Match]:
+        return [self.match(match_id) for match_id in range(len(self))]
+
+    def ready_matches(self) -> List[Match]:
+        """Matches with both players known and no result yet"""
+        return [self.match(match_id) for match_id in sorted(self._ready)]
+
+    def _place(self, target: int, player: int, touched: List[int]) -> None:
+        """Put a player into ``target`` (match * 2 + side) and resolve byes"""
+        if target == NO_TARGET:
+            return
+        match_id, side = divmod(target, 2)
+        if side == 0:
+            self.player_a[match_id] = player
+        else:
+            self.player_b[match_id] = player
+        touched.append(match_id)
+        self._check_ready(match_id, touched)
+
+    def _check_ready(self, match_id: int, touched: List[int]) -> None:
+        a, b = self.player_a[match_id], self.player_b[match_id]
+        if a == EMPTY or b == EMPTY or self.winner[match_id] != EMPTY:
+            return
+        if a == BYE or b == BYE:
+            # Walkover: the real player (or another bye) moves on without a result
+            self._resolve(match_id, b if a == BYE else a, BYE, touched)
+        else:
+            self._ready.add(match_id)
+
+    def _resolve(self, match_id: int, winner: int, loser: int, touched: List[int]) -> None:
+        self.winner[match_id] = winner
+        self._ready.discard(match_id)
+        self._place(self.win_to[match_id], winner, touched)
+        self._place(self.lose_to[match_id], loser, touched)
+
+    def report(self, match_id: int, winner: int) -> List[int]:
+        """Record a result and advance players; returns the IDs of matches that changed"""
+        if match_id not in self._ready:
+            raise ValueError(f"Match {match_id} is not waiting for a result")
+        a, b = self.player_a[match_id], self.player_b[match_id]
+        if winner not in (a, b):
+            raise ValueError(f"Player {winner} is not in match {match_id}")
+        touched = [match_id]
+        self._resolve(match_id, winner, b if winner == a else a, touched)
+        return touched
+
+    @property
+    def champion(self) -> Optional[int]:
+        """The winner once the bracket is decided; formats override this"""
+        return None
+
+    @property
+    def is_complete(self) -> bool:
+        return self.champion is not None
+
+
+class SingleElimination(Bracket):
+    """Knock-out bracket padded with byes to the next power of two"""
+
+    __slots__ = ('final', '_first_round')
+
+    format = 'single_elimination'
+
+    def __init__(self, players: Iterable[int]):
+        super().__init__(players)
+        self.final = self._build_winners_bracket('W')
+        self._seed()
+
+    def _build_winners_bracket(self, section: str) -> int:
+        """Create all knock-out rounds; returns the final's match ID"""
+        size = 1 << math.ceil(math.log2(len(self.players)))
+        previous: List[int] = []
+        round_number = 1
+        count = size // 2
+        while count >= 1:
+            current = [self._add_match(round_number, section) for _ in range(count)]
+            for index, match_id in enumerate(previous):
+                self.win_to[match_id] = current[index // 2] * 2 + index % 2
+            previous = current
+            count //= 2
+            round_number += 1
+        self._first_round = size // 2
+        return previous[0]
+
+    def _seed(self) -> None:
+        size = self._first_round * 2
+        touched: List[int] = []
+        for position, seed in enumerate(_seed_positions(size)):
+            player = self.players[seed] if seed < len(self.players) else BYE
+            self._place(position, player, touched)
+
+    @property
+    def champion(self) -> Optional[int]:
+        winner = self.winner[self.final]
+        return winner if winner > 0 else None
+
+
+class DoubleElimination(SingleElimination):
+    """Winners and losers brackets, a grand final and a possible reset match"""
+
+    __slots__ = ('grand_final', 'reset_match')
+
+    format = 'double_elimination'
+
+    def __init__(self, players: Iterable[int]):
+        Bracket.__init__(self, players)
+        winners_final = self._build_winners_bracket('W')
+        size = self._first_round * 2
+        levels = int(math.log2(size))
+        first_round_ids = list(range(self._first_round))
+        winners_rounds = [first_round_ids]
+        match_id = self._first_round
+        count = self._first_round // 2
+        while count >= 1:
+            winners_rounds.append(list(range(match_id, match_id + count)))
+            match_id += count
+            count //= 2
+
+        self.grand_final = self._add_match(levels + 1, 'F')
+        self.reset_match = self._add_match(levels + 2, 'F')
+        self.win_to[winners_final] = self.grand_final * 2
+
+        if levels == 1:
+            # Two players: the loser of the only match goes straight to the grand final
+            self.lose_to[winners_final] = self.grand_final * 2 + 1
+        else:
+            # Losers round 1: losers of winners round 1, paired up
+            losers_round = 1
+            current = [self._add_match(losers_round, 'L') for _ in range(len(first_round_ids) // 2)]
+            for index, source in enumerate(first_round_ids):
+                self.lose_to[source] = current[index // 2] * 2 + index % 2
+
+            for level in range(1, levels):
+                # Drop-in round: losers-bracket survivors meet the losers of the next winners round.
+                # The winners-bracket losers are fed in reverse order to avoid immediate rematches.
+                losers_round += 1
+                dropping = winners_rounds[level]
+                drop_in = [self._add_match(losers_round, 'L') for _ in range(len(dropping))]
+                for index, source in enumerate(current):
+                    self.win_to[source] = drop_in[index] * 2
+                for index, source in enumerate(reversed(dropping)):
+                    self.lose_to[source] = drop_in[index] * 2 + 1
+                current = drop_in
+
+                if len(current) > 1:
+                    losers_round += 1
+                    reduced = [self._add_match(losers_round, 'L') for _ in range(len(current) // 2)]
+                    for index, source in enumerate(current):
+                        self.win_to[source] = reduced[index // 2] * 2 + index % 2
+                    current = reduced
+
+            self.win_to[current[0]] = self.grand_final * 2 + 1
+
+        self._seed()
+
+    def report(self, match_id: int, winner: int) -> List[int]:
+        touched = super().report(match_id, winner)
+        if match_id == self.grand_final:
+            touched.append(self.reset_match)
+            if winner == self.player_b[match_id]:
+                # The losers-bracket champion handed the winners-bracket champion its first loss
+                self._place(self.reset_match * 2, self.player_a[match_id], touched)
+                self._place(self.reset_match * 2 + 1, winner, touched)
+            else:
+                self.winner[self.reset_match] = BYE
+        return touched
+
+    @property
+    def champion(self) -> Optional[int]:
+        reset = self.winner[self.reset_match]
+        if reset > 0:
+            return reset
+        if reset == BYE:
+            return self.winner[self.grand_final]
+        return None
+
+
+class Swiss(Bracket):
+    """Fixed number of rounds; each round pairs players with equal scores
+
+    A result only changes the two players' scores. The next round is paired
+    once every match of the current round has a result.
+    """
+
+    __slots__ = ('rounds', 'current_round', 'scores', 'opponents', 'had_bye', '_open')
+
+    format = 'swiss'
+
+    def __init__(self, players: Iterable[int], rounds: Optional[int] = None):
+        super().__init__(players)
+        self.rounds = rounds or math.ceil(math.log2(len(self.players)))
+        self.current_round = 0
+        self.scores: Dict[int, int] = {player: 0 for player in self.players}
+        self.opponents: Dict[int, Set[int]] = {player: set() for player in self.players}
+        self.had_bye: Set[int] = set()
+        self._open = 0
+        self._pair_next_round([])
+
+    def _pair_next_round(self, touched: List[int]) -> None:
+        self.current_round += 1
+        seed = {player: index for index, player in enumerate(self.players)}
+        standings = sorted(self.players, key=lambda player: (-self.scores[player], seed[player]))
+
+        if len(standings) % 2:
+            # Bye for the lowest-ranked player who has not had one yet
+            bye_player = next((player for player in reversed(standings) if player not in self.had_bye),
+                              standings[-1])
+            standings.remove(bye_player)
+            self.had_bye.add(bye_player)
+            self.scores[bye_player] += 1
+            match_id = self._add_match(self.current_round, 'S')
+            self.player_a[match_id] = bye_player
+            self.player_b[match_id] = BYE
+            self.winner[match_id] = bye_player
+            touched.append(match_id)
+
+        pairs = self._pairings(standings)
+        if pairs is None:
+            # Every pairing repeats a match (more rounds than opponents allow): rematch top-down
+            pairs = list(zip(standings[::2], standings[1::2]))
+        for first, second in pairs:
+            match_id = self._add_match(self.current_round, 'S')
+            self.player_a[match_id] = first
+            self.player_b[match_id] = second
+            self.opponents[first].add(second)
+            self.opponents[second].add(first)
+            self._ready.add(match_id)
+            self._open += 1
+            touched.append(match_id)
+
+    def _pairings(self, standings: List[int]) -> Optional[List[tuple]]:
+        """Pair players top-down, each with the best-ranked player they have not met
+
+        Backtracks when a choice would leave lower-ranked players with only
+        rematches; returns None if no pairing avoids one.
+        """
+        if not standings:
+            return []
+        first, rest = standings[0], standings[1:]
+        for index, second in enumerate(rest):
+            if second in self.opponents[first]:
+                continue
+            pairs = self._pairings(rest[:index] + rest[index + 1:])
+            if pairs is not None:
+                return [(first, second)] + pairs
+        return None
+
+    def report(self, match_id: int, winner: int) -> List[int]:
+        if match_id not in self._ready:
+            raise ValueError(f"Match {match_id} is not waiting for a result")
+        if winner not in (self.player_a[match_id], self.player_b[match_id]):
+            raise ValueError(f"Player {winner} is not in match {match_id}")
+        self.winner[match_id] = winner
+        self._ready.discard(match_id)
+        self.scores[winner] += 1
+        self._open -= 1
+        touched = [match_id]
+        if self._open == 0 and self.current_round < self.rounds:
+            self._pair_next_round(touched)
+        return touched
+
+    def standings(self) -> List[tuple]:
+        """``[(player, score), ...]`` best first"""
+        seed = {player: index for index, player in enumerate(self.players)}
+        return sorted(self.scores.items(), key=lambda item: (-item[1], seed[item[0]]))
+
+    @property
+    def champion(self) -> Optional[int]:
+        if self._open or self.current_round < self.rounds:
+            return None
+        return self.standings()[0][0]
+
+
+def create_bracket(format: str, players: Iterable[int]) -> Bracket:
+    """Build a bracket of the given format for players listed in seed order"""
+    if format == 'single_elimination':
+        return SingleElimination(players)
+    if format == 'double_elimination':
+        return DoubleElimination(players)
+    if format == 'swiss':
+        return Swiss(players)
+    raise ValueError(f"Unknown bracket format '{format}'")
+
+
+class BracketRegistry:
+    """All running brackets in this process, keyed by the store's bracket ID"""
+
+    def __init__(self):
+        self._brackets: Dict[int, Bracket] = {}
+
+    def __contains__(self, bracket_id: int) -> bool:
+        return bracket_id in self._brackets
+
+    def __len__(self) -> int:
+        return len(self._brackets)
+
+    def get(self, bracket_id: int) -> Optional[Bracket]:
+        return self._brackets.get(bracket_id)
+
+    def start(self, bracket_id: int, format: str, players: Iterable[int]) -> Bracket:
+        """Create the bracket for a filled tournament instance (idempotent)"""
+        bracket = self._brackets.get(bracket_id)
+        if bracket is None:
+            bracket = create_bracket(format, players)
+            self._brackets[bracket_id] = bracket
+        return bracket
+
+    def add(self, bracket_id: int, bracket: Bracket) -> Bracket:
+        """Register a bracket restored from elsewhere, e.g. a snapshot"""
+        self._brackets[bracket_id] = bracket
+        return bracket
+
+    def report(self, bracket_id: int, match_id: int, winner: int) -> List[int]:
+        bracket = self._brackets.get(bracket_id)
+        if bracket is None:
+            raise KeyError(f"No running bracket {bracket_id}")
+        return bracket.report(match_id, winner)
+
+    def finish(self, bracket_id: int) -> Optional[Bracket]:
+        """Drop a completed bracket from memory"""
+        return self._brackets.pop(bracket_id, None)
@@ -0,0 +1,128 @@
+import time
+import pickle
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from bracket import Bracket, BracketRegistry, create_bracket
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+
+class BracketJournal:
+    """Running brackets whose reported results survive restarts
+
+    Every result is appended to a journal in the store before it is
+    acknowledged. From time to time ``snapshot`` stores each changed bracket
+    as a pickled image together with the last journal entry it includes.
+    Bringing a bracket back after a restart loads its snapshot and replays
+    only the journal entries after it; without a usable snapshot (none yet,
+    or one written by an older version of ``bracket.py``) the fixtures are
+    drawn again and the whole journal is replayed. Draws are deterministic,
+    so both paths rebuild the same bracket. Snapshots are only ever read
+    back from this process's own store.
+
+    The format a bracket was drawn in is recorded when it starts, so a
+    config reload that changes a tier's format only affects new brackets.
+    """
+
+    def __init__(self, store: SlotStore):
+        self.store = store
+        self.registry = BracketRegistry()
+        self._journaled: Dict[int, int] = {}  # bracket ID -> last journal ID applied
+        self._snapshotted: Dict[int, int] = {}  # bracket ID -> last journal ID in the stored snapshot
+        self._lock = threading.Lock()
+
+    def __contains__(self, bracket_id: int) -> bool:
+        return bracket_id in self.registry
+
+    def __len__(self) -> int:
+        return len(self.registry)
+
+    def get(self, bracket_id: int) -> Optional[Bracket]:
+        return self.registry.get(bracket_id)
+
+    def start(self, bracket_id: int, format: str, players: Iterable[int]) -> Bracket:
+        """Bring back or draw the bracket of a filled tournament instance (idempotent)"""
+        bracket = self.registry.get(bracket_id)
+        if bracket is not None:
+            return bracket
+        with self._lock:
+            bracket = self.registry.get(bracket_id)
+            if bracket is None:
+                bracket = self.registry.add(bracket_id, self._restore(bracket_id, format, list(players)))
+            return bracket
+
+    def _restore(self, bracket_id: int, format: str, players: List[int]) -> Bracket:
+        bracket, applied = None, 0
+        snapshot = self.store.get_bracket_snapshot(bracket_id)
+        if snapshot is not None:
+            try:
+                bracket = pickle.loads(snapshot[1])
+                applied = self._snapshotted[bracket_id] = snapshot[0]
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable snapshot of bracket {bracket_id}, replaying its journal: {e}")
+        if bracket is None:
+            bracket = create_bracket(self.store.start_bracket(bracket_id, format), players)
+
+        for result_id, match_id, winner in self.store.bracket_results(bracket_id, applied):
+            try:
+                bracket.report(match_id, winner)
+            except ValueError as e:
+                logger.error(f"Skipping journaled result {result_id} of bracket {bracket_id}: {e}")
+            applied = result_id
+        self._journaled[bracket_id] = applied
+        return bracket
+
+    def report(self, bracket_id: int, match_id: int, winner: int) -> List[int]:
+        """Record a result: applied in memory, then journaled; returns the IDs of matches that changed"""
+        with self._lock:
+            touched = self.registry.report(bracket_id, match_id, winner)
+            try:
+                self._journaled[bracket_id] = self.store.append_bracket_result(bracket_id, match_id, winner)
+            except Exception:
+                # Not durable, so not recorded: the bracket is rebuilt from the journal on next use
+                self.registry.finish(bracket_id)
+                self._journaled.pop(bracket_id, None)
+                self._snapshotted.pop(bracket_id, None)
+                raise
+            return touched
+
+    def finish(self, bracket_id: int) -> Optional[Bracket]:
+        """Drop a completed bracket from memory (``SlotStore.finish_bracket`` drops its snapshot)"""
+        with self._lock:
+            self._journaled.pop(bracket_id, None)
+            self._snapshotted.pop(bracket_id, None)
+            return self.registry.finish(bracket_id)
+
+    def snapshot(self) -> int:
+        """Store a snapshot of every bracket changed since its last one; returns how many were written"""
+        with self._lock:
+            changed = [
+                (bracket_id, applied, pickle.dumps(self.registry.get(bracket_id), protocol=pickle.HIGHEST_PROTOCOL))
+                for bracket_id, applied in self._journaled.items()
+                if self._snapshotted.get(bracket_id) != applied
+            ]
+        if not changed:
+            return 0
+        self.store.save_bracket_snapshots(changed)
+        with self._lock:
+            for bracket_id, applied, _ in changed:
+                if bracket_id in self._journaled:
+                    self._snapshotted[bracket_id] = applied
+        return len(changed)
+
+    def restore(self, filled: Iterable[tuple]) -> int:
+        """Warm start: bring back ``(bracket_id, format, players)`` brackets; returns how many"""
+        started = time.perf_counter()
+        count = 0
+        for bracket_id, format, players in filled:
+            try:
+                self.start(bracket_id, format, players)
+                count += 1
+            except Exception as e:
+                logger.error(f"Error restoring bracket {bracket_id}: {e}")
+        if count:
+            logger.info(f"Restored {count} running brackets in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return count
@@ -0,0 +1,176 @@
+import json
+import time
+import asyncio
+import threading
+import logging
+from typing import Awaitable, Callable, Final, List, NamedTuple, Optional
+
+import httpx
+
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+# Events stay in the stream this long (and until every active consumer has acknowledged them)
+DEFAULT_RETENTION: Final = 7 * 24 * 60 * 60
+# Publishes between purges of expired events
+PURGE_EVERY: Final = 1000
+
+
+class PaymentEvent(NamedTuple):
+    """A confirmed payment, as handed from the gateway to the bot"""
+    event_id: int  # position in the payment event stream
+    payment_id: str
+    user_id: Optional[int]
+    tournament_type: int
+    amount: int
+    payment_link_id: Optional[str]
+    bracket_full: bool  # the payment completed a bracket's lineup
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict())
+
+    @classmethod
+    def from_json(cls, event_id: int, payload: str) -> 'PaymentEvent':
+        return cls(**dict(json.loads(payload), event_id=event_id))
+
+
+class PaymentChannel:
+    """Payment events from the gateway's webhook workers to the bot
+
+    Every event is appended to a durable stream in the store before it is
+    handed to in-process subscribers (the unified runtime). Consumers in
+    other processes long-poll the stream with ``read`` and acknowledge what
+    they have handled; unacknowledged events are delivered again, so
+    delivery is at-least-once and consumers skip IDs they have already seen.
+
+    Subscribers are called on the publishing worker thread, so anything that
+    belongs to an event loop must hand the event over itself (the unified
+    runtime uses ``asyncio.run_coroutine_threadsafe``).
+
+    Every ``PURGE_EVERY`` publishes, events older than ``retention`` that
+    all active consumers have acknowledged are deleted from the stream.
+    """
+
+    def __init__(self, store: SlotStore, poll_interval: float = 0.25, retention: int = DEFAULT_RETENTION):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._subscribers: List[Callable[[PaymentEvent], None]] = []
+        self._lock = threading.Lock()
+        self._appended = threading.Condition()
+        self._published_since_purge = 0
+
+    def subscribe(self, callback: Callable[[PaymentEvent], None]) -> None:
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def publish(self, event: PaymentEvent) -> PaymentEvent:
+        """Append an event to the stream and deliver it to subscribers"""
+        event_id = self.store.append_payment_event(event.payment_id, event.to_json())
+        event = event._replace(event_id=event_id)
+        self._maybe_purge()
+
+        with self._appended:
+            self._appended.notify_all()
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Error delivering payment event {event.payment_id}: {e}")
+        return event
+
+    def _maybe_purge(self) -> None:
+        with self._lock:
+            self._published_since_purge += 1
+            if self._published_since_purge < PURGE_EVERY:
+                return
+            self._published_since_purge = 0
+        self.purge()
+
+    def purge(self) -> int:
+        """Delete expired events every active consumer has acknowledged; returns the number removed"""
+        try:
+            removed = self.store.purge_payment_events(int(time.time()) - self.retention)
+            if removed:
+                logger.info(f"Purged {removed} expired payment events")
+            return removed
+        except Exception as e:
+            logger.error(f"Error purging payment events: {e}")
+            return 0
+
+    def read(self, consumer: str, after: Optional[int] = None, timeout: float = 0.0,
+             limit: int = 100) -> List[PaymentEvent]:
+        """Return events past the consumer's offset, waiting up to ``timeout`` for one
+
+        Events published by this process wake the reader at once; events
+        from other gateway workers are picked up by polling the store.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            rows = self.store.read_payment_events(consumer, after, limit)
+            remaining = deadline - time.monotonic()
+            if rows or remaining <= 0:
+                return [PaymentEvent.from_json(event_id, payload) for event_id, payload in rows]
+            with self._appended:
+                self._appended.wait(min(remaining, self.poll_interval))
+
+    def ack(self, consumer: str, event_id: int) -> int:
+        """Acknowledge events up to ``event_id``; returns the consumer's offset"""
+        return self.store.ack_payment_events(consumer, event_id)
+
+
+class PaymentStreamConsumer:
+    """Follows the gateway's payment event stream from another process
+
+    Long-polls ``/payment-events``, awaits ``handler`` for each event in
+    order and then acknowledges it, so a crash between the two only leads to
+    a redelivery. IDs at or below the last one handled are skipped.
+    """
+
+    def __init__(self, gateway_url: str, consumer: str, handler: Callable[[PaymentEvent], Awaitable[None]],
+                 token: Optional[str] = None, poll_timeout: float = 25.0):
+        self.gateway_url = gateway_url.rstrip('/')
+        self.consumer = consumer
+        self.handler = handler
+        self.poll_timeout = poll_timeout
+        self.last_event_id = 0
+        self._headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+    async def run(self) -> None:
+        """Consume events until cancelled"""
+        delay = 1.0
+        async with httpx.AsyncClient(base_url=self.gateway_url, headers=self._headers,
+                                     timeout=self.poll_timeout + 10) as client:
+            while True:
+                try:
+                    await self._poll(client)
+                    delay = 1.0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Payment stream unavailable, retrying in {delay:.0f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 30.0)
+
+    async def _poll(self, client: httpx.AsyncClient) -> None:
+        response = await client.get('/payment-events', params={
+            'consumer': self.consumer,
+            'timeout': self.poll_timeout
+        })
+        response.raise_for_status()
+
+        for data in response.json()['events']:
+            event = PaymentEvent(**data)
+            if event.event_id <= self.last_event_id:
+                continue
+            await self.handler(event)
+            self.last_event_id = event.event_id
+            response = await client.post('/payment-events/ack', json={
+                'consumer': self.consumer,
+                'event_id': event.event_id
+            })
+            response.raise_for_status()
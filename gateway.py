@@ -1,123 +1,227 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 import os
-import asyncio
+import sys
 import logging
 from datetime import datetime
-import requests
 import hmac
-import hashlib
-import json
 import threading
 import time
+import atexit
+import signal
+from store import SlotStore
+from work_queue import WorkerPool
+from idempotency import IdempotencyGuard
+from telegram_dispatcher import TelegramDispatcher
+from slot_board import SlotBoard, ThreadedBoardUpdater
+from tournament_config import tournament_catalog
+from matchmaking import Matchmaker, Seat, render_fixtures
+from events import PaymentChannel, PaymentEvent
+import metrics
+from tracing import Tracer, DEFAULT_TRACE_FILE, DEFAULT_TRACE_MAX_BYTES
+from webhooks import WebhookEvent, parse_webhook, verify_signature
+from typing import List, Optional
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+STARTED_AT = time.time()
 
 # Environment variables
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '1181844922'))
 GROUP_CHAT_ID = os.getenv('GROUP_CHAT_ID', '-1002143662557')
 PAYMENT_GATEWAY_SECRET = os.getenv('PAYMENT_GATEWAY_SECRET')
+WEBHOOK_SECRET = PAYMENT_GATEWAY_SECRET.encode('utf-8') if PAYMENT_GATEWAY_SECRET else None
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+BOARD_DEBOUNCE_SECONDS = float(os.getenv('BOARD_DEBOUNCE_SECONDS', '2'))
 
-# Global variables for bot communication
+# Webhook events processed by the background worker pool
+HANDLED_EVENTS = ('payment_link.paid', 'payment.captured')
+# Events that only retire a cached payment link
+LINK_CLOSED_EVENTS = ('payment_link.expired', 'payment_link.cancelled')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+# Days processed and failed webhook events are kept before they are purged
+WEBHOOK_RETENTION_DAYS = float(os.getenv('WEBHOOK_RETENTION_DAYS', '7'))
 
+# Tournament configuration (tournaments.json), reloaded when the file changes
+TOURNAMENTS = tournament_catalog()
 
-# Tournament slots tracking
-TOURNAMENTS = {
-    15: {"slots": {1: None, 2: None}, "prize": 25},
-    30: {"slots": {1: None, 2: None}, "prize": 50},
-    50: {"slots": {1: None, 2: None}, "prize": 80},
-}
+# Slot boards live in the store shared with bot.py
+store = SlotStore()
+store.ensure_tournaments(TOURNAMENTS)
+TOURNAMENTS.on_reload(store.ensure_tournaments)
 
-def assign_tournament_slot(user_id: int, tournament_type: int) -> dict:
-    """Assign user to tournament slot"""
-    try:
-        tournament = TOURNAMENTS[tournament_type]
+# Rate-limited outbound Telegram queue; the rate buckets are shared by every gateway worker
+telegram_dispatcher = TelegramDispatcher(TELEGRAM_TOKEN, api_url=TELEGRAM_API_URL, store=store)
+
+# Pinned per-tier slot boards in the group, edited in place
+board_updater = ThreadedBoardUpdater(
+    SlotBoard(store, TOURNAMENTS, GROUP_CHAT_ID),
+    telegram_dispatcher,
+    delay=BOARD_DEBOUNCE_SECONDS
+)
+
+# Paid players are seated automatically; only disputed payments reach the admin
+matchmaker = Matchmaker(store, TOURNAMENTS)
+ADMIN_APPROVAL_FOR_DISPUTES = os.getenv('ADMIN_APPROVAL_FOR_DISPUTES', 'false').lower() in ('1', 'true', 'yes')
+
+# Confirmed payments are published here: the unified runtime (runtime.py) subscribes
+# in-process, a separate bot process follows the stream at /payment-events.
+# Acknowledged events are deleted after PAYMENT_EVENT_RETENTION_DAYS
+PAYMENT_EVENT_RETENTION_DAYS = float(os.getenv('PAYMENT_EVENT_RETENTION_DAYS', '7'))
+payment_channel = PaymentChannel(store, retention=int(PAYMENT_EVENT_RETENTION_DAYS * 24 * 60 * 60))
+EVENT_STREAM_TOKEN = os.getenv('EVENT_STREAM_TOKEN')
+
+# Collapses Razorpay retries and paid/captured pairs for the same payment
+idempotency = IdempotencyGuard(store)
+
+# Instrumentation, scraped from /metrics
+WEBHOOK_REQUEST_SECONDS = metrics.histogram('gateway_webhook_request_seconds',
+                                            'Time to verify and queue a Razorpay webhook, by HTTP status', ['status'])
+WEBHOOK_PROCESSING_SECONDS = metrics.histogram('gateway_webhook_processing_seconds',
+                                               'Time a worker spends on a queued webhook, by outcome', ['outcome'])
+SIGNATURE_SECONDS = metrics.histogram('gateway_signature_verification_seconds', 'Razorpay webhook signature checks')
+SLOT_ASSIGNMENT_SECONDS = metrics.histogram('gateway_slot_assignment_seconds',
+                                            'Time to queue a paid player and seat everyone who fits')
+
+# Registration traces started by the bot come back in the payment notes
+tracer = Tracer(os.getenv('TRACE_FILE', DEFAULT_TRACE_FILE), service='gateway',
+                max_bytes=int(os.getenv('TRACE_MAX_BYTES', str(DEFAULT_TRACE_MAX_BYTES))))
+
+def seat_players(tournament_type: int, seats: List[Seat], payment_link_id: str = None,
+                 trace_id: Optional[str] = None) -> None:
+    """Announce players placed by the matchmaker (the store has already recorded them)"""
+    prize = TOURNAMENTS.prizes[tournament_type]
+    
+    for seat in seats:
+        assignment = seat.assignment
+        
+        if assignment.duplicate:
+            # Placed by an earlier delivery of this payment, which sent the notifications
+            continue
+        
+        if assignment.queued:
+            # Paid players are never evicted; they are seated first when the next bracket opens
+            user_message = (
+                f"✅ <b>Payment Confirmed!</b>\n\n"
+                f"💰 Tournament: ₹{tournament_type}\n"
+                f"⏳ All slots are currently full.\n"
+                f"You are on the waiting list and will be seated when the next tournament opens."
+            )
+            send_telegram_message(seat.user_id, user_message, trace_id=trace_id)
+            continue
         
-        # Check if slot 1 is available
-        if tournament["slots"][1] is None:
-            tournament["slots"][1] = user_id
-            return {"slot": 1, "success": True}
-        # Check if slot 2 is available
-        elif tournament["slots"][2] is None:
-            tournament["slots"][2] = user_id
-            return {"slot": 2, "success": True}
+        if assignment.bracket > 1:
+            slot_label = f"{assignment.slot} (Tournament #{assignment.bracket})"
         else:
-            # Both slots filled, overwrite slot 1 and clear slot 2
-            tournament["slots"][1] = user_id
-            tournament["slots"][2] = None
-            return {"slot": 1, "success": True}
-            
-    except Exception as e:
-        logger.error(f"Error assigning slot: {e}")
-        return {"success": False}
-
-def update_tournament_group(tournament_type: int, user_id: int, slot: int):
-    """Update group with tournament slot information"""
-    try:
-        tournament = TOURNAMENTS[tournament_type]
+            slot_label = f"{assignment.slot}"
         
-        message = f"🛑 <b>₹{tournament_type} Tournament Slots</b> 🛑\n\n"
+        # Notify user of successful registration
+        user_message = (
+            f"✅ <b>Registration Successful!</b>\n\n"
+            f"🏆 Tournament: ₹{tournament_type}\n"
+            f"🎯 Slot: {slot_label}\n"
+            f"🏅 Prize: ₹{prize}\n\n"
+            f"Good luck in the tournament!"
+        )
+        send_telegram_message(seat.user_id, user_message, trace_id=trace_id)
         
-        for slot_num, player_id in tournament["slots"].items():
-            if player_id:
-                player = f'<a href="tg://user?id={player_id}">Player {player_id}</a>'
-            else:
-                player = "_______"
-            message += f"⚽ Slot {slot_num}: {player}\n"
+        # Update group with new slot assignment
+        update_tournament_group(tournament_type, seat.user_id, assignment.slot)
         
-        message += f"\n🏆 Winner receives ₹{tournament['prize']}. All the best!"
+        # Notify admin of automatic registration
+        admin_notification = (
+            f"✅ <b>Auto Registration Complete</b>\n\n"
+            f"👤 User: {seat.user_id}\n"
+            f"💰 Tournament: ₹{tournament_type}\n"
+            f"🎯 Assigned Slot: {slot_label}\n"
+            f"💳 Payment ID: {payment_link_id}"
+        )
+        send_telegram_message(ADMIN_ID, admin_notification, trace_id=trace_id)
         
-        send_telegram_message(GROUP_CHAT_ID, message)
-        logger.info(f"Group updated for ₹{tournament_type} tournament")
+        if seat.lineup:
+            send_telegram_message(GROUP_CHAT_ID, render_fixtures(
+                tournament_type, assignment.bracket, TOURNAMENTS[tournament_type]['format'], seat.lineup
+            ))
+
+def dispute_payment(user_id: int, tournament_type: int, amount: int, payment_link_id: str, reason: str,
+                    payment_key: Optional[str] = None) -> None:
+    """Ask the admin to approve or decline a payment that could not be matched automatically
+
+    The Approve button carries the payment's key, so however often it is
+    tapped the approval seats the player once.
+    """
+    admin_message = (
+        f"⚠️ <b>Disputed Payment</b>\n\n"
+        f"💰 Amount: ₹{amount}\n"
+        f"🏆 Tournament: ₹{tournament_type}\n"
+        f"🆔 Payment ID: {payment_link_id}\n"
+        f"👤 User ID: {user_id}\n"
+        f"❓ {reason}\n"
+        f"⏰ Time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
+        f"Click below to approve registration:"
+    )
+    keyboard = {'inline_keyboard': [[
+        {'text': '✅ Approve', 'callback_data': f"approve_{tournament_type}_{user_id}_{payment_key or ''}"},
+        {'text': '❌ Decline', 'callback_data': f"decline_{user_id}"}
+    ]]}
+    send_telegram_message_with_keyboard(ADMIN_ID, admin_message, keyboard)
+
+def update_tournament_group(tournament_type: int, user_id: int, slot: int):
+    """Update group with tournament slot information
+
+    Refreshes the tier's pinned slot board in place; several slot changes
+    within the debounce window end up as a single edit.
+    """
+    try:
+        board_updater.schedule(tournament_type)
+        logger.info(f"Group update scheduled for ₹{tournament_type} tournament")
         
     except Exception as e:
         logger.error(f"Error updating group: {e}")
 
-def send_telegram_message(chat_id: int, text: str):
-    """Send message via Telegram Bot API"""
+def send_telegram_message(chat_id: int, text: str, wait: bool = False, trace_id: Optional[str] = None):
+    """Send message via Telegram Bot API
+
+    Messages go through the rate-limited outbound dispatcher. With
+    ``wait=True`` this blocks until Telegram accepted (or rejected) it.
+    """
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': text,
-            'parse_mode': 'HTML'
-        }
-        response = requests.post(url, json=payload)
-        return response.status_code == 200
+        future = telegram_dispatcher.send(chat_id, text)
+        if trace_id:
+            # The span covers queueing behind rate limits as well as the API call
+            queued_at, started = time.time(), time.perf_counter()
+            future.add_done_callback(lambda done: tracer.record(
+                trace_id, 'telegram.send', queued_at, time.perf_counter() - started,
+                chat_id=chat_id, delivered=done.result() is not None
+            ))
+        if wait:
+            return future.result(timeout=30)
+        return True
     except Exception as e:
         logger.error(f"Error sending Telegram message: {e}")
         return False
 
-def verify_razorpay_signature(payload: str, signature: str, secret: str) -> bool:
-    """Verify Razorpay webhook signature"""
+def verify_razorpay_signature(payload: bytes, signature: str, secret: bytes) -> bool:
+    """Verify Razorpay webhook signature over the raw request body"""
     try:
-        expected_signature = hmac.new(
-            secret.encode('utf-8'),
-            payload.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
-        
-        return hmac.compare_digest(expected_signature, signature)
+        started = time.perf_counter()
+        valid = verify_signature(payload, signature, secret)
+        SIGNATURE_SECONDS.observe(time.perf_counter() - started)
+        return valid
     except Exception as e:
         logger.error(f"Error verifying signature: {e}")
         return False
 
-def send_telegram_message_with_keyboard(chat_id: int, text: str, keyboard: dict):
+def send_telegram_message_with_keyboard(chat_id: int, text: str, keyboard: dict, wait: bool = False):
     """Send message with inline keyboard via Telegram Bot API"""
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': text,
-            'parse_mode': 'HTML',
-            'reply_markup': keyboard
-        }
-        response = requests.post(url, json=payload)
-        return response.status_code == 200
+        future = telegram_dispatcher.send(chat_id, text, reply_markup=keyboard)
+        if wait:
+            return future.result(timeout=30)
+        return True
     except Exception as e:
         logger.error(f"Error sending Telegram message with keyboard: {e}")
         return False
@@ -131,159 +235,170 @@ def health_check():
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+def tournament_for_amount(amount: int) -> Optional[int]:
+    """The tier whose entry fee was paid, from the catalog's amount index"""
+    return TOURNAMENTS.by_amount.get(amount)
+
+def process_payment_event(webhook: WebhookEvent) -> str:
+    """Assign a slot and send notifications for a verified payment event"""
+    event = webhook.event
+    
+    logger.info(f"Processing webhook event: {event}")
+    
+    trace_id = webhook.trace_id
+    
+    if event in HANDLED_EVENTS:
+        payment_link_id = webhook.payment_link_id
+        amount = webhook.amount
+        status = webhook.status
+        
+        tournament_type = tournament_for_amount(amount)
+        
+        if status in ['paid', 'captured']:
+            # The bot puts both on every payment link's notes
+            user_id, authorized_user = webhook.user_id, webhook.authorized_user
+            
+            # If we have both user_id and authorized_user, they must match
+            if user_id and authorized_user and user_id != authorized_user:
+                logger.warning(f"Security violation: user_id {user_id} != authorized_user {authorized_user}")
+                if ADMIN_APPROVAL_FOR_DISPUTES and tournament_type:
+                    # One admin prompt per payment, however often it is delivered
+                    if idempotency.claim(webhook.payment_key):
+                        dispute_payment(authorized_user, tournament_type, amount, payment_link_id,
+                                        f"Paid by user {user_id}, link belongs to user {authorized_user}",
+                                        webhook.payment_key)
+                    return 'disputed'
+                return 'unauthorized'
+            
+            if not tournament_type:
+                logger.warning(f"Payment amount ₹{amount} does not match any tournament")
+                requested = webhook.requested_tier
+                if ADMIN_APPROVAL_FOR_DISPUTES and user_id and requested in TOURNAMENTS:
+                    if idempotency.claim(webhook.payment_key):
+                        dispute_payment(user_id, requested, amount, payment_link_id,
+                                        f"Paid ₹{amount} for the ₹{requested} tournament", webhook.payment_key)
+                    return 'disputed'
+                return 'ignored'
+            
+            logger.info(f"Processing payment: Amount=₹{amount}, Tournament=₹{tournament_type}, User={user_id}")
+            
+            # Stored payments are also served by the legacy /pending-payments drain
+            payment_key = webhook.payment_key
+            store.record_payment(payment_key, user_id, tournament_type, amount, status, payment_link_id)
+            
+            # The bot must not hand out this user's paid link again
+            if event == 'payment_link.paid':
+                store.drop_payment_link(link_id=payment_link_id)
+            if user_id:
+                store.drop_payment_link(user_id=user_id, tournament_type=tournament_type)
+            
+            seats = []
+            if user_id:
+                # Confirmed payments go straight to the matchmaking queue; the seat is
+                # stored under the payment key, so a redelivery gets the same seat back
+                with SLOT_ASSIGNMENT_SECONDS.time(), tracer.span(trace_id, 'slot.assign') as span:
+                    seats = matchmaker.submit(tournament_type, user_id, payment_key)
+                    span.set(seated=len(seats))
+                seat_players(tournament_type, seats, payment_link_id, trace_id)
+            else:
+                logger.warning(f"Could not extract user_id from payment data: {webhook}")
+            
+            payment_channel.publish(PaymentEvent(
+                0, payment_key, user_id, tournament_type, amount, payment_link_id,
+                any(seat.lineup for seat in seats)
+            ))
+            
+            logger.info(f"Payment processed: ₹{amount} for tournament ₹{tournament_type}")
+            
+            if seats and all(seat.assignment.duplicate for seat in seats):
+                return 'duplicate'
+            return 'processed'
+        else:
+            logger.warning(f"Payment not processed: tournament_type={tournament_type}, status={status}")
+    
+    return 'ignored'
+
+def process_webhook_payload(payload: bytes) -> None:
+    """Worker entry point for a queued webhook delivery
+
+    Safe to run again for the same payment, so a failed event is simply
+    retried: the seat and the payment's idempotency key are committed
+    together, and a retry (or the paired event of the same payment) finds
+    that seat instead of taking another one. Recording and publishing the
+    payment are idempotent too; players are only notified once.
+    """
+    webhook = parse_webhook(payload)
+    if webhook is None:
+        raise ValueError("Queued webhook is not a JSON object")
+    
+    started = time.perf_counter()
+    try:
+        with tracer.span(webhook.trace_id, 'webhook.process', event=webhook.event) as span:
+            outcome = process_payment_event(webhook)
+            span.set(outcome=outcome)
+    except Exception:
+        WEBHOOK_PROCESSING_SECONDS.labels('error').observe(time.perf_counter() - started)
+        raise
+    
+    WEBHOOK_PROCESSING_SECONDS.labels(outcome).observe(time.perf_counter() - started)
+    logger.info(f"Webhook event processed with outcome: {outcome}")
+
 @app.route('/payment-webhook', methods=['POST'])
 def payment_webhook():
     """Handle payment gateway webhooks"""
+    received_at, started = time.time(), time.perf_counter()
+    g.trace_id = None
+    response, status = receive_webhook()
+    elapsed = time.perf_counter() - started
+    WEBHOOK_REQUEST_SECONDS.labels(status).observe(elapsed)
+    if g.trace_id:
+        tracer.record(g.trace_id, 'webhook.signature', *g.signature_timing)
+        tracer.record(g.trace_id, 'webhook.receive', received_at, elapsed, status=status)
+    return response, status
+
+def receive_webhook():
+    """Verify a webhook and queue it for the workers; returns ``(response, status)``
+
+    Only verifies and durably queues the event; slot assignment and Telegram
+    notifications run on the background worker pool so Razorpay gets its
+    response without waiting on Telegram.
+    """
     try:
-        # Get the raw payload
-        payload = request.get_data(as_text=True)
+        # Razorpay signs the raw body; it is verified, parsed and queued as bytes
+        payload = request.get_data()
         signature = request.headers.get('X-Razorpay-Signature', '')
         
         # Verify signature (for Razorpay)
-        if PAYMENT_GATEWAY_SECRET and not verify_razorpay_signature(payload, signature, PAYMENT_GATEWAY_SECRET):
+        verified_at, started = time.time(), time.perf_counter()
+        valid = not WEBHOOK_SECRET or verify_razorpay_signature(payload, signature, WEBHOOK_SECRET)
+        g.signature_timing = (verified_at, time.perf_counter() - started)
+        if not valid:
             logger.warning("Invalid webhook signature")
             return jsonify({'error': 'Invalid signature'}), 400
         
         # Parse the webhook data
-        webhook_data = request.get_json()
-        
-        if not webhook_data:
+        webhook = parse_webhook(payload)
+        if webhook is None:
             return jsonify({'error': 'No data received'}), 400
         
-        event = webhook_data.get('event')
-        payment_data = webhook_data.get('payload', {}).get('payment_link', {})
-        
+        event = webhook.event
+        g.trace_id = webhook.trace_id
         logger.info(f"Received webhook event: {event}")
         
-        if event in ['payment_link.paid', 'payment.captured']:
-            if event == 'payment_link.paid':
-                payment_data = webhook_data.get('payload', {}).get('payment_link', {})
-                payment_link_id = payment_data.get('id')
-                amount = payment_data.get('amount', 0) // 100
-                status = payment_data.get('status')
-                customer_details = payment_data.get('customer', {})
-                description = payment_data.get('description', '')
-            else:  # payment.captured
-                payment_data = webhook_data.get('payload', {}).get('payment', {}).get('entity', {})
-                payment_link_id = payment_data.get('id')
-                amount = payment_data.get('amount', 0) // 100
-                status = 'captured'
-                customer_details = {}
-                description = payment_data.get('description', '')
-            
-            # Determine tournament type based on amount
-            tournament_type = None
-            if amount == 15:
-                tournament_type = 15
-            elif amount == 30:
-                tournament_type = 30
-            elif amount == 50:
-                tournament_type = 50
-            
-            if tournament_type and status in ['paid', 'captured']:
-                # Extract user ID from customer details or description
-                user_id = None
-                if 'User ' in description:
-                    try:
-                        user_id = int(description.split('User ')[1].split(' ')[0])
-                    except:
-                        pass
-                
-                # Try to extract from notes if description doesn't work
-                if not user_id:
-                    notes = payment_data.get('notes', {})
-                    if isinstance(notes, dict) and 'user_id' in notes:
-                        try:
-                            user_id = int(notes['user_id'])
-                        except:
-                            pass
-                
-                # Security check: verify authorized user
-                authorized_user = None
-                if isinstance(payment_data.get('notes', {}), dict):
-                    try:
-                        authorized_user = int(payment_data['notes'].get('authorized_user', '0'))
-                    except:
-                        pass
-                
-                # If we have both user_id and authorized_user, they must match
-                if user_id and authorized_user and user_id != authorized_user:
-                    logger.warning(f"Security violation: user_id {user_id} != authorized_user {authorized_user}")
-                    return jsonify({'status': 'error', 'message': 'Unauthorized payment'}), 403
-                
-                logger.info(f"Processing payment: Amount=₹{amount}, Tournament=₹{tournament_type}, User={user_id}")
-                
-                # Store payment info for bot to process
-                payment_key = f"{payment_link_id}_{int(time.time())}"
-                pending_payments[payment_key] = {
-                    'user_id': user_id,
-                    'tournament_type': tournament_type,
-                    'amount': amount,
-                    'payment_id': payment_link_id,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-                
-                # Notify admin about successful payment
-                admin_message = (
-                    f"💳 <b>Payment Received!</b>\n\n"
-                    f"💰 Amount: ₹{amount}\n"
-                    f"🏆 Tournament: ₹{tournament_type}\n"
-                    f"🆔 Payment ID: {payment_link_id}\n"
-                    f"👤 User ID: {user_id}\n"
-                    f"⏰ Time: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC\n\n"
-                    f"Click below to approve registration:"
-                )
-                
-                # If we have user ID, notify them too
-                if user_id:
-                    # Auto-assign slot instead of waiting for approval
-                    slot_assigned = assign_tournament_slot(user_id, tournament_type)
-                    
-                    if slot_assigned:
-                        slot_number = slot_assigned['slot']
-                        prize = 25 if tournament_type == 15 else 50 if tournament_type == 30 else 80
-                        
-                        # Notify user of successful registration
-                        user_message = (
-                            f"✅ <b>Registration Successful!</b>\n\n"
-                            f"🏆 Tournament: ₹{tournament_type}\n"
-                            f"🎯 Slot: {slot_number}\n"
-                            f"🏅 Prize: ₹{prize}\n\n"
-                            f"Good luck in the tournament!"
-                        )
-                        send_telegram_message(user_id, user_message)
-                        
-                        # Update group with new slot assignment
-                        update_tournament_group(tournament_type, user_id, slot_number)
-                        
-                        # Notify admin of automatic registration
-                        admin_notification = (
-                            f"✅ <b>Auto Registration Complete</b>\n\n"
-                            f"👤 User: {user_id}\n"
-                            f"💰 Tournament: ₹{tournament_type}\n"
-                            f"🎯 Assigned Slot: {slot_number}\n"
-                            f"💳 Payment ID: {payment_link_id}"
-                        )
-                        send_telegram_message(ADMIN_ID, admin_notification)
-                    else:
-                        # Fallback if slot assignment fails
-                        user_message = (
-                            f"✅ <b>Payment Confirmed!</b>\n\n"
-                            f"💰 Tournament: ₹{tournament_type}\n"
-                            f"❌ All slots are currently full.\n"
-                            f"Please contact admin for assistance."
-                        )
-                        send_telegram_message(user_id, user_message)
-                else:
-                    logger.warning(f"Could not extract user_id from payment data: {payment_data}")
-                
-                logger.info(f"Payment processed: ₹{amount} for tournament ₹{tournament_type}")
-                
-                return jsonify({'status': 'success', 'message': 'Payment processed'}), 200
-            else:
-                logger.warning(f"Payment not processed: tournament_type={tournament_type}, status={status}")
+        if event in LINK_CLOSED_EVENTS:
+            store.drop_payment_link(link_id=webhook.payment_link_id)
+            return jsonify({'status': 'processed', 'message': 'Payment link closed'}), 200
+        
+        if event not in HANDLED_EVENTS:
+            return jsonify({'status': 'ignored', 'message': 'Event not handled'}), 200
         
-        return jsonify({'status': 'ignored', 'message': 'Event not handled'}), 200
+        if idempotency.seen(webhook.payment_key):
+            return jsonify({'status': 'duplicate', 'message': 'Payment already processed'}), 200
+        
+        store.enqueue_webhook(event, payload)
+        worker_pool.notify()
+        
+        return jsonify({'status': 'queued', 'message': 'Payment queued for processing'}), 200
         
     except Exception as e:
         logger.error(f"Error processing webhook: {e}")
@@ -355,8 +470,8 @@ def payment_success():
             <div class="success-container">
                 <div class="success-icon">✅</div>
                 <h1>Payment Successful!</h1>
-                <p>Your payment has been processed successfully. Your tournament registration is now pending admin approval.</p>
-                <p><strong>You will receive a notification in the bot within a few minutes once your registration is approved.</strong></p>
+                <p>Your payment has been processed successfully. You are being registered for the tournament automatically.</p>
+                <p><strong>You will receive a notification in the bot with your slot within a few moments.</strong></p>
                 <p>Please return to the Telegram bot to check your registration status.</p>
                 <a href="https://t.me/eFootball_Tournamentsbot" class="btn">Return to Bot</a>
             </div>
@@ -373,7 +488,7 @@ def trigger_update():
         data = request.get_json() or {}
         message = data.get('message', 'Test message from gateway')
         
-        success = send_telegram_message(ADMIN_ID, f"🔧 <b>Manual Trigger</b>\n\n{message}")
+        success = send_telegram_message(ADMIN_ID, f"🔧 <b>Manual Trigger</b>\n\n{message}", wait=True)
         
         if success:
             return jsonify({'status': 'success', 'message': 'Message sent'}), 200
@@ -389,25 +504,76 @@ def get_stats():
     """Get basic statistics"""
     return jsonify({
         'status': 'active',
-        'uptime': 'Running',
+        'uptime_seconds': int(time.time() - STARTED_AT),
+        'webhook_queue': {
+            'depth': worker_pool.depth(),
+            'in_flight': worker_pool.in_flight(),
+            'workers': worker_pool.workers
+        },
+        'telegram_outbound': telegram_dispatcher.stats(),
         'endpoints': [
             '/health',
             '/payment-webhook',
             '/payment-success',
             '/trigger-update',
-            '/stats'
+            '/stats',
+            '/metrics',
+            '/payment-events'
         ],
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics for this process (bot included under the unified runtime)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+def stream_authorized() -> bool:
+    return not EVENT_STREAM_TOKEN or hmac.compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {EVENT_STREAM_TOKEN}'
+    )
+
+@app.route('/payment-events', methods=['GET'])
+def get_payment_events():
+    """Long-poll the payment event stream from the consumer's acknowledged offset
+
+    Returns as soon as there is at least one event, or after ``timeout``
+    seconds with an empty list. Events stay deliverable until acknowledged.
+    """
+    if not stream_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    consumer = request.args.get('consumer')
+    if not consumer:
+        return jsonify({'error': 'consumer is required'}), 400
+    after = request.args.get('after', type=int)
+    timeout = min(max(request.args.get('timeout', 0, type=float), 0), 60)
+    
+    events = payment_channel.read(consumer, after, timeout)
+    return jsonify({
+        'events': [event._asdict() for event in events],
+        'cursor': events[-1].event_id if events else max(after or 0, store.consumer_offset(consumer))
+    }), 200
+
+@app.route('/payment-events/ack', methods=['POST'])
+def ack_payment_events():
+    """Acknowledge payment events up to and including ``event_id``"""
+    if not stream_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    data = request.get_json(silent=True) or {}
+    consumer = data.get('consumer')
+    event_id = data.get('event_id')
+    if not consumer or not isinstance(event_id, int):
+        return jsonify({'error': 'consumer and event_id are required'}), 400
+    
+    return jsonify({'consumer': consumer, 'offset': payment_channel.ack(consumer, event_id)}), 200
+
 @app.route('/pending-payments', methods=['GET'])
 def get_pending_payments():
-    """Get pending payments for bot processing"""
-    global pending_payments
-    
+    """Get pending payments for bot processing (deprecated: use /payment-events)"""
     # Return and clear pending payments
-    payments = pending_payments.copy()
-    pending_payments.clear()
+    payments = store.collect_payments()
     
     return jsonify({
         'status': 'success',
@@ -415,6 +581,47 @@ def get_pending_payments():
         'count': len(payments)
     }), 200
 
+worker_pool = WorkerPool(store, process_webhook_payload, workers=WEBHOOK_WORKERS,
+                         retention=int(WEBHOOK_RETENTION_DAYS * 24 * 60 * 60))
+
+metrics.callback('gateway_uptime_seconds', 'Seconds since this gateway process started', lambda: time.time() - STARTED_AT)
+metrics.callback('gateway_webhook_queue_depth', 'Webhooks waiting in the durable queue', worker_pool.depth)
+metrics.callback('gateway_webhook_in_flight', 'Webhooks being processed by workers', worker_pool.in_flight)
+metrics.callback('gateway_telegram_queue_depth', 'Outbound Telegram messages not yet delivered',
+                 lambda: telegram_dispatcher.stats()['queue_depth'])
+metrics.callback('gateway_telegram_messages_total', 'Outbound Telegram messages by result', lambda: [
+    ((result,), telegram_dispatcher.stats()[result]) for result in ('sent', 'failed', 'coalesced', 'rate_limited')
+], ['result'], 'counter')
+metrics.callback('gateway_matchmaking_queue_depth', 'Paid players waiting for a seat in this process', lambda: [
+    ((tier,), matchmaker.depth(tier)) for tier in TOURNAMENTS
+], ['tier'])
+metrics.callback('gateway_idempotency_keys_cached', 'Payment keys remembered in memory', lambda: len(idempotency))
+telegram_dispatcher.start()
+worker_pool.start()
+TOURNAMENTS.watch()
+
+_shutdown_lock = threading.Lock()
+_shut_down = False
+
+def shutdown() -> None:
+    """Drain the webhook queue, push pending board edits, then flush Telegram
+
+    Called once per process: from atexit, or from gunicorn's worker_exit hook.
+    """
+    global _shut_down
+    with _shutdown_lock:
+        if _shut_down:
+            return
+        _shut_down = True
+    worker_pool.drain()
+    board_updater.flush_all()
+    telegram_dispatcher.stop()
+
+atexit.register(shutdown)
+
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
+    # Turn SIGTERM into a normal exit so the queue is drained via atexit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     port = int(os.getenv('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,42 @@
+import os
+import sys
+import multiprocessing
+
+# Gunicorn settings for the payment gateway: gunicorn -c gunicorn.conf.py gateway:app
+#
+# Every worker process imports gateway.py itself (no preload), so each one
+# starts its own webhook worker pool and Telegram dispatcher after the fork.
+# Shared state (slots, queued webhooks, idempotency keys, payments and the
+# Telegram rate buckets) lives in the SQLite store, so any worker can answer
+# any request and Telegram's limits hold for all workers together. Metrics
+# are not shared: /metrics reports the answering worker, labelled by pid.
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# The webhook handler only verifies, parses and queues, so a few threaded
+# workers saturate one box long before the CPU does
+workers = int(os.getenv('GATEWAY_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.getenv('GATEWAY_THREADS', '8'))
+
+# Razorpay and Telegram reuse connections; keep them open between requests
+keepalive = int(os.getenv('GATEWAY_KEEPALIVE', '5'))
+timeout = int(os.getenv('GATEWAY_TIMEOUT', '60'))
+# Time a worker gets on shutdown to drain its queued webhooks and Telegram messages
+graceful_timeout = int(os.getenv('GATEWAY_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers now and then to cap memory growth
+max_requests = int(os.getenv('GATEWAY_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+
+preload_app = False
+accesslog = None
+errorlog = '-'
+loglevel = os.getenv('GATEWAY_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Flush the worker's queues before it goes away"""
+    gateway = sys.modules.get('gateway')
+    if gateway is not None:
+        gateway.shutdown()
@@ -0,0 +1,90 @@
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Final, Optional
+
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+# Razorpay retries failed deliveries for up to 24 hours
+DEFAULT_TTL: Final = 3 * 24 * 60 * 60
+DEFAULT_MAX_KEYS: Final = 100_000
+
+
+class IdempotencyGuard:
+    """Collapse duplicate and retried payment events into a single effect
+
+    Keys are the Razorpay payment ID, or the payment-link ID when there is no
+    payment entity. A key is only written once its effect is committed:
+    ``SlotStore.assign_slot`` records it in the same transaction as the seat,
+    and ``claim`` covers outcomes without a seat (disputes). The store is
+    the authoritative check across processes. A bounded in-memory seen-set
+    in front of it answers repeats without touching SQLite; since every key
+    gets the same TTL, insertion order is expiry order and eviction just pops
+    from the front.
+    """
+
+    def __init__(self, store: SlotStore, ttl: int = DEFAULT_TTL, max_keys: int = DEFAULT_MAX_KEYS):
+        self.store = store
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._seen: 'OrderedDict[str, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._checks_since_purge = 0
+
+    def _remember(self, key: str, now: int) -> None:
+        self._seen[key] = now + self.ttl
+        self._seen.move_to_end(key)
+        while self._seen:
+            _, expires_at = next(iter(self._seen.items()))
+            if expires_at > now and len(self._seen) <= self.max_keys:
+                break
+            self._seen.popitem(last=False)
+
+    def _seen_in_memory(self, key: str, now: int) -> bool:
+        expires_at = self._seen.get(key)
+        return expires_at is not None and expires_at > now
+
+    def _maybe_purge(self, now: int) -> None:
+        with self._lock:
+            self._checks_since_purge += 1
+            if self._checks_since_purge < 1000:
+                return
+            self._checks_since_purge = 0
+        removed = self.store.purge_idempotency_keys(now - self.ttl)
+        logger.info(f"Purged {removed} expired idempotency keys")
+
+    def seen(self, key: Optional[str]) -> bool:
+        """Return True if an event with this key was already processed"""
+        if not key:
+            return False
+        now = int(time.time())
+        self._maybe_purge(now)
+        with self._lock:
+            if self._seen_in_memory(key, now):
+                return True
+        if self.store.has_idempotency_key(key, now - self.ttl):
+            with self._lock:
+                self._remember(key, now)
+            return True
+        return False
+
+    def claim(self, key: Optional[str]) -> bool:
+        """Claim a key; returns False if another delivery already claimed it"""
+        if not key:
+            return True
+        now = int(time.time())
+        self._maybe_purge(now)
+        with self._lock:
+            if self._seen_in_memory(key, now):
+                return False
+
+        claimed = self.store.claim_idempotency_key(key, now, now - self.ttl)
+        with self._lock:
+            self._remember(key, now)
+        return claimed
+
+    def __len__(self) -> int:
+        return len(self._seen)
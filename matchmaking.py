@@ -0,0 +1,151 @@
+import threading
+import logging
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from allocator import Assignment
+from bracket import BYE, create_bracket
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+
+class MatchQueue:
+    """FIFO of paid players for one tier with O(1) join, leave and lookup
+
+    Arrival order lives in a deque and membership in a dict, so checking or
+    removing a player never scans the queue. A player who leaves is only
+    dropped from the dict; the stale deque entry is skipped when it reaches
+    the head. Entries carry a ticket number so a player who leaves and joins
+    again goes to the back instead of reusing their old position.
+    """
+
+    __slots__ = ('_order', '_members', '_tickets')
+
+    def __init__(self):
+        self._order: Deque[Tuple[int, int]] = deque()
+        self._members: Dict[int, Tuple[int, Optional[str]]] = {}
+        self._tickets = 0
+
+    def join(self, user_id: int, payment_id: Optional[str] = None) -> bool:
+        """Add a player; returns False if they are already waiting"""
+        if user_id in self._members:
+            return False
+        self._tickets += 1
+        self._members[user_id] = (self._tickets, payment_id)
+        self._order.append((self._tickets, user_id))
+        return True
+
+    def leave(self, user_id: int) -> bool:
+        return self._members.pop(user_id, None) is not None
+
+    def _is_current(self, entry: Tuple[int, int]) -> bool:
+        member = self._members.get(entry[1])
+        return member is not None and member[0] == entry[0]
+
+    def peek(self) -> Optional[Tuple[int, Optional[str]]]:
+        """Return ``(user_id, payment_id)`` of the longest-waiting player"""
+        while self._order and not self._is_current(self._order[0]):
+            self._order.popleft()
+        if not self._order:
+            return None
+        user_id = self._order[0][1]
+        return user_id, self._members[user_id][1]
+
+    def pop(self) -> Optional[Tuple[int, Optional[str]]]:
+        head = self.peek()
+        if head is not None:
+            self._order.popleft()
+            del self._members[head[0]]
+        return head
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._members
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+
+class Seat(NamedTuple):
+    """A queued player who has been placed by the matchmaker"""
+    user_id: int
+    payment_id: Optional[str]
+    assignment: Assignment
+    lineup: Optional[List[int]]  # every player of the bracket if this seat filled it
+
+
+class Matchmaker:
+    """Seats confirmed payments automatically, in payment order
+
+    Each tier has a ``MatchQueue``. Submitting a player drains the queue
+    head-first into the slot store. A confirmed payment must never wait in
+    process memory alone, so a player whose seat cannot be confirmed is
+    taken off the queue again and the error is raised to the caller, whose
+    own retry (the gateway's durable webhook queue, or the admin tapping
+    Approve again) submits them anew. When a seat completes a bracket, the
+    seat carries the bracket's lineup so the caller can announce the
+    fixtures straight away.
+    """
+
+    def __init__(self, store: SlotStore, tournaments: Dict[int, Dict]):
+        self.store = store
+        self.queues: Dict[int, MatchQueue] = {tournament_type: MatchQueue() for tournament_type in tournaments}
+        self._locks: Dict[int, threading.Lock] = {tournament_type: threading.Lock() for tournament_type in tournaments}
+        self._tiers_lock = threading.Lock()
+
+    def _tier(self, tournament_type: int) -> threading.Lock:
+        # Tiers added by a config reload get their queue on first use
+        lock = self._locks.get(tournament_type)
+        if lock is None:
+            with self._tiers_lock:
+                self.queues.setdefault(tournament_type, MatchQueue())
+                lock = self._locks.setdefault(tournament_type, threading.Lock())
+        return lock
+
+    def submit(self, tournament_type: int, user_id: int, payment_id: Optional[str] = None) -> List[Seat]:
+        """Queue a paid player and seat everyone who can be seated now"""
+        with self._tier(tournament_type):
+            queue = self.queues[tournament_type]
+            if not queue.join(user_id, payment_id):
+                logger.info(f"User {user_id} is already queued for ₹{tournament_type} tournament")
+            return self._drain(tournament_type, queue)
+
+    def depth(self, tournament_type: int) -> int:
+        queue = self.queues.get(tournament_type)
+        return len(queue) if queue is not None else 0
+
+    def _drain(self, tournament_type: int, queue: MatchQueue) -> List[Seat]:
+        seats = []
+        while True:
+            head = queue.peek()
+            if head is None:
+                return seats
+            user_id, payment_id = head
+            try:
+                assignment = self.store.assign_slot(tournament_type, user_id, payment_id)
+                if assignment is None:
+                    raise LookupError(f"₹{tournament_type} tournament has no bracket to seat user {user_id}")
+            except Exception as e:
+                logger.error(f"Error seating user {user_id} in ₹{tournament_type} tournament: {e}")
+                queue.leave(user_id)
+                raise
+
+            queue.pop()
+            lineup = None if assignment.queued else self.store.bracket_lineup(assignment.bracket_id)
+            seats.append(Seat(user_id, payment_id, assignment, lineup))
+
+
+def render_fixtures(tournament_type: int, bracket_number: int, bracket_format: str, lineup: List[int]) -> str:
+    """Announce a full bracket and its opening matches"""
+    title = f"₹{tournament_type} Tournament" if bracket_number == 1 else f"₹{tournament_type} Tournament #{bracket_number}"
+    message = f"🏁 <b>{title} is full!</b>\n\nOpening matches:\n"
+
+    for match in create_bracket(bracket_format, lineup).ready_matches():
+        players = [
+            "BYE" if user_id == BYE else f'<a href="tg://user?id={user_id}">Player {user_id}</a>'
+            for user_id in (match.player_a, match.player_b)
+        ]
+        message += f"⚽ Match {match.match_id}: {players[0]} vs {players[1]}\n"
+
+    message += "\nUse /bracket to follow the draw."
+    return message
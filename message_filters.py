@@ -0,0 +1,56 @@
+from typing import Dict
+
+from telegram import Message, MessageEntity
+from telegram.constants import ChatType
+from telegram.ext.filters import MessageFilter
+
+GROUP_CHATS = frozenset((ChatType.GROUP, ChatType.SUPERGROUP))
+
+
+class AddressedToBot(MessageFilter):
+    """Group messages that mention the bot or reply to one of its messages
+
+    Runs while the update is being dispatched, so ordinary group chatter is
+    rejected before a handler task is created. Mentions are read from the
+    entities Telegram already parsed instead of scanning the text, and most
+    messages are turned away by the chat type or by having no entities and
+    no reply at all.
+    """
+
+    __slots__ = ('_mention', 'checked', 'rejected')
+
+    def __init__(self, bot_username: str):
+        super().__init__(name='AddressedToBot')
+        self._mention = '@' + bot_username.lstrip('@').lower()
+        self.checked = 0
+        self.rejected = 0
+
+    def filter(self, message: Message) -> bool:
+        self.checked += 1
+        if self._addressed(message):
+            return True
+        self.rejected += 1
+        return False
+
+    def _addressed(self, message: Message) -> bool:
+        if message.chat.type not in GROUP_CHATS or not message.text:
+            return False
+
+        reply = message.reply_to_message
+        if reply is not None and reply.from_user is not None and reply.from_user.id == message.get_bot().id:
+            return True
+
+        if not message.entities:
+            return False
+        for entity in message.entities:
+            if entity.type == MessageEntity.MENTION and message.parse_entity(entity).lower() == self._mention:
+                return True
+        return False
+
+    def stats(self) -> Dict[str, float]:
+        """Messages checked and the share turned away without running a handler"""
+        return {
+            'checked': self.checked,
+            'rejected': self.rejected,
+            'rejection_rate': self.rejected / self.checked if self.checked else 0.0
+        }
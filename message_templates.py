@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Callable, Dict, Final, List, Mapping, Optional, Sequence, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+# Per-user keyboards kept ready; repeat taps by recent users allocate nothing
+KEYBOARD_CACHE_SIZE: Final = 4096
+
+
+class MessageTemplates:
+    """Bot message bodies and keyboards compiled once from the tournament config
+
+    Static texts and keyboards are built at startup and shared by every
+    update (python-telegram-bot objects are immutable, so sharing them is
+    safe). Only the per-user parts are filled in on the hot path: the user
+    ID in the tier buttons' callback data and the payment link's URL, both
+    behind small LRU caches.
+
+    Only the ``offered`` tiers (all of them by default) are advertised and
+    get a button; texts for the rest are still built, for taps on keyboards
+    sent before a tier was retired.
+    """
+
+    def __init__(self, tournaments: Mapping[int, Dict], bot_username: str, group_username: str,
+                 payment_link_ttl: int = 24 * 60 * 60, offered: Optional[Sequence[int]] = None):
+        offered = list(tournaments) if offered is None else list(offered)
+        fees = ", ".join(f"₹{fee}" for fee in offered)
+
+        self.welcome_text = (
+            "🏆 <b>Welcome to eFootball Tournament Bot!</b>\n\n"
+            "🎮 Join exciting tournaments with real prizes!\n"
+            f"💰 Entry fees: {fees}\n"
+            "🏅 Win amazing cash prizes!\n\n"
+            "Click below to join the tournament group and use /register to participate."
+        )
+        self.welcome_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("Join Tournament Group", url=f"https://t.me/{group_username}")]
+        ])
+
+        self.group_start_text = "🏆 Ready to join the tournament? Click below to register!"
+        self.group_start_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🎮 Start Registration",
+                                  url=f"https://t.me/{bot_username.replace('@', '')}?start=registration")]
+        ])
+
+        self.first_tournament_text = (
+            "🎉 <b>Welcome to your first tournament!</b>\n\n"
+            "Click below to begin the registration process."
+        )
+        self.first_tournament_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("🎮 Start Registration", callback_data="start_registration")]
+        ])
+
+        self.choose_tournament_text = (
+            "🏆 <b>Choose Your Tournament</b>\n\n"
+            "Select the tournament you want to join:"
+        )
+        self._tier_buttons = tuple(
+            (f"💰 ₹{fee} Tournament (Win ₹{tournaments[fee]['prize']})", f"register_{fee}_")
+            for fee in offered
+        )
+
+        self.payment_required_text = {
+            fee: (
+                f"💳 <b>Payment Required</b>\n\n"
+                f"🏆 Tournament: ₹{fee}\n"
+                f"💰 Entry Fee: ₹{fee}\n"
+                f"🏅 Prize: ₹{tier['prize']}\n\n"
+                f"Click below to complete your payment:\n\n"
+                f"⚠️ <b>IMPORTANT:</b> This payment link is personalized for you only.\n"
+                f"⏰ <i>You will be automatically registered after payment.</i>"
+            )
+            for fee, tier in tournaments.items()
+        }
+        self.payment_error_text = (
+            "❌ <b>Payment Error</b>\n\n"
+            "Unable to create payment link. Please try again later."
+        )
+        self._payment_security_button = InlineKeyboardButton("⚠️ Payment Security", callback_data="payment_security")
+
+        self.payment_security_text = (
+            "🔒 <b>Payment Security Information</b>\n\n"
+            "• Each payment link is personalized and can only be used by the requesting user\n"
+            f"• Payment links expire after {payment_link_ttl // 3600} hours\n"
+            "• Only you can complete payment using your link\n"
+            "• After successful payment, you'll be automatically registered\n"
+            "• Your slot will be assigned immediately\n\n"
+            "🛡️ <i>Your payment is secure and protected.</i>"
+        )
+        self.payment_security_keyboard = InlineKeyboardMarkup([
+            [InlineKeyboardButton("← Back to Payment", callback_data="back_to_payment")]
+        ])
+
+        self.tier_keyboard = lru_cache(maxsize=KEYBOARD_CACHE_SIZE)(self._build_tier_keyboard)
+        self.payment_keyboard = lru_cache(maxsize=KEYBOARD_CACHE_SIZE)(self._build_payment_keyboard)
+
+    def caches(self) -> List[Tuple[str, Callable]]:
+        """The per-user caches by name, for their hit/miss statistics"""
+        return [('tier_keyboard', self.tier_keyboard), ('payment_keyboard', self.payment_keyboard)]
+
+    def _build_tier_keyboard(self, user_id: int) -> InlineKeyboardMarkup:
+        """Tier buttons whose callback data is bound to one user"""
+        suffix = str(user_id)
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton(text, callback_data=prefix + suffix)]
+            for text, prefix in self._tier_buttons
+        ])
+
+    def _build_payment_keyboard(self, short_url: str) -> InlineKeyboardMarkup:
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("💳 Pay Now", url=short_url)],
+            [self._payment_security_button]
+        ])
@@ -0,0 +1,311 @@
+import os
+import time
+import asyncio
+import threading
+import logging
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Final, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE: Final = 'text/plain; version=0.0.4; charset=utf-8'
+# Seconds; spans an in-memory cache hit up to a slow Telegram/Razorpay round trip
+DEFAULT_BUCKETS: Final = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    # Every process keeps its own registry (one per gunicorn worker), so each
+    # series names the process it came from; sum over ``pid`` in queries
+    pairs.append(f'pid="{os.getpid()}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self) -> '_Timer':
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class Metric:
+    """A named metric family; children are created once per label combination
+
+    Look a child up with ``labels(...)`` once and keep it on hot paths:
+    recording is then a lock-protected add, with no dict lookup or string
+    formatting per event. Without label names the metric is its own child.
+    """
+
+    type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Labels, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def collect(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.collect())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def collect(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(child.value)}"
+                for key, child in list(self._children.items())]
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def collect(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """A gauge or counter read from existing state when metrics are scraped
+
+    ``read`` returns a number, or ``(label values, number)`` pairs for a
+    labelled metric. Queue depths and cache statistics already kept by other
+    components are exported this way, at no cost per event.
+    """
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], object],
+                 labelnames: Sequence[str] = (), metric_type: str = 'gauge'):
+        self.read = read
+        self.type = metric_type
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def collect(self) -> List[str]:
+        try:
+            value = self.read()
+        except Exception as e:
+            logger.error(f"Error reading metric {self.name}: {e}")
+            return []
+        if not self.labelnames:
+            return [f"{self.name}{_label_text((), ())} {_number(value)}"]
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(number)}"
+                for key, number in value]
+
+
+class Registry:
+    """Process-wide collection of metrics rendered in the Prometheus text format
+
+    Nothing is shared between processes: under gunicorn a scrape sees only
+    the worker that answered it, and every series carries that worker's
+    ``pid`` label so the samples from different workers never mix.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric; registering a name again returns the metric already there"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if existing.type != metric.type:
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.type}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def replace(self, metric: Metric) -> Metric:
+        """Add a metric, dropping any earlier one with the same name"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def callback(name: str, documentation: str, read: Callable[[], object],
+             labelnames: Sequence[str] = (), metric_type: str = 'gauge') -> CallbackMetric:
+    """Export a value read at scrape time (see ``CallbackMetric``)"""
+    # Callbacks close over module state, so the newest registration wins
+    return REGISTRY.replace(CallbackMetric(name, documentation, read, labelnames, metric_type))
+
+
+def cache_info_reader(caches: Iterable[Tuple[str, Callable]], field: str) -> Callable[[], List]:
+    """Read hits or misses from ``functools.lru_cache`` wrapped functions"""
+    caches = list(caches)
+    return lambda: [((name,), getattr(cached.cache_info(), field)) for name, cached in caches]
+
+
+EVENT_LOOP_LAG = histogram('event_loop_lag_seconds', 'Delay of the asyncio event loop beyond a scheduled wake-up',
+                           buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5))
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """Sample event-loop lag until cancelled: how late a sleep of ``interval`` wakes up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - started - interval, 0.0))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def start_http_server(port: int, host: str = '0.0.0.0') -> ThreadingHTTPServer:
+    """Serve the registry on its own port, for processes without a web app of their own"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+    return server
@@ -0,0 +1,95 @@
+import time
+import asyncio
+import logging
+from typing import Callable, List, NamedTuple, Optional
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, BaseHandler, CallbackContext
+
+import metrics
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = metrics.counter('bot_rate_limited_total', 'Updates rejected by a rate limit', ['limit'])
+
+
+class RateLimit(NamedTuple):
+    """A per-user token bucket applied to the updates a predicate selects"""
+    name: str
+    burst: int  # bucket capacity
+    per_minute: float  # refill rate
+    applies: Callable[[Update], bool]
+
+
+class RateLimiter:
+    """Per-user token buckets kept in the shared store
+
+    Buckets live in SQLite rather than in process memory, so the limit holds
+    no matter which bot worker receives a user's update.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, store: SlotStore, limits: List[RateLimit]):
+        self.store = store
+        self.limits = limits
+        self._idle_after = max(limit.burst / (limit.per_minute / 60) for limit in limits) if limits else 0
+        self._checks = 0
+
+    def applies(self, update: Update) -> bool:
+        """Whether any limit covers the update (no store access)"""
+        return update.effective_user is not None and any(limit.applies(update) for limit in self.limits)
+
+    def exceeded(self, update: Update) -> Optional[RateLimit]:
+        """Spend a token from every bucket the update falls under; return the first empty one"""
+        user = update.effective_user
+        if user is None:
+            return None
+
+        now = time.time()
+        self._checks += 1
+        if self._checks % self.PURGE_EVERY == 0:
+            self.store.purge_rate_limits(now - self._idle_after)
+
+        for limit in self.limits:
+            if limit.applies(update) and not self.store.take_rate_token(
+                f"{limit.name}:{user.id}", limit.burst, limit.per_minute / 60, now
+            ):
+                return limit
+        return None
+
+
+class RateLimitHandler(BaseHandler[Update, CallbackContext]):
+    """Stops updates that exceed a rate limit before any other handler runs
+
+    Register it in a group that runs first (e.g. ``group=-1``). Commands and
+    callback queries go through the same check, and a rejected update never
+    reaches the handlers that call Razorpay or send messages.
+
+    ``check_update`` runs on the event loop and only asks whether a limit
+    applies; the token is taken from the store in a worker thread, so a
+    contended SQLite write never stalls other chats.
+    """
+
+    __slots__ = ('limiter',)
+
+    def __init__(self, limiter: RateLimiter):
+        super().__init__(self._check)
+        self.limiter = limiter
+
+    def check_update(self, update: object) -> bool:
+        if not isinstance(update, Update) or not (update.callback_query or update.message):
+            return False
+        return self.limiter.applies(update)
+
+    async def _check(self, update: Update, context: CallbackContext) -> None:
+        limit = await asyncio.to_thread(self.limiter.exceeded, update)
+        if limit is None:
+            return
+        RATE_LIMITED.labels(limit.name).inc()
+        logger.warning(f"Rate limit '{limit.name}' exceeded by user {update.effective_user.id}")
+        if update.callback_query:
+            # Callback queries must be answered or the button keeps spinning
+            await update.callback_query.answer("⏳ Too many requests. Please wait a moment.", show_alert=True)
+        raise ApplicationHandlerStop
@@ -0,0 +1,106 @@
+import os
+import json
+import signal
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Final
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+from tornado.wsgi import WSGIContainer
+from telegram import Update
+from telegram.ext import Application
+
+import bot
+import metrics
+import gateway
+from events import PaymentEvent
+
+logger = logging.getLogger(__name__)
+
+PORT: Final = int(os.getenv('PORT', '5000'))
+GATEWAY_THREADS: Final = int(os.getenv('GATEWAY_THREADS', '8'))
+
+
+class TelegramWebhookHandler(tornado.web.RequestHandler):
+    """Receives Telegram updates and hands them to the bot's update queue"""
+
+    def initialize(self, bot_application: Application) -> None:
+        self.bot_application = bot_application
+
+    async def post(self) -> None:
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+        await self.bot_application.update_queue.put(Update.de_json(data, self.bot_application.bot))
+        self.set_status(200)
+
+
+def make_web_app(application: Application, executor: ThreadPoolExecutor) -> tornado.web.Application:
+    """Route the Telegram webhook to the bot and everything else to the Flask gateway"""
+    return tornado.web.Application([
+        (rf"/{bot.TOKEN}", TelegramWebhookHandler, {'bot_application': application}),
+        (r".*", tornado.web.FallbackHandler, {'fallback': WSGIContainer(gateway.app, executor=executor)}),
+    ])
+
+
+async def serve() -> None:
+    """Run the bot and the payment gateway in this process on one port
+
+    Payments reach the bot through ``gateway.payment_channel`` as
+    ``PaymentEvent`` updates, with no HTTP hop between them. Flask views run
+    on a thread pool so slow requests never block the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    application = bot.build_application()
+    executor = ThreadPoolExecutor(GATEWAY_THREADS, thread_name_prefix='gateway')
+
+    def deliver(event: PaymentEvent) -> None:
+        # The update queue is bounded; wait for room instead of dropping the event
+        asyncio.run_coroutine_threadsafe(application.update_queue.put(event), loop)
+
+    gateway.payment_channel.subscribe(deliver)
+
+    async with application:
+        await application.start()
+        application.create_task(metrics.monitor_event_loop())
+        bot.resume_brackets(application)
+
+        if bot.WEBHOOK_URL:
+            await application.bot.set_webhook(f"{bot.WEBHOOK_URL}/{bot.TOKEN}")
+        else:
+            await application.updater.start_polling()
+
+        server = HTTPServer(make_web_app(application, executor), xheaders=True)
+        server.listen(PORT)
+        logger.info(f"Unified runtime serving bot and gateway on port {PORT}")
+
+        await stop.wait()
+
+        logger.info("Shutting down unified runtime...")
+        server.stop()
+        if application.updater.running:
+            await application.updater.stop()
+        await application.stop()
+        await bot.on_shutdown(application)
+
+    executor.shutdown(wait=True)
+    gateway.shutdown()
+
+
+def main():
+    if not bot.TOKEN:
+        logger.error("TELEGRAM_TOKEN not found in environment variables")
+        return
+    asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()
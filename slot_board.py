@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import threading
+import logging
+from functools import lru_cache
+from typing import Callable, Dict, Final, List, Optional, Tuple
+
+from store import SlotStore
+from telegram_dispatcher import TelegramAPIError
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def _board_frame(tournament_type: int, prize: int, bracket: int) -> Tuple[str, str]:
+    """Header and footer of a board, which only change with the bracket"""
+    title = f"₹{tournament_type} Tournament Slots" if bracket == 1 else f"₹{tournament_type} Tournament #{bracket} Slots"
+    return f"🛑 <b>{title}</b> 🛑\n\n", f"\n🏆 Winner receives ₹{prize}. All the best!"
+
+
+@lru_cache(maxsize=1024)
+def _slot_line(slot: int, user_id: Optional[int]) -> str:
+    if user_id:
+        return f'⚽ Slot {slot}: <a href="tg://user?id={user_id}">Player {user_id}</a>\n'
+    return f"⚽ Slot {slot}: _______\n"
+
+
+# Rendering caches by name, for their hit/miss statistics
+RENDER_CACHES: List[Tuple[str, Callable]] = [('board_frame', _board_frame), ('slot_line', _slot_line)]
+
+
+def render_board(tournament_type: int, slots: Dict[int, Optional[int]], prize: int, bracket: int = 1) -> str:
+    """Render the group slot board for one tournament bracket
+
+    The frame and each slot line are cached, so a re-render after one slot
+    changes only formats that slot's line and joins the rest.
+    """
+    header, footer = _board_frame(tournament_type, prize, bracket)
+    return header + "".join([_slot_line(slot, user_id) for slot, user_id in slots.items()]) + footer
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+# How Telegram describes an edit of a message that no longer exists
+MESSAGE_GONE: Final = ('message to edit not found', 'message_id_invalid')
+
+
+def is_not_modified(error: Exception) -> bool:
+    """The board already shows this text, e.g. another process made the same edit first"""
+    return 'message is not modified' in str(error).lower()
+
+
+def is_message_gone(error: Exception) -> bool:
+    description = str(error).lower()
+    return any(reason in description for reason in MESSAGE_GONE)
+
+
+class SlotBoard:
+    """One pinned board message per tournament tier, edited in place
+
+    The board's message ID and the hash of its last render live in the
+    shared store, so both processes edit the same message and neither one
+    re-sends a render that is already showing.
+    """
+
+    def __init__(self, store: SlotStore, tournaments: Dict[int, Dict], chat_id):
+        self.store = store
+        self.tournaments = tournaments
+        self.chat_id = chat_id
+
+    def render(self, tournament_type: int) -> str:
+        bracket = self.store.current_bracket(tournament_type)
+        return render_board(
+            tournament_type,
+            bracket['slots'],
+            self.tournaments[tournament_type]['prize'],
+            bracket['number']
+        )
+
+    def pending_update(self, tournament_type: int):
+        """Return ``(text, digest, message_id)`` or None if the board is unchanged"""
+        text = self.render(tournament_type)
+        digest = content_hash(text)
+        board = self.store.get_board(tournament_type)
+        if board and board['content_hash'] == digest:
+            return None
+        return text, digest, board['message_id'] if board else None
+
+    def saved(self, tournament_type: int, message_id: int, digest: str) -> None:
+        self.store.save_board(tournament_type, self.chat_id, message_id, digest)
+
+
+class ThreadedBoardUpdater:
+    """Debounced board updates over a ``TelegramDispatcher`` (gateway.py)"""
+
+    def __init__(self, board: SlotBoard, dispatcher, delay: float = 2.0):
+        self.board = board
+        self.dispatcher = dispatcher
+        self.delay = delay
+        self._timers: Dict[int, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def schedule(self, tournament_type: int) -> None:
+        """Request a board refresh; changes within ``delay`` share one edit"""
+        with self._lock:
+            if tournament_type in self._timers:
+                return
+            timer = threading.Timer(self.delay, self.flush, args=(tournament_type,))
+            timer.daemon = True
+            self._timers[tournament_type] = timer
+            timer.start()
+
+    def flush_all(self) -> None:
+        """Apply every scheduled refresh now (used on shutdown)"""
+        with self._lock:
+            pending = list(self._timers)
+            for timer in self._timers.values():
+                timer.cancel()
+        for tournament_type in pending:
+            self.flush(tournament_type)
+
+    def flush(self, tournament_type: int) -> None:
+        with self._lock:
+            self._timers.pop(tournament_type, None)
+        try:
+            update = self.board.pending_update(tournament_type)
+            if update is None:
+                return
+            text, digest, message_id = update
+            chat_id = self.board.chat_id
+
+            if message_id is not None:
+                try:
+                    self.dispatcher.request('editMessageText', chat_id, {
+                        'chat_id': chat_id,
+                        'message_id': message_id,
+                        'text': text,
+                        'parse_mode': 'HTML'
+                    }, raise_errors=True).result(timeout=60)
+                    edited = True
+                except TelegramAPIError as e:
+                    edited = is_not_modified(e)
+                    if not edited and not is_message_gone(e):
+                        # Left for the next change to retry; only a deleted board is reposted
+                        logger.warning(f"Could not edit ₹{tournament_type} slot board: {e}")
+                        return
+                if edited:
+                    self.board.saved(tournament_type, message_id, digest)
+                    return
+                logger.warning(f"₹{tournament_type} slot board was deleted, posting a new one")
+
+            # No board yet, or it was deleted: post a new one and pin it. The post is never
+            # coalesced with other group messages, which the next edit would erase
+            try:
+                sent = self.dispatcher.request('sendMessage', chat_id, {
+                    'chat_id': chat_id,
+                    'text': text,
+                    'parse_mode': 'HTML'
+                }, raise_errors=True).result(timeout=60)
+            except TelegramAPIError as e:
+                logger.error(f"Could not post ₹{tournament_type} slot board: {e}")
+                return
+            self.board.saved(tournament_type, sent['message_id'], digest)
+            self.dispatcher.request('pinChatMessage', chat_id, {
+                'chat_id': chat_id,
+                'message_id': sent['message_id'],
+                'disable_notification': True
+            })
+            logger.info(f"Posted new pinned board for ₹{tournament_type} tournament")
+        except Exception as e:
+            logger.error(f"Error updating slot board: {e}")
+
+
+class AsyncBoardUpdater:
+    """Debounced board updates through a python-telegram-bot ``Bot`` (bot.py)"""
+
+    def __init__(self, board: SlotBoard, delay: float = 2.0):
+        self.board = board
+        self.delay = delay
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, bot, tournament_type: int) -> None:
+        """Request a board refresh; changes within ``delay`` share one edit"""
+        if tournament_type in self._tasks:
+            return
+        self._tasks[tournament_type] = asyncio.create_task(self._flush_later(bot, tournament_type))
+
+    async def _flush_later(self, bot, tournament_type: int) -> None:
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self._tasks.pop(tournament_type, None)
+        try:
+            await self.flush(bot, tournament_type)
+        except Exception as e:
+            logger.error(f"Error updating slot board: {e}")
+
+    async def flush(self, bot, tournament_type: int) -> None:
+        update = self.board.pending_update(tournament_type)
+        if update is None:
+            return
+        text, digest, message_id = update
+        chat_id = self.board.chat_id
+
+        if message_id is not None:
+            try:
+                await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id, parse_mode='HTML')
+                self.board.saved(tournament_type, message_id, digest)
+                return
+            except Exception as e:
+                if is_not_modified(e):
+                    self.board.saved(tournament_type, message_id, digest)
+                    return
+                if not is_message_gone(e):
+                    logger.warning(f"Could not edit ₹{tournament_type} slot board: {e}")
+                    return
+                logger.warning(f"₹{tournament_type} slot board was deleted, posting a new one: {e}")
+
+        message = await bot.send_message(chat_id, text, parse_mode='HTML')
+        self.board.saved(tournament_type, message.message_id, digest)
+        await bot.pin_chat_message(chat_id, message.message_id, disable_notification=True)
+        logger.info(f"Posted new pinned board for ₹{tournament_type} tournament")
@@ -3,13 +3,18 @@
 # Make the script executable
 chmod +x start.sh
 
+# RUNTIME_MODE=unified (default) serves the bot and the gateway from one process on $PORT.
+# RUNTIME_MODE=split runs them as two processes.
+if [ "${RUNTIME_MODE:-unified}" = "unified" ]; then
+    echo "Starting unified bot and gateway runtime..."
+    exec python3 runtime.py
+fi
+
 # Start the Flask gateway server in the background
 echo "Starting Flask gateway server..."
-python3 gateway.py &
-
-# Wait a moment for the gateway to start
-sleep 2
+gunicorn -c gunicorn.conf.py gateway:app &
 
+# No need to wait for the gateway: the bot retries the payment event stream until it answers
 # Start the Telegram bot
 echo "Starting Telegram bot..."
 python3 bot.py
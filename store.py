@@ -0,0 +1,961 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Final, Dict, List, Optional
+
+from allocator import Assignment, SlotAllocator
+
+logger = logging.getLogger(__name__)
+
+DATABASE_PATH: Final = os.getenv('DATABASE_PATH', 'tournament.db')
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version)
+MIGRATIONS: List[str] = [
+    """
+    CREATE TABLE tournaments (
+        tournament_type INTEGER PRIMARY KEY,
+        prize INTEGER NOT NULL,
+        entry_fee INTEGER NOT NULL
+    );
+
+    CREATE TABLE slots (
+        tournament_type INTEGER NOT NULL REFERENCES tournaments(tournament_type),
+        slot INTEGER NOT NULL,
+        user_id INTEGER,
+        assigned_at INTEGER,
+        PRIMARY KEY (tournament_type, slot)
+    );
+    CREATE INDEX idx_slots_user ON slots(user_id);
+
+    CREATE TABLE registrations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        tournament_type INTEGER NOT NULL,
+        slot INTEGER,
+        status TEXT NOT NULL,
+        payment_id TEXT,
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_registrations_user ON registrations(user_id, tournament_type);
+    CREATE INDEX idx_registrations_payment ON registrations(payment_id);
+
+    CREATE TABLE payments (
+        payment_id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        tournament_type INTEGER,
+        amount INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_payments_user ON payments(user_id);
+    """,
+    """
+    CREATE TABLE webhook_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_webhook_events_status ON webhook_events(status, id);
+    """,
+    """
+    CREATE TABLE idempotency_keys (
+        key TEXT PRIMARY KEY,
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_idempotency_keys_created ON idempotency_keys(created_at);
+    """,
+    """
+    CREATE TABLE boards (
+        tournament_type INTEGER PRIMARY KEY,
+        chat_id TEXT NOT NULL,
+        message_id INTEGER NOT NULL,
+        content_hash TEXT NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    """,
+    """
+    ALTER TABLE tournaments ADD COLUMN capacity INTEGER NOT NULL DEFAULT 2;
+    ALTER TABLE tournaments ADD COLUMN overflow TEXT NOT NULL DEFAULT 'spill';
+
+    CREATE TABLE brackets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament_type INTEGER NOT NULL REFERENCES tournaments(tournament_type),
+        number INTEGER NOT NULL,
+        capacity INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'open',
+        created_at INTEGER NOT NULL,
+        UNIQUE (tournament_type, number)
+    );
+    CREATE INDEX idx_brackets_status ON brackets(tournament_type, status, number);
+
+    INSERT INTO brackets (tournament_type, number, capacity, created_at)
+        SELECT tournament_type, 1, COUNT(*), CAST(strftime('%s', 'now') AS INTEGER)
+        FROM slots GROUP BY tournament_type;
+
+    CREATE TABLE bracket_slots (
+        bracket_id INTEGER NOT NULL REFERENCES brackets(id),
+        slot INTEGER NOT NULL,
+        user_id INTEGER,
+        assigned_at INTEGER,
+        PRIMARY KEY (bracket_id, slot)
+    );
+    CREATE INDEX idx_bracket_slots_user ON bracket_slots(user_id);
+
+    INSERT INTO bracket_slots (bracket_id, slot, user_id, assigned_at)
+        SELECT brackets.id, slots.slot, slots.user_id, slots.assigned_at
+        FROM slots JOIN brackets ON brackets.tournament_type = slots.tournament_type AND brackets.number = 1;
+
+    DROP TABLE slots;
+
+    CREATE TABLE overflow_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tournament_type INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        payment_id TEXT,
+        created_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_overflow_queue_tier ON overflow_queue(tournament_type, id);
+
+    ALTER TABLE registrations ADD COLUMN bracket_id INTEGER;
+    """,
+    """
+    ALTER TABLE brackets ADD COLUMN champion INTEGER;
+    """,
+    """
+    ALTER TABLE payments ADD COLUMN payment_link_id TEXT;
+    ALTER TABLE payments ADD COLUMN collected_at INTEGER;
+    CREATE INDEX idx_payments_uncollected ON payments(collected_at, created_at);
+    """,
+    """
+    CREATE TABLE payment_events (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        payment_id TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        created_at INTEGER NOT NULL
+    );
+
+    CREATE TABLE consumer_offsets (
+        consumer TEXT PRIMARY KEY,
+        acked_id INTEGER NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        flags INTEGER NOT NULL DEFAULT 0,
+        cooldown_until INTEGER NOT NULL DEFAULT 0,
+        first_seen INTEGER NOT NULL
+    );
+    CREATE INDEX idx_users_cooldown ON users(cooldown_until);
+    """,
+    """
+    CREATE TABLE rate_limits (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE payment_links (
+        user_id INTEGER NOT NULL,
+        tournament_type INTEGER NOT NULL,
+        link_id TEXT NOT NULL,
+        short_url TEXT NOT NULL,
+        expires_at INTEGER NOT NULL,
+        created_at INTEGER NOT NULL,
+        PRIMARY KEY (user_id, tournament_type)
+    );
+    CREATE INDEX idx_payment_links_link ON payment_links(link_id);
+    """,
+    """
+    ALTER TABLE brackets ADD COLUMN format TEXT;
+
+    CREATE TABLE bracket_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bracket_id INTEGER NOT NULL REFERENCES brackets(id),
+        match_id INTEGER NOT NULL,
+        winner INTEGER NOT NULL,
+        reported_at INTEGER NOT NULL
+    );
+    CREATE INDEX idx_bracket_results_bracket ON bracket_results(bracket_id, id);
+
+    CREATE TABLE bracket_snapshots (
+        bracket_id INTEGER PRIMARY KEY REFERENCES brackets(id),
+        result_id INTEGER NOT NULL,
+        state BLOB NOT NULL,
+        saved_at INTEGER NOT NULL
+    );
+    """,
+    """
+    ALTER TABLE bracket_slots ADD COLUMN payment_id TEXT;
+    CREATE UNIQUE INDEX idx_bracket_slots_payment ON bracket_slots(payment_id);
+
+    DELETE FROM overflow_queue WHERE payment_id IS NOT NULL AND id NOT IN
+        (SELECT MIN(id) FROM overflow_queue WHERE payment_id IS NOT NULL GROUP BY payment_id);
+    CREATE UNIQUE INDEX idx_overflow_queue_payment ON overflow_queue(payment_id);
+    """,
+]
+
+
+class SlotStore:
+    """Tournament slot/registration store shared by bot.py and gateway.py
+
+    Backed by SQLite in WAL mode so both processes can read while one writes.
+    Each tier fills bracket instances of its configured capacity. Slot
+    assignment is a compare-and-set ``UPDATE ... WHERE user_id IS NULL``,
+    so concurrent webhooks and admin approvals can never overwrite each other.
+    Slot boards are cached in-process and the cache is dropped whenever
+    ``PRAGMA data_version`` shows another connection committed a change.
+    """
+
+    def __init__(self, path: str = DATABASE_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._board_cache: Dict[int, Dict] = {}
+        self._cache_data_version: Optional[int] = None
+        self._allocators: Dict[int, SlotAllocator] = {}
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Return this process's connection, reconnecting after a fork"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = self._connect()
+            self._conn_pid = os.getpid()
+            self._board_cache.clear()
+            self._cache_data_version = None
+            self._allocators.clear()
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=30000')
+        conn.execute('PRAGMA foreign_keys=ON')
+        self._migrate(conn)
+        return conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in script.split(';'):
+                    if statement.strip():
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {number}')
+                logger.info(f"Store schema migrated to version {number}")
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _invalidate(self) -> None:
+        self._board_cache.clear()
+
+    def ensure_tournaments(self, tournaments: Dict[int, Dict]) -> None:
+        """Create or update tiers and open the first bracket of new ones"""
+        with self._lock:
+            conn = self.conn
+            now = int(time.time())
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for tournament_type, tournament in tournaments.items():
+                    capacity = tournament.get('capacity', 2)
+                    conn.execute(
+                        'INSERT INTO tournaments (tournament_type, prize, entry_fee, capacity, overflow) '
+                        'VALUES (?, ?, ?, ?, ?) ON CONFLICT(tournament_type) DO UPDATE SET '
+                        'prize = excluded.prize, entry_fee = excluded.entry_fee, '
+                        'capacity = excluded.capacity, overflow = excluded.overflow',
+                        (tournament_type, tournament['prize'], tournament.get('entry_fee', tournament_type),
+                         capacity, tournament.get('overflow', 'spill'))
+                    )
+                    has_bracket = conn.execute(
+                        'SELECT 1 FROM brackets WHERE tournament_type = ? LIMIT 1', (tournament_type,)
+                    ).fetchone()
+                    if not has_bracket:
+                        self._create_bracket(tournament_type, 1, capacity, now)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            self._invalidate()
+            self._allocators.clear()
+
+    def _create_bracket(self, tournament_type: int, number: int, capacity: int, now: int) -> List[tuple]:
+        """Open a bracket instance, seating overflow players in it first (inside the caller's transaction)
+
+        Waiting players take the new bracket's lowest slots in the order
+        they paid, before anyone who pays later. Returns ``(user_id,
+        Assignment)`` for each of them.
+        """
+        conn = self.conn
+        cursor = conn.execute(
+            'INSERT OR IGNORE INTO brackets (tournament_type, number, capacity, created_at) VALUES (?, ?, ?, ?)',
+            (tournament_type, number, capacity, now)
+        )
+        if cursor.rowcount != 1:
+            return []
+        bracket_id = cursor.lastrowid
+
+        waiting = conn.execute(
+            'SELECT id, user_id, payment_id FROM overflow_queue WHERE tournament_type = ? ORDER BY id LIMIT ?',
+            (tournament_type, capacity)
+        ).fetchall()
+        conn.executemany('DELETE FROM overflow_queue WHERE id = ?', [(row[0],) for row in waiting])
+        seated = {slot: (user_id, payment_id) for slot, (_, user_id, payment_id) in enumerate(waiting, start=1)}
+        conn.executemany(
+            'INSERT INTO bracket_slots (bracket_id, slot, user_id, payment_id, assigned_at) VALUES (?, ?, ?, ?, ?)',
+            [(bracket_id, slot, *seated.get(slot, (None, None)), now if slot in seated else None)
+             for slot in range(1, capacity + 1)]
+        )
+
+        assignments = []
+        for slot, (user_id, payment_id) in seated.items():
+            assignment = Assignment(bracket_id, number, slot)
+            self._record_registration(user_id, tournament_type, assignment,
+                                      'paid' if payment_id else 'approved', payment_id, now)
+            assignments.append((user_id, assignment))
+        if assignments:
+            logger.info(f"Seated {len(assignments)} waiting players in ₹{tournament_type} bracket {number}")
+        return assignments
+
+    def _open_bracket(self, tournament_type: int) -> Optional[tuple]:
+        """Return ``(id, number, capacity)`` of the tier's current open bracket"""
+        return self.conn.execute(
+            "SELECT id, number, capacity FROM brackets WHERE tournament_type = ? AND status = 'open' "
+            "ORDER BY number LIMIT 1",
+            (tournament_type,)
+        ).fetchone()
+
+    def _read_bracket_slots(self, bracket_id: int) -> Dict[int, Optional[int]]:
+        rows = self.conn.execute(
+            'SELECT slot, user_id FROM bracket_slots WHERE bracket_id = ? ORDER BY slot',
+            (bracket_id,)
+        ).fetchall()
+        return {slot: user_id for slot, user_id in rows}
+
+    def current_bracket(self, tournament_type: int) -> Optional[Dict]:
+        """Return ``{id, number, capacity, slots}`` for the bracket currently filling up"""
+        with self._lock:
+            data_version = self.conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._cache_data_version:
+                self._board_cache.clear()
+                self._cache_data_version = data_version
+
+            bracket = self._board_cache.get(tournament_type)
+            if bracket is None:
+                row = self._open_bracket(tournament_type)
+                if row is None:
+                    return None
+                bracket = {
+                    'id': row[0],
+                    'number': row[1],
+                    'capacity': row[2],
+                    'slots': self._read_bracket_slots(row[0])
+                }
+                self._board_cache[tournament_type] = bracket
+            return dict(bracket, slots=dict(bracket['slots']))
+
+    def get_slots(self, tournament_type: int) -> Dict[int, Optional[int]]:
+        """Return the current slot board ``{slot: user_id}`` for a tournament"""
+        bracket = self.current_bracket(tournament_type)
+        return bracket['slots'] if bracket else {}
+
+    def _allocator(self, tournament_type: int, reload: bool = False) -> Optional[SlotAllocator]:
+        allocator = self._allocators.get(tournament_type)
+        if allocator is None or reload:
+            row = self._open_bracket(tournament_type)
+            if row is None:
+                self._allocators.pop(tournament_type, None)
+                return None
+            allocator = SlotAllocator(row[0], row[1], row[2], self._read_bracket_slots(row[0]))
+            self._allocators[tournament_type] = allocator
+        return allocator
+
+    def _overflow_policy(self, tournament_type: int) -> str:
+        row = self.conn.execute(
+            'SELECT overflow FROM tournaments WHERE tournament_type = ?', (tournament_type,)
+        ).fetchone()
+        return row[0] if row else 'spill'
+
+    def _spill(self, tournament_type: int, full: SlotAllocator, now: int) -> None:
+        """Close a full bracket and open the next instance of the tier (inside the caller's transaction)"""
+        conn = self.conn
+        # Compare-and-set on the bracket status so only one writer spills it
+        cursor = conn.execute(
+            "UPDATE brackets SET status = 'full' WHERE id = ? AND status = 'open' AND NOT EXISTS "
+            "(SELECT 1 FROM bracket_slots WHERE bracket_id = ? AND user_id IS NULL)",
+            (full.bracket_id, full.bracket_id)
+        )
+        if cursor.rowcount == 1:
+            capacity = conn.execute(
+                'SELECT capacity FROM tournaments WHERE tournament_type = ?', (tournament_type,)
+            ).fetchone()[0]
+            # Only a tier switched from 'queue' to 'spill' can still have waiting players to seat here
+            self._create_bracket(tournament_type, full.number + 1, capacity, now)
+            logger.info(f"₹{tournament_type} bracket {full.number} is full, opened bracket {full.number + 1}")
+
+    def _payment_assignment(self, payment_id: str) -> Optional[Assignment]:
+        """Where an earlier call already placed this payment's player, if anywhere"""
+        conn = self.conn
+        row = conn.execute(
+            'SELECT brackets.id, brackets.number, bracket_slots.slot FROM bracket_slots '
+            'JOIN brackets ON brackets.id = bracket_slots.bracket_id WHERE bracket_slots.payment_id = ?',
+            (payment_id,)
+        ).fetchone()
+        if row is not None:
+            return Assignment(row[0], row[1], row[2], duplicate=True)
+        row = conn.execute('SELECT tournament_type FROM overflow_queue WHERE payment_id = ?', (payment_id,)).fetchone()
+        if row is not None:
+            # Still waiting: report the open bracket, or the tier's latest one once that has closed
+            bracket = self._open_bracket(row[0]) or conn.execute(
+                'SELECT id, number FROM brackets WHERE tournament_type = ? ORDER BY number DESC LIMIT 1', (row[0],)
+            ).fetchone()
+            bracket_id, number = bracket[:2] if bracket else (None, 0)
+            return Assignment(bracket_id, number, None, duplicate=True)
+        return None
+
+    def _take_slot(self, tournament_type: int, user_id: int, payment_id: Optional[str],
+                   now: int) -> Optional[Assignment]:
+        conn = self.conn
+        while True:
+            allocator = self._allocator(tournament_type)
+            if allocator is None:
+                return None
+
+            slot = allocator.take()
+            if slot is None:
+                # The allocator may be stale (another process filled or opened a bracket); check the database
+                allocator = self._allocator(tournament_type, reload=True)
+                slot = allocator.take()
+
+            if slot is None:
+                if self._overflow_policy(tournament_type) == 'queue':
+                    conn.execute(
+                        'INSERT INTO overflow_queue (tournament_type, user_id, payment_id, created_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        (tournament_type, user_id, payment_id, now)
+                    )
+                    return Assignment(allocator.bracket_id, allocator.number, None)
+                self._spill(tournament_type, allocator, now)
+                self._allocators.pop(tournament_type, None)
+                continue
+
+            # Compare-and-set: only succeeds if nobody took the slot meanwhile
+            cursor = conn.execute(
+                'UPDATE bracket_slots SET user_id = ?, payment_id = ?, assigned_at = ? '
+                'WHERE bracket_id = ? AND slot = ? AND user_id IS NULL',
+                (user_id, payment_id, now, allocator.bracket_id, slot)
+            )
+            if cursor.rowcount == 1:
+                return Assignment(allocator.bracket_id, allocator.number, slot)
+
+            # The allocator was stale; rebuild it and retry
+            self._allocators.pop(tournament_type, None)
+
+    def assign_slot(self, tournament_type: int, user_id: int,
+                    payment_id: Optional[str] = None) -> Optional[Assignment]:
+        """Atomically place a paid player in the tier's current bracket
+
+        Takes a free slot from the allocator and confirms it with a
+        compare-and-set, so a player who already holds a slot is never
+        evicted. A full bracket either spills into a new bracket instance or
+        puts the player on the overflow queue, depending on the tier's
+        overflow policy. Returns None if the tournament does not exist.
+
+        The seat (or overflow entry), the registration record and the
+        payment's idempotency key are written in one transaction, with the
+        seat stored under ``payment_id``. Calling again with the same
+        payment returns the original assignment with ``duplicate`` set
+        instead of seating the player twice. Registrations are recorded as
+        'paid' with a payment ID (admin-approved disputes carry the disputed
+        payment's), 'approved' without one and 'waiting' on the overflow
+        queue.
+        """
+        with self._lock:
+            conn = self.conn
+            now = int(time.time())
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                assignment = self._payment_assignment(payment_id) if payment_id else None
+                if assignment is None:
+                    assignment = self._take_slot(tournament_type, user_id, payment_id, now)
+                    if assignment is not None:
+                        status = 'waiting' if assignment.queued else 'paid' if payment_id else 'approved'
+                        self._record_registration(user_id, tournament_type, assignment, status, payment_id, now)
+                        if payment_id:
+                            self._record_idempotency_key(payment_id, now)
+                conn.execute('COMMIT')
+                return assignment
+            except Exception:
+                conn.execute('ROLLBACK')
+                # The allocator may hold a take that was rolled back
+                self._allocators.pop(tournament_type, None)
+                raise
+            finally:
+                self._invalidate()
+
+    def filled_brackets(self, tournament_type: int) -> List[Dict]:
+        """Brackets of a tier whose slots are all taken and that have no champion yet"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, number FROM brackets WHERE tournament_type = ? AND status != 'finished' "
+                "AND NOT EXISTS (SELECT 1 FROM bracket_slots WHERE bracket_id = brackets.id AND user_id IS NULL) "
+                "ORDER BY number",
+                (tournament_type,)
+            ).fetchall()
+            return [
+                {'id': bracket_id, 'number': number,
+                 'players': list(self._read_bracket_slots(bracket_id).values())}
+                for bracket_id, number in rows
+            ]
+
+    def bracket_lineup(self, bracket_id: int) -> Optional[List[int]]:
+        """Players of a bracket in slot order, or None while it still has free slots"""
+        with self._lock:
+            players = list(self._read_bracket_slots(bracket_id).values())
+            if not players or None in players:
+                return None
+            return players
+
+    def finish_bracket(self, tournament_type: int, bracket_id: int, champion: int) -> List[tuple]:
+        """Record a bracket's champion; opens a new bracket if this one was still open
+
+        Returns ``(user_id, Assignment)`` of overflow players seated in the
+        new bracket.
+        """
+        with self._lock:
+            conn = self.conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute(
+                    "UPDATE brackets SET status = 'finished', champion = ? WHERE id = ?",
+                    (champion, bracket_id)
+                )
+                # The journal stays as the record of the results; the snapshot is no longer needed
+                conn.execute('DELETE FROM bracket_snapshots WHERE bracket_id = ?', (bracket_id,))
+                seated = []
+                if self._open_bracket(tournament_type) is None:
+                    number, capacity = conn.execute(
+                        'SELECT MAX(number), (SELECT capacity FROM tournaments WHERE tournament_type = ?) '
+                        'FROM brackets WHERE tournament_type = ?',
+                        (tournament_type, tournament_type)
+                    ).fetchone()
+                    seated = self._create_bracket(tournament_type, number + 1, capacity, int(time.time()))
+                conn.execute('COMMIT')
+                return seated
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            finally:
+                self._allocators.pop(tournament_type, None)
+                self._invalidate()
+
+    def start_bracket(self, bracket_id: int, bracket_format: str) -> str:
+        """Record the format a bracket's fixtures were drawn in; returns the format recorded first"""
+        with self._lock:
+            self.conn.execute('UPDATE brackets SET format = ? WHERE id = ? AND format IS NULL',
+                              (bracket_format, bracket_id))
+            row = self.conn.execute('SELECT format FROM brackets WHERE id = ?', (bracket_id,)).fetchone()
+            return row[0] if row and row[0] else bracket_format
+
+    def append_bracket_result(self, bracket_id: int, match_id: int, winner: int) -> int:
+        """Append a reported result to the bracket journal; returns its journal ID"""
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO bracket_results (bracket_id, match_id, winner, reported_at) VALUES (?, ?, ?, ?)',
+                (bracket_id, match_id, winner, int(time.time()))
+            )
+            return cursor.lastrowid
+
+    def bracket_results(self, bracket_id: int, after_id: int = 0) -> List[tuple]:
+        """``(id, match_id, winner)`` of a bracket's results journaled after ``after_id``, oldest first"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT id, match_id, winner FROM bracket_results WHERE bracket_id = ? AND id > ? ORDER BY id',
+                (bracket_id, after_id)
+            ).fetchall()
+
+    def get_bracket_snapshot(self, bracket_id: int) -> Optional[tuple]:
+        """``(result_id, state)``: the latest snapshot and the last journal ID it includes"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT result_id, state FROM bracket_snapshots WHERE bracket_id = ?', (bracket_id,)
+            ).fetchone()
+
+    def save_bracket_snapshots(self, snapshots: List[tuple]) -> None:
+        """Replace snapshots, given as ``(bracket_id, result_id, state)``, in one transaction"""
+        now = int(time.time())
+        with self._lock:
+            conn = self.conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO bracket_snapshots (bracket_id, result_id, state, saved_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    [(bracket_id, result_id, state, now) for bracket_id, result_id, state in snapshots]
+                )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def record_payment(self, payment_id: str, user_id: Optional[int], tournament_type: Optional[int],
+                       amount: int, status: str, payment_link_id: Optional[str] = None) -> bool:
+        """Store a payment; returns False if it was already recorded"""
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO payments '
+                '(payment_id, user_id, tournament_type, amount, status, created_at, payment_link_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (payment_id, user_id, tournament_type, amount, status, int(time.time()), payment_link_id)
+            )
+            return cursor.rowcount == 1
+
+    def collect_payments(self) -> Dict[str, Dict]:
+        """Return payments nobody has collected yet and mark them collected
+
+        Runs in one write transaction, so when several gateway workers are
+        asked at once every payment is handed out exactly once.
+        """
+        with self._lock:
+            conn = self.conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute(
+                    'SELECT payment_id, user_id, tournament_type, amount, payment_link_id, created_at '
+                    'FROM payments WHERE collected_at IS NULL ORDER BY created_at'
+                ).fetchall()
+                conn.execute('UPDATE payments SET collected_at = ? WHERE collected_at IS NULL', (int(time.time()),))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            return {
+                payment_id: {
+                    'user_id': user_id,
+                    'tournament_type': tournament_type,
+                    'amount': amount,
+                    'payment_id': payment_link_id,
+                    'timestamp': datetime.utcfromtimestamp(created_at).isoformat()
+                }
+                for payment_id, user_id, tournament_type, amount, payment_link_id, created_at in rows
+            }
+
+    def _record_registration(self, user_id: int, tournament_type: int, assignment: Assignment,
+                             status: str, payment_id: Optional[str], now: int) -> None:
+        self.conn.execute(
+            'INSERT INTO registrations (user_id, tournament_type, slot, status, payment_id, bracket_id, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (user_id, tournament_type, assignment.slot, status, payment_id, assignment.bracket_id, now)
+        )
+
+    def enqueue_webhook(self, event: str, payload: bytes) -> int:
+        """Durably queue a verified webhook delivery (the raw body) for background processing"""
+        now = int(time.time())
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO webhook_events (event, payload, created_at, updated_at) VALUES (?, ?, ?, ?)',
+                (event, payload, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim_webhook(self) -> Optional[tuple]:
+        """Take the oldest pending webhook event; returns ``(id, payload)`` or None"""
+        with self._lock:
+            conn = self.conn
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    "SELECT id, payload FROM webhook_events WHERE status = 'pending' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE webhook_events SET status = 'processing', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ?",
+                        (int(time.time()), row[0])
+                    )
+                conn.execute('COMMIT')
+                return row
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def complete_webhook(self, event_id: int) -> None:
+        """Mark a webhook event as processed"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE webhook_events SET status = 'done', updated_at = ? WHERE id = ?",
+                (int(time.time()), event_id)
+            )
+
+    def fail_webhook(self, event_id: int, error: str, max_attempts: int) -> None:
+        """Return a failed webhook event to the queue, or park it after too many attempts"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE webhook_events SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (max_attempts, error, int(time.time()), event_id)
+            )
+
+    def requeue_stale_webhooks(self, older_than: int, max_attempts: int) -> int:
+        """Put events stuck in 'processing' (e.g. after a crash) back in the queue
+
+        Like ``fail_webhook``, an event that has used up its attempts is
+        parked as 'failed' instead, so one that always kills its worker is
+        not claimed forever.
+        """
+        with self._lock:
+            now = int(time.time())
+            cursor = self.conn.execute(
+                "UPDATE webhook_events SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "last_error = 'abandoned in processing', updated_at = ? "
+                "WHERE status = 'processing' AND updated_at < ?",
+                (max_attempts, now, now - older_than)
+            )
+            return cursor.rowcount
+
+    def purge_webhooks(self, finished_before: int) -> int:
+        """Delete 'done' and 'failed' webhook events last updated before ``finished_before``"""
+        with self._lock:
+            return self.conn.execute(
+                "DELETE FROM webhook_events WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (finished_before,)
+            ).rowcount
+
+    def webhook_queue_depth(self) -> int:
+        """Number of webhook events waiting to be processed"""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM webhook_events WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def append_payment_event(self, payment_id: str, payload: str) -> int:
+        """Append a payment to the event stream; returns its event ID
+
+        A payment is only appended once, so a redelivered webhook gets the
+        ID of the original event back.
+        """
+        with self._lock:
+            conn = self.conn
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO payment_events (payment_id, payload, created_at) VALUES (?, ?, ?)',
+                (payment_id, payload, int(time.time()))
+            )
+            if cursor.rowcount == 1:
+                return cursor.lastrowid
+            return conn.execute('SELECT id FROM payment_events WHERE payment_id = ?', (payment_id,)).fetchone()[0]
+
+    def read_payment_events(self, consumer: str, after: Optional[int] = None, limit: int = 100) -> List[tuple]:
+        """Return ``(id, payload)`` of events past the consumer's acknowledged offset
+
+        ``after`` lets a consumer read ahead of its last acknowledgement, but
+        never behind it.
+        """
+        with self._lock:
+            start = max(after or 0, self.consumer_offset(consumer))
+            return self.conn.execute(
+                'SELECT id, payload FROM payment_events WHERE id > ? ORDER BY id LIMIT ?',
+                (start, limit)
+            ).fetchall()
+
+    def consumer_offset(self, consumer: str) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT acked_id FROM consumer_offsets WHERE consumer = ?', (consumer,)
+            ).fetchone()
+            return row[0] if row else 0
+
+    def ack_payment_events(self, consumer: str, event_id: int) -> int:
+        """Acknowledge every event up to ``event_id``; returns the consumer's offset"""
+        with self._lock:
+            self.conn.execute(
+                'INSERT INTO consumer_offsets (consumer, acked_id, updated_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(consumer) DO UPDATE SET acked_id = MAX(acked_id, excluded.acked_id), '
+                'updated_at = excluded.updated_at',
+                (consumer, event_id, int(time.time()))
+            )
+            return self.consumer_offset(consumer)
+
+    def purge_payment_events(self, expired_before: int) -> int:
+        """Delete events created before ``expired_before`` that every active consumer has acknowledged
+
+        A consumer that has not acknowledged anything since ``expired_before``
+        is treated as gone and no longer holds events back. With no active
+        consumers (the unified runtime delivers in-process and never acks)
+        events are kept until they expire. Returns the number removed.
+        """
+        with self._lock:
+            return self.conn.execute(
+                'DELETE FROM payment_events WHERE created_at < ? AND id <= COALESCE('
+                '(SELECT MIN(acked_id) FROM consumer_offsets WHERE updated_at >= ?), '
+                '(SELECT MAX(id) FROM payment_events))',
+                (expired_before, expired_before)
+            ).rowcount
+
+    def claim_idempotency_key(self, key: str, now: int, expired_before: int) -> bool:
+        """Insert a key, or take over an expired one; False if it is already claimed"""
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO idempotency_keys (key, created_at) VALUES (?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET created_at = excluded.created_at '
+                'WHERE idempotency_keys.created_at < ?',
+                (key, now, expired_before)
+            )
+            return cursor.rowcount == 1
+
+    def has_idempotency_key(self, key: str, expired_before: int) -> bool:
+        """Return True if an unexpired key exists"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT 1 FROM idempotency_keys WHERE key = ? AND created_at >= ?',
+                (key, expired_before)
+            ).fetchone()
+            return row is not None
+
+    def _record_idempotency_key(self, key: str, now: int) -> None:
+        self.conn.execute(
+            'INSERT INTO idempotency_keys (key, created_at) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET created_at = excluded.created_at',
+            (key, now)
+        )
+
+    def purge_idempotency_keys(self, expired_before: int) -> int:
+        """Delete expired keys; returns the number removed"""
+        with self._lock:
+            cursor = self.conn.execute('DELETE FROM idempotency_keys WHERE created_at < ?', (expired_before,))
+            return cursor.rowcount
+
+    def get_user(self, user_id: int) -> Optional[tuple]:
+        """Return ``(flags, cooldown_until)`` for a user, or None if never seen"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT flags, cooldown_until FROM users WHERE user_id = ?', (user_id,)
+            ).fetchone()
+
+    def update_user(self, user_id: int, flags: int = 0, cooldown_until: Optional[int] = None) -> None:
+        """Add flags to a user and optionally set their cooldown, creating the row if needed"""
+        with self._lock:
+            self.conn.execute(
+                'INSERT INTO users (user_id, flags, cooldown_until, first_seen) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET flags = flags | excluded.flags, '
+                'cooldown_until = COALESCE(?, cooldown_until)',
+                (user_id, flags, cooldown_until or 0, int(time.time()), cooldown_until)
+            )
+
+    def active_cooldowns(self, now: int) -> List[tuple]:
+        """Return ``(user_id, cooldown_until)`` of cooldowns still running, soonest expiry first"""
+        with self._lock:
+            return self.conn.execute(
+                'SELECT user_id, cooldown_until FROM users WHERE cooldown_until > ? ORDER BY cooldown_until',
+                (now,)
+            ).fetchall()
+
+    def count_users(self) -> int:
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def take_rate_token(self, key: str, capacity: float, rate: float, now: float) -> bool:
+        """Take one token from a shared token bucket; False if the bucket is empty
+
+        The refill and the take happen in a single UPSERT, so concurrent bot
+        workers can never spend the same token twice.
+        """
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO rate_limits (key, tokens, updated_at) VALUES (?, ? - 1, ?) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'tokens = MIN(?, tokens + (excluded.updated_at - updated_at) * ?) - 1, '
+                'updated_at = excluded.updated_at '
+                'WHERE MIN(?, tokens + (excluded.updated_at - updated_at) * ?) >= 1',
+                (key, capacity, now, capacity, rate, capacity, rate)
+            )
+            return cursor.rowcount == 1
+
+    def purge_rate_limits(self, idle_before: float, prefix: str = '') -> int:
+        """Delete buckets (whose key starts with ``prefix``) untouched since ``idle_before``
+
+        Callers pick ``idle_before`` so that those buckets would be full again anyway.
+        """
+        with self._lock:
+            return self.conn.execute(
+                "DELETE FROM rate_limits WHERE updated_at < ? AND key LIKE ? || '%'", (idle_before, prefix)
+            ).rowcount
+
+    def get_payment_link(self, user_id: int, tournament_type: int, valid_until: int) -> Optional[Dict]:
+        """Return ``{link_id, short_url, expires_at}`` of an unpaid link still valid at ``valid_until``"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT link_id, short_url, expires_at FROM payment_links '
+                'WHERE user_id = ? AND tournament_type = ? AND expires_at > ?',
+                (user_id, tournament_type, valid_until)
+            ).fetchone()
+            if row is None:
+                return None
+            return {'link_id': row[0], 'short_url': row[1], 'expires_at': row[2]}
+
+    def save_payment_link(self, user_id: int, tournament_type: int, link_id: str,
+                          short_url: str, expires_at: int) -> None:
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO payment_links '
+                '(user_id, tournament_type, link_id, short_url, expires_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (user_id, tournament_type, link_id, short_url, expires_at, int(time.time()))
+            )
+
+    def drop_payment_link(self, link_id: Optional[str] = None, user_id: Optional[int] = None,
+                          tournament_type: Optional[int] = None) -> int:
+        """Forget a cached link by its ID, or by user and tier; returns the number removed"""
+        with self._lock:
+            if link_id:
+                cursor = self.conn.execute('DELETE FROM payment_links WHERE link_id = ?', (link_id,))
+            else:
+                cursor = self.conn.execute(
+                    'DELETE FROM payment_links WHERE user_id = ? AND tournament_type = ?',
+                    (user_id, tournament_type)
+                )
+            return cursor.rowcount
+
+    def get_board(self, tournament_type: int) -> Optional[Dict]:
+        """Return the pinned board message for a tournament, if one was posted"""
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT chat_id, message_id, content_hash FROM boards WHERE tournament_type = ?',
+                (tournament_type,)
+            ).fetchone()
+            if row is None:
+                return None
+            return {'chat_id': row[0], 'message_id': row[1], 'content_hash': row[2]}
+
+    def save_board(self, tournament_type: int, chat_id, message_id: int, content_hash: str) -> None:
+        """Remember the board message and the hash of what it currently shows"""
+        with self._lock:
+            self.conn.execute(
+                'INSERT INTO boards (tournament_type, chat_id, message_id, content_hash, updated_at) '
+                'VALUES (?, ?, ?, ?, ?) ON CONFLICT(tournament_type) DO UPDATE SET '
+                'chat_id = excluded.chat_id, message_id = excluded.message_id, '
+                'content_hash = excluded.content_hash, updated_at = excluded.updated_at',
+                (tournament_type, str(chat_id), message_id, content_hash, int(time.time()))
+            )
+
+    def close(self) -> None:
+        """Close this process's connection"""
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+            self._conn_pid = None
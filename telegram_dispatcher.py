@@ -0,0 +1,376 @@
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from typing import Final, Deque, Dict, List, Optional, Set
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = metrics.histogram('telegram_api_request_seconds', 'Outbound Telegram Bot API calls by method and result',
+                                    ['method', 'result'])
+
+# Telegram's documented limits: ~30 messages/second overall, about one
+# message per second to the same private chat and 20 per minute to a group
+GLOBAL_RATE: Final = 30.0
+PRIVATE_CHAT_RATE: Final = 1.0
+GROUP_CHAT_RATE: Final = 20.0 / 60.0
+MAX_MESSAGE_LENGTH: Final = 4096
+MAX_ATTEMPTS: Final = 5
+
+# Buckets shared between processes through the store; idle ones are full again and get purged
+SHARED_KEY_PREFIX: Final = 'telegram:'
+SHARED_IDLE_SECONDS: Final = 60
+SHARED_PURGE_EVERY: Final = 1000
+
+
+class TokenBucket:
+    """Classic token bucket; callers pass in the current monotonic time"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class TelegramAPIError(Exception):
+    """A Bot API call that Telegram rejected, or that still failed after every retry"""
+
+    def __init__(self, method: str, status: Optional[int], description: str):
+        super().__init__(f"{method} failed ({status}): {description}")
+        self.method = method
+        self.status = status  # None when the call never got an answer
+        self.description = description
+
+
+class OutboundMessage:
+    __slots__ = ('chat_id', 'method', 'payload', 'raise_errors', 'future', 'enqueued_at', 'attempts')
+
+    def __init__(self, chat_id, method: str, payload: dict, raise_errors: bool = False):
+        self.chat_id = chat_id
+        self.method = method
+        self.payload = payload
+        self.raise_errors = raise_errors
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class ChatState:
+    __slots__ = ('queue', 'bucket', 'blocked_until')
+
+    def __init__(self, rate: float):
+        self.queue: Deque[OutboundMessage] = deque()
+        self.bucket = TokenBucket(rate, capacity=3 if rate >= 1 else 1)
+        self.blocked_until = 0.0
+
+
+class TelegramDispatcher:
+    """Rate-limited outbound queue for Telegram Bot API calls
+
+    Messages are queued per chat and sent by a few sender threads over one
+    pooled ``requests.Session``. A global token bucket and one bucket per
+    chat keep us under Telegram's limits, a 429 ``retry_after`` pauses just
+    that chat, and plain messages queued for the same chat are coalesced
+    into one request. Messages queued with ``raise_errors`` are never
+    coalesced.
+
+    With a ``store``, every send also takes its tokens from the same buckets
+    kept in SQLite (``SlotStore.take_rate_token``), so the limits hold for
+    all gateway worker processes together rather than for each one. The
+    in-process buckets still pace this process's senders between those
+    checks.
+    """
+
+    def __init__(self, token: Optional[str], api_url: str = 'https://api.telegram.org',
+                 senders: int = 4, timeout: tuple = (5, 15), store: Optional[SlotStore] = None):
+        self.url = f"{api_url}/bot{token}"
+        self.store = store
+        self._shared_takes = 0
+        self.timeout = timeout
+        self.senders = senders
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=senders)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._cond = threading.Condition()
+        self._global = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_RATE)
+        self._chats: Dict[object, ChatState] = {}
+        self._ready: Deque[object] = deque()
+        self._in_flight: Set[object] = set()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+        self._pending = 0
+        self._sent = 0
+        self._failed = 0
+        self._coalesced = 0
+        self._rate_limited = 0
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+    def start(self) -> None:
+        """Start the sender threads (no-op if already running)"""
+        if self._threads:
+            return
+        self._stopping = False
+        for number in range(self.senders):
+            thread = threading.Thread(target=self._run, name=f"telegram-sender-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush queued messages (up to ``timeout`` seconds) and stop the senders"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending and time.monotonic() < deadline:
+                self._cond.wait(0.1)
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self.session.close()
+
+    def send(self, chat_id, text: str, reply_markup: Optional[dict] = None) -> Future:
+        """Queue a message; the future resolves to the sent Message dict (None on failure)"""
+        payload = {'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}
+        if reply_markup is not None:
+            payload['reply_markup'] = reply_markup
+        return self.request('sendMessage', chat_id, payload)
+
+    def request(self, method: str, chat_id, payload: dict, raise_errors: bool = False) -> Future:
+        """Queue any chat-scoped Bot API call; the future resolves to its ``result``
+
+        A failed call resolves to None, or with ``raise_errors`` raises
+        ``TelegramAPIError`` so the caller can tell failures apart.
+        """
+        message = OutboundMessage(chat_id, method, payload, raise_errors)
+        with self._cond:
+            state = self._chats.get(chat_id)
+            if state is None:
+                state = ChatState(GROUP_CHAT_RATE if str(chat_id).startswith('-') else PRIVATE_CHAT_RATE)
+                self._chats[chat_id] = state
+            if not state.queue and chat_id not in self._in_flight:
+                self._ready.append(chat_id)
+            state.queue.append(message)
+            self._pending += 1
+            self._cond.notify()
+        return message.future
+
+    def stats(self) -> dict:
+        """Queue depth, delivery counters and send latency (milliseconds)"""
+        with self._cond:
+            latencies = sorted(self._latencies)
+            return {
+                'queue_depth': self._pending,
+                'chats_waiting': len(self._ready),
+                'in_flight': len(self._in_flight),
+                'sent': self._sent,
+                'failed': self._failed,
+                'coalesced': self._coalesced,
+                'rate_limited': self._rate_limited,
+                'latency_ms': {
+                    'avg': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0,
+                    'p95': round(latencies[int(len(latencies) * 0.95)] * 1000, 1) if latencies else 0,
+                }
+            }
+
+    def _next_batch(self, now: float):
+        """Pick the next chat allowed to send; returns ``(batch, wait)``"""
+        wait = None
+        for _ in range(len(self._ready)):
+            chat_id = self._ready[0]
+            self._ready.rotate(-1)
+            state = self._chats[chat_id]
+            delay = max(state.blocked_until - now, state.bucket.delay(now))
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+
+            global_delay = self._global.delay(now)
+            if global_delay > 0:
+                return None, global_delay
+
+            empty = self._take_shared(chat_id, state)
+            if empty == 'chat':
+                state.blocked_until = now + 1 / state.bucket.rate
+                wait = 1 / state.bucket.rate if wait is None else min(wait, 1 / state.bucket.rate)
+                continue
+            if empty == 'global':
+                return None, 1 / GLOBAL_RATE
+
+            state.bucket.consume(now)
+            self._global.consume(now)
+            self._ready.remove(chat_id)
+            self._in_flight.add(chat_id)
+            return self._coalesce(state.queue), 0.0
+        return None, wait
+
+    def _take_shared(self, chat_id, state: ChatState) -> Optional[str]:
+        """Take one send from the buckets shared with other processes; names the bucket that was empty"""
+        if self.store is None:
+            return None
+        now = time.time()
+        try:
+            self._shared_takes += 1
+            if self._shared_takes % SHARED_PURGE_EVERY == 0:
+                self.store.purge_rate_limits(now - SHARED_IDLE_SECONDS, prefix=SHARED_KEY_PREFIX)
+            if not self.store.take_rate_token(f"{SHARED_KEY_PREFIX}chat:{chat_id}", state.bucket.capacity,
+                                              state.bucket.rate, now):
+                return 'chat'
+            if not self.store.take_rate_token(f"{SHARED_KEY_PREFIX}global", GLOBAL_RATE, GLOBAL_RATE, now):
+                return 'global'
+        except Exception as e:
+            # Telegram's own 429s still pause the chat if the store is unavailable
+            logger.error(f"Error taking shared Telegram rate tokens: {e}")
+        return None
+
+    @staticmethod
+    def _coalescable(message: OutboundMessage) -> bool:
+        # A caller that checks its own result (e.g. the board it will edit and pin) gets its own request
+        return message.method == 'sendMessage' and 'reply_markup' not in message.payload and not message.raise_errors
+
+    def _coalesce(self, queue: Deque[OutboundMessage]) -> List[OutboundMessage]:
+        batch = [queue.popleft()]
+        if not self._coalescable(batch[0]):
+            return batch
+        length = len(batch[0].payload['text'])
+        while (queue and self._coalescable(queue[0])
+               and length + 2 + len(queue[0].payload['text']) <= MAX_MESSAGE_LENGTH):
+            message = queue.popleft()
+            length += 2 + len(message.payload['text'])
+            batch.append(message)
+        self._coalesced += len(batch) - 1
+        return batch
+
+    def _finish(self, chat_id, batch: List[OutboundMessage], requeue: bool, now: float) -> None:
+        """Release a chat after a send attempt (called with the lock held)"""
+        self._in_flight.discard(chat_id)
+        state = self._chats[chat_id]
+        if requeue:
+            state.queue.extendleft(reversed(batch))
+        else:
+            self._pending -= len(batch)
+        if state.queue:
+            self._ready.append(chat_id)
+        elif state.bucket.is_full(now) and state.blocked_until <= now:
+            del self._chats[chat_id]
+        self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopping:
+                        return
+                    batch, wait = self._next_batch(time.monotonic())
+                    if batch is not None:
+                        break
+                    self._cond.wait(wait)
+
+            chat_id = batch[0].chat_id
+            requeue, result = self._deliver(chat_id, batch)
+
+            with self._cond:
+                self._finish(chat_id, batch, requeue, time.monotonic())
+            if not requeue:
+                for message in batch:
+                    if not isinstance(result, TelegramAPIError):
+                        message.future.set_result(result)
+                    elif message.raise_errors:
+                        message.future.set_exception(result)
+                    else:
+                        message.future.set_result(None)
+
+    def _deliver(self, chat_id, batch: List[OutboundMessage]):
+        """Send one (possibly coalesced) request; returns ``(requeue, result)``"""
+        payload = batch[0].payload
+        if len(batch) > 1:
+            payload = dict(payload, text='\n\n'.join(message.payload['text'] for message in batch))
+
+        for message in batch:
+            message.attempts += 1
+        started = time.monotonic()
+        try:
+            response = self.session.post(f"{self.url}/{batch[0].method}", json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            REQUEST_SECONDS.labels(batch[0].method, 'error').observe(time.monotonic() - started)
+            logger.warning(f"Telegram send to {chat_id} failed: {e}")
+            return self._retry_or_fail(chat_id, batch, backoff=2 ** batch[0].attempts)
+
+        elapsed = time.monotonic() - started
+        REQUEST_SECONDS.labels(batch[0].method, response.status_code).observe(elapsed)
+        with self._cond:
+            self._latencies.append(elapsed)
+
+        if response.status_code == 200:
+            with self._cond:
+                self._sent += 1
+            try:
+                return False, response.json().get('result', True)
+            except ValueError:
+                return False, True
+
+        if response.status_code == 429:
+            try:
+                retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+            except ValueError:
+                retry_after = 1
+            logger.warning(f"Telegram rate limit for chat {chat_id}, retrying after {retry_after}s")
+            with self._cond:
+                self._rate_limited += 1
+                self._chats[chat_id].blocked_until = time.monotonic() + retry_after
+            # A 429 is not a failed delivery, so it does not count towards MAX_ATTEMPTS
+            for message in batch:
+                message.attempts -= 1
+            return True, None
+
+        if response.status_code >= 500:
+            logger.warning(f"Telegram returned {response.status_code} for chat {chat_id}")
+            return self._retry_or_fail(chat_id, batch, backoff=2 ** batch[0].attempts)
+
+        logger.error(f"Telegram rejected {batch[0].method} for {chat_id}: {response.text}")
+        with self._cond:
+            self._failed += len(batch)
+        try:
+            description = response.json().get('description', response.text)
+        except ValueError:
+            description = response.text
+        return False, TelegramAPIError(batch[0].method, response.status_code, description)
+
+    def _retry_or_fail(self, chat_id, batch: List[OutboundMessage], backoff: float):
+        with self._cond:
+            if batch[0].attempts >= MAX_ATTEMPTS:
+                self._failed += len(batch)
+                return False, TelegramAPIError(batch[0].method, None, f"gave up after {MAX_ATTEMPTS} attempts")
+            self._chats[chat_id].blocked_until = time.monotonic() + backoff
+            return True, None
@@ -0,0 +1,83 @@
+"""Shared setup for the test suite
+
+The gateway is imported against a throwaway database with tracing off and
+Telegram pointed at a closed port. Each test gets its own store, and the
+gateway's notifications are recorded instead of sent.
+"""
+import os
+import sys
+import json
+import tempfile
+
+import pytest
+
+DATA_DIR = tempfile.mkdtemp(prefix='tests-')
+
+os.environ['DATABASE_PATH'] = os.path.join(DATA_DIR, 'gateway.db')
+os.environ['TRACE_FILE'] = ''
+os.environ['TELEGRAM_API_URL'] = 'http://127.0.0.1:9'
+os.environ.pop('TELEGRAM_TOKEN', None)
+os.environ.pop('PAYMENT_GATEWAY_SECRET', None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def payment_webhook(user_id: int, tier: int, event: str = 'payment_link.paid') -> bytes:
+    """A delivery of one payment for a bot-issued payment link, as ``payment_link.paid`` or ``payment.captured``"""
+    notes = {'user_id': str(user_id), 'tournament_type': str(tier), 'authorized_user': str(user_id)}
+    payload = {'payment': {'entity': {
+        'id': f"pay_{user_id:014d}", 'amount': tier * 100, 'status': 'captured', 'notes': notes
+    }}}
+    if event == 'payment_link.paid':
+        payload['payment_link'] = {'entity': {
+            'id': f"plink_{user_id:014d}", 'amount': tier * 100, 'status': 'paid', 'notes': notes
+        }}
+    return json.dumps({'event': event, 'payload': payload}).encode()
+
+
+class Gateway:
+    """The gateway module wired to a test's own store"""
+
+    def __init__(self, module, path: str, monkeypatch):
+        self.module = module
+        self.path = path
+        self.monkeypatch = monkeypatch
+        self.sent = []
+        monkeypatch.setattr(module, 'send_telegram_message',
+                            lambda chat_id, text, **kwargs: self.sent.append((chat_id, text)) or True)
+        monkeypatch.setattr(module, 'update_tournament_group', lambda *args: None)
+        self.restart()
+
+    def restart(self) -> None:
+        """Drop every in-process structure, as a new process on the same database would"""
+        from store import SlotStore
+        from events import PaymentChannel
+        from matchmaking import Matchmaker
+        from idempotency import IdempotencyGuard
+
+        self.store = SlotStore(self.path)
+        self.store.ensure_tournaments(self.module.TOURNAMENTS)
+        self.monkeypatch.setattr(self.module, 'store', self.store)
+        self.monkeypatch.setattr(self.module, 'matchmaker', Matchmaker(self.store, self.module.TOURNAMENTS))
+        self.monkeypatch.setattr(self.module, 'idempotency', IdempotencyGuard(self.store))
+        self.monkeypatch.setattr(self.module, 'payment_channel', PaymentChannel(self.store))
+
+    def seats(self, user_id: int) -> list:
+        """``(bracket_id, slot)`` of every seat the user holds"""
+        return self.store.conn.execute(
+            'SELECT bracket_id, slot FROM bracket_slots WHERE user_id = ? ORDER BY bracket_id, slot', (user_id,)
+        ).fetchall()
+
+    def notified(self, user_id: int) -> int:
+        return sum(1 for chat_id, _ in self.sent if chat_id == user_id)
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    import gateway
+    return Gateway(gateway, str(tmp_path / 'store.db'), monkeypatch)
+
+
+@pytest.fixture
+def tier(gateway):
+    return min(gateway.module.TOURNAMENTS)
@@ -0,0 +1,39 @@
+"""Approving a disputed payment seats the player once, however often Approve is tapped"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from matchmaking import Matchmaker
+from store import SlotStore
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    import bot
+    store = SlotStore(str(tmp_path / 'store.db'))
+    store.ensure_tournaments(bot.TOURNAMENTS)
+    monkeypatch.setattr(bot, 'store', store)
+    monkeypatch.setattr(bot, 'matchmaker', Matchmaker(store, bot.TOURNAMENTS))
+    monkeypatch.setattr(bot, 'update_group', AsyncMock())
+    return bot
+
+
+def tap_approve(bot, callback_data: str):
+    query = SimpleNamespace(data=callback_data, answer=AsyncMock(), edit_message_text=AsyncMock())
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=bot.ADMIN_ID))
+    context = SimpleNamespace(bot=SimpleNamespace(send_message=AsyncMock()))
+    asyncio.run(bot.approve_decline_callback(update, context))
+    return query, context
+
+
+def test_double_tapped_approve_seats_the_player_once(bot):
+    tier = min(bot.TOURNAMENTS)
+    _, first = tap_approve(bot, f"approve_{tier}_77_pay_00000000000077")
+    query, second = tap_approve(bot, f"approve_{tier}_77_pay_00000000000077")
+
+    assert list(bot.store.get_slots(tier).values()).count(77) == 1
+    assert first.bot.send_message.await_count == 1
+    assert second.bot.send_message.await_count == 0
+    assert 'Already approved' in query.edit_message_text.await_args.args[0]
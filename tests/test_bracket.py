@@ -0,0 +1,115 @@
+"""Results propagate through each bracket format, and bad reports are rejected"""
+import itertools
+
+import pytest
+
+from bracket import BYE, Bracket, DoubleElimination, SingleElimination, Swiss, create_bracket
+
+
+def play_out(bracket, pick=min):
+    """Report every ready match until none is left; ``pick`` chooses each winner"""
+    while bracket.ready_matches():
+        match = bracket.ready_matches()[0]
+        bracket.report(match.match_id, pick(match.player_a, match.player_b))
+
+
+def test_base_bracket_has_no_champion():
+    assert Bracket([1, 2]).champion is None
+
+
+def test_single_elimination_advances_winners_to_the_final():
+    bracket = SingleElimination([1, 2, 3, 4])
+    assert [(m.player_a, m.player_b) for m in bracket.ready_matches()] == [(1, 4), (2, 3)]
+
+    first, second = bracket.ready_matches()
+    assert bracket.report(first.match_id, 1) == [first.match_id, bracket.final]
+    assert bracket.ready_matches() == [second]
+    bracket.report(second.match_id, 3)
+
+    final = bracket.match(bracket.final)
+    assert (final.player_a, final.player_b) == (1, 3)
+    assert not bracket.is_complete
+    bracket.report(bracket.final, 3)
+    assert bracket.champion == 3
+
+
+@pytest.mark.parametrize('size', [3, 5, 6, 7])
+def test_odd_sizes_give_top_seeds_byes(size):
+    players = list(range(1, size + 1))
+    bracket = SingleElimination(players)
+
+    byes = [m for m in bracket.matches() if m.round == 1 and BYE in (m.player_a, m.player_b)]
+    assert len(byes) == 8 - size if size > 4 else 4 - size
+    assert sorted(m.winner for m in byes) == players[:len(byes)]
+    play_out(bracket)
+    assert bracket.champion == 1
+
+
+def test_double_elimination_knocks_out_after_two_losses():
+    bracket = DoubleElimination([1, 2, 3, 4])
+    losses = {player: 0 for player in range(1, 5)}
+    while bracket.ready_matches():
+        match = bracket.ready_matches()[0]
+        # The higher ID always wins, except the losers-bracket champion takes the grand final
+        winner = match.player_b if match.match_id == bracket.grand_final else max(match.player_a, match.player_b)
+        loser = match.player_b if winner == match.player_a else match.player_a
+        assert losses[winner] < 2 and losses[loser] < 2
+        bracket.report(match.match_id, winner)
+        losses[loser] += 1
+
+    # 4 lost only in the grand final, which forced the reset match
+    assert bracket.match(bracket.reset_match).player_b == 3
+    assert bracket.champion == 4
+    assert sorted(losses.values()) == [1, 2, 2, 2]
+
+
+def test_double_elimination_skips_the_reset_when_the_unbeaten_player_wins():
+    bracket = DoubleElimination([1, 2, 3, 4])
+    play_out(bracket, pick=min)
+
+    assert bracket.champion == 1
+    assert bracket.winner[bracket.reset_match] == BYE
+
+
+@pytest.mark.parametrize('size', [4, 6, 8])
+def test_swiss_never_pairs_a_rematch(size):
+    for outcome in itertools.islice(itertools.product((min, max), repeat=12), 64):
+        bracket = Swiss(range(1, size + 1))
+        picks = iter(outcome)
+        while bracket.ready_matches():
+            match = bracket.ready_matches()[0]
+            bracket.report(match.match_id, next(picks)(match.player_a, match.player_b))
+
+        pairs = [frozenset((m.player_a, m.player_b)) for m in bracket.matches()]
+        assert len(pairs) == len(set(pairs))
+        assert bracket.current_round == bracket.rounds
+        assert bracket.champion == bracket.standings()[0][0]
+
+
+def test_swiss_gives_each_bye_to_a_different_player():
+    bracket = Swiss([1, 2, 3, 4, 5])
+    play_out(bracket)
+
+    byes = [m.player_a for m in bracket.matches() if m.player_b == BYE]
+    assert len(byes) == bracket.rounds == len(set(byes))
+
+
+@pytest.mark.parametrize('format', ['single_elimination', 'double_elimination', 'swiss'])
+def test_invalid_and_repeated_reports_are_rejected(format):
+    bracket = create_bracket(format, [1, 2, 3, 4])
+    match = bracket.ready_matches()[0]
+
+    with pytest.raises(ValueError):
+        bracket.report(match.match_id, 99)
+    bracket.report(match.match_id, match.player_a)
+    with pytest.raises(ValueError):
+        bracket.report(match.match_id, match.player_a)
+    with pytest.raises(ValueError):
+        bracket.report(len(bracket) + 10, 1)
+
+
+def test_a_bracket_needs_two_players():
+    with pytest.raises(ValueError):
+        create_bracket('single_elimination', [1])
+    with pytest.raises(ValueError):
+        create_bracket('knockout', [1, 2])
@@ -0,0 +1,83 @@
+"""Running brackets come back after a restart from their snapshot and journal"""
+import pytest
+
+from bracket_journal import BracketJournal
+from store import SlotStore
+
+PLAYERS = [11, 12, 13, 14]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    store.ensure_tournaments({15: {'prize': 25, 'entry_fee': 15, 'capacity': 4}})
+    for user_id in PLAYERS:
+        store.assign_slot(15, user_id, f"pay_{user_id}")
+    return store
+
+
+@pytest.fixture
+def bracket_id(store):
+    return store.filled_brackets(15)[0]['id']
+
+
+def play_first_round(journal: BracketJournal, bracket_id: int) -> None:
+    for match in journal.get(bracket_id).ready_matches():
+        journal.report(bracket_id, match.match_id, match.player_a)
+
+
+def restart(store: SlotStore, bracket_id: int, format: str = 'single_elimination'):
+    journal = BracketJournal(store)
+    journal.restore([(bracket_id, format, PLAYERS)])
+    return journal.get(bracket_id)
+
+
+def test_results_are_replayed_from_the_journal(store, bracket_id):
+    journal = BracketJournal(store)
+    journal.start(bracket_id, 'single_elimination', PLAYERS)
+    play_first_round(journal, bracket_id)
+
+    restored = restart(store, bracket_id)
+
+    assert restored.matches() == journal.get(bracket_id).matches()
+    assert [(m.player_a, m.player_b) for m in restored.ready_matches()] == [(11, 12)]
+
+
+def test_snapshot_is_loaded_and_only_later_results_replayed(store, bracket_id, monkeypatch):
+    journal = BracketJournal(store)
+    bracket = journal.start(bracket_id, 'single_elimination', PLAYERS)
+    first = bracket.ready_matches()[0]
+    journal.report(bracket_id, first.match_id, first.player_a)
+    assert journal.snapshot() == 1
+    assert journal.snapshot() == 0  # nothing changed since
+    second = bracket.ready_matches()[0]
+    journal.report(bracket_id, second.match_id, second.player_b)
+
+    replayed = []
+    results = store.bracket_results
+
+    def recording_results(bracket_id: int, after_id: int = 0) -> list:
+        rows = results(bracket_id, after_id)
+        replayed.extend(rows)
+        return rows
+    monkeypatch.setattr(store, 'bracket_results', recording_results)
+    restored = restart(store, bracket_id)
+
+    assert [match_id for _, match_id, _ in replayed] == [second.match_id]
+    assert restored.matches() == bracket.matches()
+
+
+def test_unreadable_snapshot_falls_back_to_the_whole_journal(store, bracket_id):
+    journal = BracketJournal(store)
+    journal.start(bracket_id, 'single_elimination', PLAYERS)
+    play_first_round(journal, bracket_id)
+    journal.snapshot()
+    store.conn.execute('UPDATE bracket_snapshots SET state = ? WHERE bracket_id = ?', (b'not a pickle', bracket_id))
+
+    assert restart(store, bracket_id).matches() == journal.get(bracket_id).matches()
+
+
+def test_bracket_keeps_the_format_it_was_drawn_in(store, bracket_id):
+    BracketJournal(store).start(bracket_id, 'double_elimination', PLAYERS)
+
+    assert restart(store, bracket_id, format='swiss').format == 'double_elimination'
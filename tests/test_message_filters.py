@@ -0,0 +1,57 @@
+"""Only group messages that mention or reply to the bot get past the filter"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from telegram import Chat, Message, MessageEntity, User
+
+from message_filters import AddressedToBot
+
+BOT = SimpleNamespace(id=999)
+GROUP = Chat(-100, Chat.SUPERGROUP)
+PLAYER = User(1, 'Player', False)
+
+
+def message(text, chat=GROUP, reply_from=None, entities=()):
+    reply = None
+    if reply_from is not None:
+        reply = Message(1, datetime.now(), chat, from_user=reply_from, text='earlier')
+    message = Message(2, datetime.now(), chat, from_user=PLAYER, text=text, entities=entities,
+                      reply_to_message=reply)
+    message.set_bot(BOT)
+    return message
+
+
+def mention(text: str, offset: int, length: int):
+    return message(text, entities=[MessageEntity(MessageEntity.MENTION, offset, length)])
+
+
+@pytest.fixture
+def addressed():
+    return AddressedToBot('@Tournament_Bot')
+
+
+def test_mentions_of_the_bot_pass_whatever_the_case(addressed):
+    assert addressed.filter(mention('hey @tournament_bot slots?', 4, 15))
+
+
+def test_replies_to_the_bot_pass(addressed):
+    assert addressed.filter(message('me too', reply_from=User(BOT.id, 'Bot', True)))
+
+
+@pytest.mark.parametrize('sent', [
+    lambda: message('gg everyone'),
+    lambda: mention('hey @someone_else', 4, 13),
+    lambda: message('me too', reply_from=User(2, 'Other', False)),
+    lambda: message(None),
+    lambda: message('@tournament_bot hi', chat=Chat(1, Chat.PRIVATE)),
+])
+def test_other_messages_are_rejected(addressed, sent):
+    assert not addressed.filter(sent())
+
+
+def test_counts_checked_and_rejected_messages(addressed):
+    addressed.filter(message('gg'))
+    addressed.filter(mention('@tournament_bot', 0, 15))
+
+    assert addressed.stats() == {'checked': 2, 'rejected': 1, 'rejection_rate': 0.5}
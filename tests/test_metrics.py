@@ -0,0 +1,20 @@
+"""Every series names the process it came from, so gunicorn workers never mix"""
+import os
+
+from metrics import CallbackMetric, Counter, Histogram, Registry
+
+
+def test_every_sample_is_labelled_with_the_process_id():
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests', ['route']))
+    requests.labels('/health').inc()
+    registry.register(Counter('errors_total', 'Errors')).inc()
+    registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1,))).observe(0.05)
+    registry.register(CallbackMetric('queue_depth', 'Queued', lambda: 3))
+
+    samples = [line for line in registry.render().splitlines() if not line.startswith('#')]
+    pid = f'pid="{os.getpid()}"'
+    assert samples and all(pid in line for line in samples)
+    assert f'requests_total{{route="/health",{pid}}} 1.0' in samples
+    assert f'latency_seconds_bucket{{le="0.1",{pid}}} 1' in samples
+    assert f'queue_depth{{{pid}}} 3' in samples
@@ -0,0 +1,55 @@
+"""Players on a tier's waiting list fill the next bracket before later payers"""
+import pytest
+
+from store import SlotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    store.ensure_tournaments({15: {'prize': 25, 'entry_fee': 15, 'capacity': 2, 'overflow': 'queue'}})
+    return store
+
+
+def waiting(store) -> list:
+    return [row[0] for row in store.conn.execute('SELECT user_id FROM overflow_queue ORDER BY id')]
+
+
+def test_waiting_players_take_the_next_bracket_first(store):
+    for user_id in (1, 2, 3):
+        store.assign_slot(15, user_id, f"pay_{user_id}")
+    assert waiting(store) == [3]
+
+    seated = store.finish_bracket(15, store.current_bracket(15)['id'], champion=1)
+    fourth = store.assign_slot(15, 4, 'pay_4')
+
+    assert [(user_id, assignment.bracket, assignment.slot) for user_id, assignment in seated] == [(3, 2, 1)]
+    assert (fourth.bracket, fourth.slot) == (2, 2)
+    assert store.get_slots(15) == {1: 3, 2: 4}
+    assert waiting(store) == []
+
+
+def test_a_new_bracket_takes_only_as_many_as_it_holds(store):
+    for user_id in range(1, 6):
+        store.assign_slot(15, user_id, f"pay_{user_id}")
+
+    seated = store.finish_bracket(15, store.current_bracket(15)['id'], champion=1)
+
+    assert [user_id for user_id, _ in seated] == [3, 4]
+    assert waiting(store) == [5]
+    assert store.assign_slot(15, 6, 'pay_6').queued
+    # A retried delivery of a seated waiting player gets their new seat back
+    assert store.assign_slot(15, 3, 'pay_3')[:3] == seated[0][1][:3]
+
+
+def test_replayed_waiting_payment_survives_its_bracket_closing(store):
+    for user_id in (1, 2, 3):
+        store.assign_slot(15, user_id, f"pay_{user_id}")
+    bracket = store.current_bracket(15)
+    store.conn.execute("UPDATE brackets SET status = 'finished' WHERE id = ?", (bracket['id'],))
+
+    again = store.assign_slot(15, 3, 'pay_3')
+
+    assert again.duplicate and again.queued
+    assert (again.bracket_id, again.bracket) == (bracket['id'], bracket['number'])
+    assert waiting(store) == [3]
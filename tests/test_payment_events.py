@@ -0,0 +1,54 @@
+"""The payment event stream drops old events once no active consumer still needs them"""
+import time
+
+import pytest
+
+from events import PaymentChannel
+from store import SlotStore
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SlotStore(str(tmp_path / 'store.db'))
+
+
+def append(store: SlotStore, payment_id: str, age: int) -> int:
+    event_id = store.append_payment_event(payment_id, '{}')
+    store.conn.execute('UPDATE payment_events SET created_at = ? WHERE id = ?', (int(time.time()) - age, event_id))
+    return event_id
+
+
+def remaining(store: SlotStore) -> list:
+    return [row[0] for row in store.conn.execute('SELECT payment_id FROM payment_events ORDER BY id')]
+
+
+def test_without_consumers_events_expire_by_age(store):
+    append(store, 'pay_old', 8 * DAY)
+    append(store, 'pay_new', 0)
+
+    assert PaymentChannel(store).purge() == 1
+    assert remaining(store) == ['pay_new']
+
+
+def test_events_a_consumer_has_not_acked_are_kept(store):
+    first = append(store, 'pay_1', 8 * DAY)
+    append(store, 'pay_2', 8 * DAY)
+    append(store, 'pay_3', 0)
+    store.ack_payment_events('bot', first)
+
+    PaymentChannel(store).purge()
+
+    assert remaining(store) == ['pay_2', 'pay_3']
+    assert [event_id for event_id, _ in store.read_payment_events('bot')] == [first + 1, first + 2]
+
+
+def test_a_consumer_gone_past_the_retention_no_longer_holds_events(store):
+    append(store, 'pay_1', 8 * DAY)
+    store.conn.execute("INSERT INTO consumer_offsets (consumer, acked_id, updated_at) VALUES ('old-bot', 0, ?)",
+                       (int(time.time()) - 30 * DAY,))
+
+    PaymentChannel(store).purge()
+
+    assert remaining(store) == []
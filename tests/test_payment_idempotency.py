@@ -0,0 +1,82 @@
+"""A payment seats its player exactly once, however its processing fails and is retried"""
+import sqlite3
+
+import pytest
+
+from conftest import payment_webhook
+
+
+class Crash(BaseException):
+    """The process dying mid-event: nothing on the way out gets to run"""
+
+
+def fail_once(error: BaseException, call):
+    calls = []
+
+    def failing(*args, **kwargs):
+        if not calls:
+            calls.append(True)
+            raise error
+        return call(*args, **kwargs)
+    return failing
+
+
+def test_crash_before_seat_is_retried_after_restart(gateway, tier, monkeypatch):
+    body = payment_webhook(42, tier)
+    monkeypatch.setattr(gateway.store, 'assign_slot', fail_once(Crash(), gateway.store.assign_slot))
+    with pytest.raises(Crash):
+        gateway.module.process_webhook_payload(body)
+
+    # The requeued event reaches a new process
+    gateway.restart()
+    gateway.module.process_webhook_payload(body)
+
+    assert len(gateway.seats(42)) == 1
+    assert gateway.notified(42) == 1
+
+
+def test_failure_after_seat_does_not_seat_again(gateway, tier, monkeypatch):
+    body = payment_webhook(43, tier)
+    channel = gateway.module.payment_channel
+    monkeypatch.setattr(channel, 'publish',
+                        fail_once(sqlite3.OperationalError('database is locked'), channel.publish))
+    with pytest.raises(sqlite3.OperationalError):
+        gateway.module.process_webhook_payload(body)
+    assert gateway.module.idempotency.seen('pay_00000000000043')
+
+    gateway.module.process_webhook_payload(body)
+
+    assert len(gateway.seats(43)) == 1
+    assert gateway.notified(43) == 1
+    assert gateway.store.conn.execute("SELECT COUNT(*) FROM payment_events").fetchone()[0] == 1
+    assert gateway.store.conn.execute("SELECT COUNT(*) FROM registrations WHERE user_id = 43").fetchone()[0] == 1
+
+
+def test_seat_failure_goes_back_to_the_work_queue(gateway, tier, monkeypatch):
+    body = payment_webhook(46, tier)
+    monkeypatch.setattr(gateway.store, 'assign_slot',
+                        fail_once(sqlite3.OperationalError('database is locked'), gateway.store.assign_slot))
+    with pytest.raises(sqlite3.OperationalError):
+        gateway.module.process_webhook_payload(body)
+    assert gateway.module.matchmaker.depth(tier) == 0
+
+    gateway.module.process_webhook_payload(body)
+
+    assert len(gateway.seats(46)) == 1
+
+
+def test_paid_and_captured_events_share_one_seat(gateway, tier):
+    gateway.module.process_webhook_payload(payment_webhook(44, tier, 'payment_link.paid'))
+    gateway.module.process_webhook_payload(payment_webhook(44, tier, 'payment.captured'))
+
+    assert len(gateway.seats(44)) == 1
+    assert gateway.notified(44) == 1
+
+
+def test_assign_slot_returns_the_payments_seat(gateway, tier):
+    first = gateway.store.assign_slot(tier, 45, 'pay_45')
+    again = gateway.store.assign_slot(tier, 45, 'pay_45')
+
+    assert not first.duplicate and again.duplicate
+    assert again[:3] == first[:3]
+    assert gateway.store.get_slots(tier) == {1: 45, 2: None}
@@ -0,0 +1,48 @@
+"""Retrying a failed payment link request never leaves the user with two links"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+
+class FakeRazorpay:
+    """Creates links like Razorpay, but answers the first request with a 503"""
+
+    def __init__(self):
+        self.links = []
+        self.posts = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.method == 'GET':
+            reference_id = request.url.params['reference_id']
+            return httpx.Response(200, json={
+                'payment_links': [link for link in self.links if link['reference_id'] == reference_id]
+            })
+        self.posts += 1
+        data = json.loads(request.content)
+        if any(link['reference_id'] == data['reference_id'] for link in self.links):
+            return httpx.Response(400, json={'error': {'description': 'reference_id already exists'}})
+        link = dict(data, id=f"plink_{len(self.links) + 1}", short_url='https://rzp.io/l/test')
+        self.links.append(link)
+        # The link exists, but the response is lost on the way back
+        return httpx.Response(503 if self.posts == 1 else 200, json=link)
+
+
+@pytest.fixture
+def razorpay(monkeypatch):
+    import bot
+    fake = FakeRazorpay()
+    monkeypatch.setattr(bot.PaymentGateway, '_client',
+                        httpx.AsyncClient(base_url='https://razorpay.test', transport=httpx.MockTransport(fake)))
+    monkeypatch.setattr(bot.PaymentGateway, 'BACKOFF_BASE', 0)
+    return fake
+
+
+def test_server_error_after_creation_reuses_the_link(razorpay):
+    import bot
+    link = asyncio.run(bot.PaymentGateway.create_payment_link(15, 501, 15))
+
+    assert link['id'] == 'plink_1'
+    assert len(razorpay.links) == 1
+    assert razorpay.posts == 1
@@ -0,0 +1,86 @@
+"""Per-user token buckets refill over time and stop updates once spent"""
+import asyncio
+import threading
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from telegram import Chat, Message, Update, User
+from telegram.ext import ApplicationHandlerStop
+
+import rate_limit
+from rate_limit import RateLimit, RateLimiter, RateLimitHandler
+from store import SlotStore
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, 'time', clock.time)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    # Three in a burst, then one every 10 seconds
+    return RateLimiter(store, [RateLimit('updates', 3, 6, lambda update: True)])
+
+
+def from_user(user_id: int, callback: bool = False):
+    query = SimpleNamespace(answer=AsyncMock()) if callback else None
+    return SimpleNamespace(effective_user=SimpleNamespace(id=user_id), callback_query=query)
+
+
+def test_burst_is_allowed_then_denied(limiter, clock):
+    assert [limiter.exceeded(from_user(1)) for _ in range(3)] == [None] * 3
+    assert limiter.exceeded(from_user(1)).name == 'updates'
+    # Each user has their own bucket
+    assert limiter.exceeded(from_user(2)) is None
+
+
+def test_tokens_refill_at_the_configured_rate(limiter, clock):
+    for _ in range(3):
+        limiter.exceeded(from_user(1))
+
+    clock.now += 9
+    assert limiter.exceeded(from_user(1)) is not None
+    clock.now += 1
+    assert limiter.exceeded(from_user(1)) is None
+    assert limiter.exceeded(from_user(1)) is not None
+
+
+def test_handler_takes_tokens_off_the_event_loop(limiter, clock):
+    handler = RateLimitHandler(limiter)
+    threads = []
+    take = limiter.store.take_rate_token
+    limiter.store.take_rate_token = lambda *args: threads.append(threading.current_thread()) or take(*args)
+    update = from_user(1, callback=True)
+
+    async def tap() -> None:
+        await handler.callback(update, None)
+
+    for _ in range(3):
+        asyncio.run(tap())
+    with pytest.raises(ApplicationHandlerStop):
+        asyncio.run(tap())
+
+    assert threading.main_thread() not in threads
+    update.callback_query.answer.assert_awaited_once()
+
+
+def test_matching_an_update_does_not_touch_the_store(limiter, monkeypatch):
+    monkeypatch.setattr(limiter.store, 'take_rate_token', None)
+    user = User(1, 'Player', False)
+    message = Message(1, datetime.now(), Chat(1, Chat.PRIVATE), from_user=user, text='/register')
+
+    assert RateLimitHandler(limiter).check_update(Update(1, message=message)) is True
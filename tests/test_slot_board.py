@@ -0,0 +1,65 @@
+"""A failed board edit only posts a new pinned board when the old one is gone"""
+from concurrent.futures import Future
+
+import pytest
+
+from slot_board import SlotBoard, ThreadedBoardUpdater
+from store import SlotStore
+from telegram_dispatcher import TelegramAPIError
+
+TIERS = {15: {'prize': 25, 'entry_fee': 15, 'capacity': 2}}
+
+
+class FakeDispatcher:
+    """Answers every edit with one canned error and records what was sent"""
+
+    def __init__(self, edit_error: TelegramAPIError):
+        self.edit_error = edit_error
+        self.sent = []
+
+    def request(self, method: str, chat_id, payload: dict, raise_errors: bool = False) -> Future:
+        future = Future()
+        if method == 'editMessageText':
+            future.set_exception(self.edit_error)
+        elif method == 'sendMessage':
+            self.sent.append(payload['text'])
+            future.set_result({'message_id': 100 + len(self.sent)})
+        else:
+            future.set_result(True)
+        return future
+
+
+@pytest.fixture
+def board(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    store.ensure_tournaments(TIERS)
+    store.save_board(15, '-100', 7, 'stale')
+    return SlotBoard(store, TIERS, '-100')
+
+
+def flush(board, description: str) -> FakeDispatcher:
+    dispatcher = FakeDispatcher(TelegramAPIError('editMessageText', 400, description))
+    ThreadedBoardUpdater(board, dispatcher, delay=0).flush(15)
+    return dispatcher
+
+
+def test_not_modified_counts_as_edited(board):
+    dispatcher = flush(board, 'Bad Request: message is not modified: specified new message content '
+                              'and reply markup are exactly the same as a current content')
+
+    assert dispatcher.sent == []
+    assert board.pending_update(15) is None
+
+
+def test_other_failures_leave_the_board_alone(board):
+    dispatcher = flush(board, 'Bad Request: chat not found')
+
+    assert dispatcher.sent == []
+    assert board.store.get_board(15)['message_id'] == 7
+
+
+def test_deleted_board_is_posted_again(board):
+    dispatcher = flush(board, 'Bad Request: message to edit not found')
+
+    assert len(dispatcher.sent) == 1
+    assert board.store.get_board(15)['message_id'] == 101
@@ -0,0 +1,66 @@
+"""Telegram rate limits hold across gateway worker processes sharing one store"""
+import time
+
+from store import SlotStore
+from telegram_dispatcher import TelegramDispatcher
+
+
+def ready_batches(dispatcher: TelegramDispatcher) -> int:
+    """How many sends the dispatcher would start right now"""
+    started = 0
+    while True:
+        with dispatcher._cond:
+            batch, _ = dispatcher._next_batch(time.monotonic())
+        if batch is None:
+            return started
+        started += 1
+        with dispatcher._cond:
+            dispatcher._finish(batch[0].chat_id, batch, False, time.monotonic())
+
+
+def test_workers_share_a_chats_bucket(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    workers = [TelegramDispatcher(None, store=store) for _ in range(2)]
+    for dispatcher in workers:
+        for n in range(5):
+            # Keyboards are never coalesced, so each message is its own send
+            dispatcher.send(1001, f"message {n}", reply_markup={'inline_keyboard': []})
+
+    # A private chat's bucket holds 3 sends, for both workers together
+    assert sum(ready_batches(dispatcher) for dispatcher in workers) == 3
+
+
+def test_without_a_store_each_dispatcher_has_its_own_buckets():
+    workers = [TelegramDispatcher(None) for _ in range(2)]
+    for dispatcher in workers:
+        for n in range(5):
+            dispatcher.send(1001, f"message {n}", reply_markup={'inline_keyboard': []})
+
+    assert [ready_batches(dispatcher) for dispatcher in workers] == [3, 3]
+
+
+def first_batch(dispatcher: TelegramDispatcher) -> list:
+    with dispatcher._cond:
+        batch, _ = dispatcher._next_batch(time.monotonic())
+    return [message.payload['text'] for message in batch]
+
+
+def queue_board(dispatcher: TelegramDispatcher) -> None:
+    dispatcher.request('sendMessage', -100, {'chat_id': -100, 'text': 'board', 'parse_mode': 'HTML'},
+                       raise_errors=True)
+
+
+def test_board_post_is_not_merged_with_queued_group_messages():
+    dispatcher = TelegramDispatcher(None)
+    dispatcher.send(-100, 'fixtures')
+    queue_board(dispatcher)
+
+    assert first_batch(dispatcher) == ['fixtures']
+
+
+def test_group_messages_are_not_merged_into_a_board_post():
+    dispatcher = TelegramDispatcher(None)
+    queue_board(dispatcher)
+    dispatcher.send(-100, 'fixtures')
+
+    assert first_batch(dispatcher) == ['board']
@@ -0,0 +1,84 @@
+"""The tier catalog reloads from its file, retires dropped tiers and rejects bad configs"""
+import json
+
+import pytest
+
+from tournament_config import TournamentCatalog, load_tournaments
+
+
+def write(path, *tiers, **defaults) -> None:
+    path.write_text(json.dumps(dict(defaults, tiers=list(tiers))))
+
+
+def tier(entry_fee: int, prize: int, **settings) -> dict:
+    return dict(settings, entry_fee=entry_fee, prize=prize)
+
+
+@pytest.fixture
+def config(tmp_path):
+    path = tmp_path / 'tournaments.json'
+    write(path, tier(15, 25), tier(30, 55, capacity=4))
+    return path
+
+
+def test_tiers_and_indexes_are_loaded(config):
+    catalog = TournamentCatalog(str(config))
+
+    assert catalog.offered == (15, 30)
+    assert catalog[30] == {'prize': 55, 'entry_fee': 30, 'capacity': 4, 'overflow': 'spill',
+                           'format': 'single_elimination'}
+    assert catalog.by_amount == {15: 15, 30: 30}
+    assert catalog.prizes == {15: 25, 30: 55}
+
+
+def test_reload_swaps_in_new_tiers_and_notifies_listeners(config):
+    catalog = TournamentCatalog(str(config))
+    seen = []
+    catalog.on_reload(lambda reloaded: seen.append(reloaded.offered))
+
+    assert not catalog.reload()
+    write(config, tier(15, 25), tier(30, 60, capacity=4), tier(50, 90))
+    assert catalog.reload()
+
+    assert seen == [(15, 30, 50)]
+    assert catalog.prizes[30] == 60
+    assert catalog.by_amount[50] == 50
+
+
+def test_dropped_tier_is_retired_but_still_resolves(config):
+    catalog = TournamentCatalog(str(config))
+    write(config, tier(15, 25))
+    catalog.reload()
+
+    assert catalog.offered == (15,)
+    assert 30 in catalog
+    assert catalog.by_amount[30] == 30
+    assert catalog.prizes[30] == 55
+
+
+def test_a_broken_file_keeps_the_current_tiers(config):
+    catalog = TournamentCatalog(str(config))
+    config.write_text('{"tiers": [')
+
+    assert not catalog.reload()
+    assert catalog.offered == (15, 30)
+
+
+def test_unchanged_file_is_not_reloaded(config):
+    catalog = TournamentCatalog(str(config))
+
+    assert not catalog.reload_if_changed()
+
+
+@pytest.mark.parametrize('tiers', [
+    [tier(15, 25), tier(15, 30)],
+    [tier(15, 25, capacity=1)],
+    [tier(15, 25, overflow='drop')],
+    [tier(15, 25, format='round_robin')],
+])
+def test_invalid_configs_are_rejected(tmp_path, tiers):
+    path = tmp_path / 'tournaments.json'
+    write(path, *tiers)
+
+    with pytest.raises(ValueError):
+        load_tournaments(str(path))
@@ -0,0 +1,22 @@
+"""The trace file is rotated so it never grows past its size limit"""
+import json
+
+import tracing
+from tracing import Tracer
+
+
+def test_trace_file_rotates_at_its_size_limit(tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    tracer = Tracer(path, 1.0, service='bot', max_bytes=1000)
+    for batch in range(10):
+        for n in range(batch * 10, batch * 10 + 10):
+            tracer.record('t' * 16, 'span', 0.0, 0.001, n=n)
+        # Each close flushes one batch, as a pause between registrations would
+        tracing.close()
+
+    current = (tmp_path / 'traces.jsonl').read_text().splitlines()
+    previous = (tmp_path / 'traces.jsonl.1').read_text().splitlines()
+    assert (tmp_path / 'traces.jsonl').stat().st_size < 2000
+    assert (tmp_path / 'traces.jsonl.1').stat().st_size < 2000
+    # Nothing is lost from the newest spans
+    assert [json.loads(line)['n'] for line in previous + current][-1] == 99
@@ -0,0 +1,78 @@
+"""Updates run concurrently across users, in arrival order for each user"""
+import asyncio
+from types import SimpleNamespace
+
+from update_processing import PerUserUpdateProcessor, UpdateQueue
+
+
+def from_user(user_id: int):
+    # Custom updates (e.g. PaymentEvent) are ordered by their user_id
+    return SimpleNamespace(user_id=user_id)
+
+
+async def submit(processor: PerUserUpdateProcessor, update, coroutine) -> asyncio.Task:
+    await processor.admit()
+    task = asyncio.create_task(processor.do_process_update(update, coroutine))
+    await asyncio.sleep(0)
+    return task
+
+
+def test_each_users_updates_run_in_order_while_users_overlap():
+    log = []
+
+    async def handle(name: str, delay: float) -> None:
+        log.append(f"start {name}")
+        await asyncio.sleep(delay)
+        log.append(f"end {name}")
+
+    async def main() -> None:
+        processor = PerUserUpdateProcessor(concurrency=4, max_in_flight=8)
+        tasks = [
+            await submit(processor, from_user(1), handle('1a', 0.05)),
+            await submit(processor, from_user(1), handle('1b', 0)),
+            await submit(processor, from_user(2), handle('2a', 0)),
+        ]
+        await asyncio.gather(*tasks)
+        assert processor.in_flight == 0 and processor.stats()['serialized_keys'] == 0
+
+    asyncio.run(main())
+
+    # 2a neither waits for user 1 nor lets 1b jump ahead of 1a
+    assert log.index('end 2a') < log.index('end 1a') < log.index('start 1b')
+
+
+def test_no_more_than_concurrency_handlers_run_at_once():
+    running = []
+    peak = []
+
+    async def handle() -> None:
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def main() -> None:
+        processor = PerUserUpdateProcessor(concurrency=2, max_in_flight=8)
+        await asyncio.gather(*[await submit(processor, from_user(user_id), handle()) for user_id in range(6)])
+
+    asyncio.run(main())
+    assert max(peak) == 2
+
+
+def test_queue_holds_updates_back_once_max_in_flight_is_reached():
+    async def main() -> None:
+        processor = PerUserUpdateProcessor(concurrency=1, max_in_flight=1)
+        queue = UpdateQueue(processor, maxsize=2)
+        await queue.put(from_user(1))
+        await queue.put(from_user(2))
+
+        first = await queue.get()
+        second = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not second.done()
+        assert queue.qsize() == 1
+
+        processor.release()  # the first update finished
+        assert await asyncio.wait_for(second, 1) is not first
+
+    asyncio.run(main())
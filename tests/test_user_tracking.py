@@ -0,0 +1,60 @@
+"""User flags are an LRU cache over the store, and cooldowns expire oldest first"""
+import pytest
+
+import user_tracking
+from store import SlotStore
+from user_tracking import UserTracker
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(user_tracking.time, 'time', clock.time)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SlotStore(str(tmp_path / 'store.db'))
+
+
+def test_flag_cache_evicts_the_least_recently_used_user(store):
+    users = UserTracker(store, max_cached=2)
+    users.mark_interacted(1)
+    users.mark_interacted(2)
+    users.first_visit(1)  # touches 1, so 2 is now the oldest
+    users.mark_interacted(3)
+
+    assert list(users._flags) == [1, 3]
+    # An evicted user's flags come back from the store
+    assert not users.first_visit(1)
+    assert users.first_visit(2)
+    assert users.stats()['known_users'] == 3
+
+
+def test_cooldowns_expire_and_are_dropped(store, clock):
+    users = UserTracker(store, cooldown=600)
+    users.start_cooldown(1)
+    clock.now += 300
+    users.start_cooldown(2)
+
+    assert users.cooldown_remaining(1) == 300
+    clock.now += 300
+    assert users.cooldown_remaining(1) == 0
+    assert users.cooldown_remaining(2) == 300
+    assert users.stats()['cooldowns'] == 1
+
+
+def test_running_cooldowns_survive_a_restart(store, clock):
+    UserTracker(store, cooldown=600).start_cooldown(1)
+    clock.now += 100
+
+    assert UserTracker(store, cooldown=600).cooldown_remaining(1) == 500
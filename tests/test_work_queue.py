@@ -0,0 +1,66 @@
+"""Webhook events abandoned by a dead worker are retried while the pool keeps running"""
+import time
+import threading
+
+from store import SlotStore
+from work_queue import WorkerPool
+
+
+def test_stale_processing_events_are_swept_back_into_the_queue(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    handled = threading.Event()
+    pool = WorkerPool(store, lambda payload: handled.set(), workers=1, poll_interval=0.05, stale_after=1)
+    pool.start()
+    try:
+        # Another worker process claims the event and is killed before finishing it
+        claimed_at = int(time.time()) - 120
+        event_id = store.conn.execute(
+            "INSERT INTO webhook_events (event, payload, status, attempts, created_at, updated_at) "
+            "VALUES ('payment_link.paid', x'7b7d', 'processing', 1, ?, ?)",
+            (claimed_at, claimed_at)
+        ).lastrowid
+
+        assert handled.wait(timeout=5)
+    finally:
+        pool.drain(timeout=5)
+    assert store.conn.execute('SELECT status FROM webhook_events WHERE id = ?', (event_id,)).fetchone()[0] == 'done'
+
+
+def insert_event(store: SlotStore, status: str, attempts: int, updated_at: int) -> int:
+    return store.conn.execute(
+        "INSERT INTO webhook_events (event, payload, status, attempts, created_at, updated_at) "
+        "VALUES ('payment_link.paid', x'7b7d', ?, ?, ?, ?)",
+        (status, attempts, updated_at, updated_at)
+    ).lastrowid
+
+
+def status(store: SlotStore, event_id: int):
+    row = store.conn.execute('SELECT status FROM webhook_events WHERE id = ?', (event_id,)).fetchone()
+    return row[0] if row else None
+
+
+def test_event_that_keeps_killing_its_worker_is_parked(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    long_ago = int(time.time()) - 120
+    retried = insert_event(store, 'processing', 2, long_ago)
+    exhausted = insert_event(store, 'processing', 5, long_ago)
+
+    assert store.requeue_stale_webhooks(older_than=60, max_attempts=5) == 2
+    assert status(store, retried) == 'pending'
+    assert status(store, exhausted) == 'failed'
+
+
+def test_old_finished_events_are_purged(tmp_path):
+    store = SlotStore(str(tmp_path / 'store.db'))
+    now = int(time.time())
+    old_done = insert_event(store, 'done', 1, now - 8 * 86400)
+    old_failed = insert_event(store, 'failed', 5, now - 8 * 86400)
+    recent_done = insert_event(store, 'done', 1, now)
+    old_pending = insert_event(store, 'pending', 0, now - 8 * 86400)
+
+    pool = WorkerPool(store, lambda payload: None, workers=0, retention=7 * 86400)
+    pool._sweep()
+
+    assert status(store, old_done) is None and status(store, old_failed) is None
+    assert status(store, recent_done) == 'done'
+    assert status(store, old_pending) == 'pending'
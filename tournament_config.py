@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections.abc import Mapping
+from typing import Callable, Dict, Final, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOURNAMENTS_CONFIG: Final = os.getenv(
+    'TOURNAMENTS_CONFIG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tournaments.json')
+)
+# Seconds between checks of the config file for changes (0 = never reload)
+TOURNAMENTS_RELOAD_SECONDS: Final = float(os.getenv('TOURNAMENTS_RELOAD_SECONDS', '30'))
+
+# What happens to a paid player when every slot of the current bracket is taken:
+#   spill - open the next bracket instance of the same tier
+#   queue - wait in the overflow queue; waiting players fill the next bracket first
+OVERFLOW_POLICIES: Final = ('spill', 'queue')
+
+# Bracket formats understood by bracket.create_bracket
+BRACKET_FORMATS: Final = ('single_elimination', 'double_elimination', 'swiss')
+
+
+def load_tournaments(path: str = TOURNAMENTS_CONFIG) -> Dict[int, Dict]:
+    """Load the tournament tiers as ``{entry_fee: {prize, entry_fee, capacity, overflow, format}}``"""
+    with open(path, encoding='utf-8') as config_file:
+        config = json.load(config_file)
+
+    default_overflow = config.get('overflow', 'spill')
+    default_format = config.get('format', 'single_elimination')
+    tournaments: Dict[int, Dict] = {}
+
+    for tier in config['tiers']:
+        entry_fee = int(tier['entry_fee'])
+        capacity = int(tier.get('capacity', 2))
+        overflow = tier.get('overflow', default_overflow)
+        bracket_format = tier.get('format', default_format)
+
+        if entry_fee in tournaments:
+            raise ValueError(f"Duplicate tournament tier ₹{entry_fee} in {path}")
+        if capacity < 2:
+            raise ValueError(f"Tournament ₹{entry_fee} needs at least 2 slots, got {capacity}")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}' for tournament ₹{entry_fee}")
+        if bracket_format not in BRACKET_FORMATS:
+            raise ValueError(f"Unknown bracket format '{bracket_format}' for tournament ₹{entry_fee}")
+
+        tournaments[entry_fee] = {
+            "prize": int(tier['prize']),
+            "entry_fee": entry_fee,
+            "capacity": capacity,
+            "overflow": overflow,
+            "format": bracket_format
+        }
+
+    logger.info(f"Loaded {len(tournaments)} tournament tiers from {path}")
+    return tournaments
+
+
+class _Tiers(NamedTuple):
+    """One loaded version of the config and the indexes built from it"""
+    tiers: Dict[int, Dict]  # every tier known to this process, retired ones included
+    offered: Tuple[int, ...]  # tiers in the current config, in config order
+    by_amount: Dict[int, int]  # amount paid in rupees -> tier
+    prizes: Dict[int, int]  # tier -> prize
+
+
+def _index(tiers: Dict[int, Dict], offered: Tuple[int, ...]) -> _Tiers:
+    return _Tiers(
+        tiers,
+        offered,
+        {tier['entry_fee']: tournament_type for tournament_type, tier in tiers.items()},
+        {tournament_type: tier['prize'] for tournament_type, tier in tiers.items()}
+    )
+
+
+class TournamentCatalog(Mapping):
+    """The tournament tiers of the config file, with lookup indexes built once per load
+
+    Reads like the ``{entry_fee: tier}`` dict of ``load_tournaments``.
+    ``by_amount`` resolves a paid amount to its tier and ``prizes`` holds each
+    tier's prize, so hot paths do one dict lookup.
+
+    ``reload`` re-reads the file and swaps in the new tiers and indexes with
+    one assignment: a reader sees the old table or the new one, never a mix.
+    A tier dropped from the file is retired rather than forgotten: it is no
+    longer ``offered``, but taps on keyboards already sent and payments for
+    links already issued still resolve, so registrations under way complete.
+    Listeners added with ``on_reload`` rebuild what they derived from the
+    tiers; a file that fails to load keeps the current table.
+    """
+
+    def __init__(self, path: str = TOURNAMENTS_CONFIG):
+        self.path = path
+        self._mtime = os.stat(path).st_mtime
+        tiers = load_tournaments(path)
+        self._tiers = _index(tiers, tuple(tiers))
+        self._listeners: List[Callable[['TournamentCatalog'], None]] = []
+        self._lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+
+    def __getitem__(self, tournament_type: int) -> Dict:
+        return self._tiers.tiers[tournament_type]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._tiers.tiers)
+
+    def __len__(self) -> int:
+        return len(self._tiers.tiers)
+
+    @property
+    def offered(self) -> Tuple[int, ...]:
+        return self._tiers.offered
+
+    @property
+    def by_amount(self) -> Dict[int, int]:
+        return self._tiers.by_amount
+
+    @property
+    def prizes(self) -> Dict[int, int]:
+        return self._tiers.prizes
+
+    def on_reload(self, listener: Callable[['TournamentCatalog'], None]) -> None:
+        self._listeners.append(listener)
+
+    def reload(self) -> bool:
+        """Load the config file again; returns whether the tiers changed"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+                tiers = load_tournaments(self.path)
+            except Exception as e:
+                logger.error(f"Error reloading tournaments from {self.path}, keeping the current tiers: {e}")
+                return False
+            self._mtime = mtime
+
+            current = self._tiers
+            if tiers == {t: current.tiers[t] for t in current.offered}:
+                return False
+            retired = [t for t in current.tiers if t not in tiers]
+            # Retired tiers keep their last settings; config order first, then retired ones
+            merged = dict(tiers)
+            merged.update((t, current.tiers[t]) for t in retired)
+            self._tiers = _index(merged, tuple(tiers))
+
+        logger.info(f"Reloaded tournament tiers: offered {list(tiers)}"
+                    + (f", retired {retired}" if retired else ""))
+        for listener in self._listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                logger.error(f"Error applying reloaded tournament tiers: {e}")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        try:
+            if os.stat(self.path).st_mtime == self._mtime:
+                return False
+        except OSError as e:
+            logger.error(f"Error checking {self.path}: {e}")
+            return False
+        return self.reload()
+
+    def watch(self, interval: float = TOURNAMENTS_RELOAD_SECONDS) -> None:
+        """Reload whenever the file changes, checked every ``interval`` seconds in a daemon thread"""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=run, name='tournament-config', daemon=True)
+        self._watcher.start()
+
+
+_catalogs: Dict[str, TournamentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def tournament_catalog(path: str = TOURNAMENTS_CONFIG) -> TournamentCatalog:
+    """The process-wide catalog of a config file, loaded on first use
+
+    The unified runtime imports the bot and the gateway into one process;
+    both get the same catalog, loaded and watched once.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = _catalogs[path] = TournamentCatalog(path)
+        return catalog
@@ -0,0 +1,242 @@
+import os
+import sys
+import atexit
+import json
+import time
+import uuid
+import queue
+import random
+import threading
+import logging
+from collections import defaultdict
+from typing import Dict, Final, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACE_FILE: Final = 'traces.jsonl'
+# Size at which a trace file is moved to ``<file>.1`` and started afresh
+DEFAULT_TRACE_MAX_BYTES: Final = 50 * 1024 * 1024
+# Notes key that carries the trace ID through Razorpay and back in the webhook
+TRACE_NOTE: Final = 'trace_id'
+
+
+class _Writer:
+    """Appends span records to a JSONL file from one background thread per file
+
+    Once the file reaches ``max_bytes`` it is renamed to ``<path>.1``
+    (replacing the previous one) and a new file is started, so traces take
+    at most about twice ``max_bytes`` on disk. ``max_bytes`` of 0 never rotates.
+    """
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_TRACE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue: 'queue.SimpleQueue[Optional[str]]' = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self._thread.start()
+
+    def write(self, line: str) -> None:
+        self._queue.put(line)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _current(self, f):
+        """The file to append to, reopened after a rotation by this or another process"""
+        try:
+            rotated = not os.path.samestat(os.fstat(f.fileno()), os.stat(self.path))
+        except FileNotFoundError:
+            rotated = True
+        if not rotated and self.max_bytes and os.fstat(f.fileno()).st_size >= self.max_bytes:
+            os.replace(self.path, self.path + '.1')
+            rotated = True
+        if rotated:
+            f.close()
+            f = open(self.path, 'a', encoding='utf-8')
+        return f
+
+    def _run(self) -> None:
+        f = open(self.path, 'a', encoding='utf-8')
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    return
+                try:
+                    f = self._current(f)
+                    f.write(line)
+                    while not self._queue.empty():
+                        line = self._queue.get()
+                        if line is None:
+                            return
+                        f.write(line)
+                    f.flush()
+                except Exception as e:
+                    logger.error(f"Error writing trace spans: {e}")
+        finally:
+            f.close()
+
+
+_writers: Dict[str, _Writer] = {}
+_writers_lock = threading.Lock()
+
+
+def _writer(path: str, max_bytes: int) -> _Writer:
+    # The unified runtime traces the bot and the gateway into the same file
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = _Writer(path, max_bytes)
+        return writer
+
+
+class Span:
+    """Times a block of one trace; attributes can be added until it ends"""
+
+    __slots__ = ('tracer', 'trace_id', 'name', 'attrs', 'started_at', '_started')
+
+    def __init__(self, tracer: 'Tracer', trace_id: str, name: str, attrs: Dict):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> 'Span':
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.record(self.trace_id, self.name, self.started_at, time.perf_counter() - self._started, **self.attrs)
+
+
+class _NoSpan:
+    """Stand-in for spans of unsampled requests"""
+
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NO_SPAN: Final = _NoSpan()
+
+
+class Tracer:
+    """Sampled spans of the registration path, written as JSON lines
+
+    A trace starts where a user taps a tier (``new_trace``). Only a
+    ``sample_rate`` share of taps get a trace ID; the ID then rides in the
+    payment link's notes, so Razorpay returns it in the webhook and the
+    gateway joins the same trace. Calls with no trace ID record nothing, so
+    unsampled registrations pay only for a ``None`` check.
+
+    Each span is one line: ``trace_id``, ``span``, ``service``, ``start``
+    (epoch seconds), ``duration_ms`` and its attributes. Run
+    ``python tracing.py traces.jsonl`` for per-stage percentiles. The file
+    is rotated at ``max_bytes``, keeping one previous file.
+    """
+
+    def __init__(self, path: Optional[str], sample_rate: float = 0.0, service: str = '',
+                 max_bytes: int = DEFAULT_TRACE_MAX_BYTES):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.service = service
+        self.max_bytes = max_bytes
+
+    def new_trace(self) -> Optional[str]:
+        """Start a trace for a sampled share of requests; returns its ID or None"""
+        if not self.path or self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        return uuid.uuid4().hex[:16]
+
+    def span(self, trace_id: Optional[str], name: str, **attrs):
+        """Context manager timing ``name`` within a trace (no-op without a trace ID)"""
+        if trace_id is None or not self.path:
+            return NO_SPAN
+        return Span(self, trace_id, name, attrs)
+
+    def record(self, trace_id: Optional[str], name: str, started_at: float, duration: float, **attrs) -> None:
+        """Record a span timed elsewhere, e.g. by a future's completion callback"""
+        if trace_id is None or not self.path:
+            return
+        record = {
+            'trace_id': trace_id,
+            'span': name,
+            'service': self.service,
+            'start': round(started_at, 6),
+            'duration_ms': round(duration * 1000, 3),
+        }
+        record.update(attrs)
+        _writer(self.path, self.max_bytes).write(json.dumps(record, default=str) + '\n')
+
+
+def close() -> None:
+    """Flush and close every trace file of this process"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+atexit.register(close)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(path: str, slowest: int = 5) -> str:
+    """Per-stage latency percentiles and the slowest end-to-end traces in a trace file"""
+    stages: Dict[str, List[float]] = defaultdict(list)
+    traces: Dict[str, List[Dict]] = defaultdict(list)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            stages[record['span']].append(record['duration_ms'])
+            traces[record['trace_id']].append(record)
+
+    lines = [f"{'stage':<32}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, durations in sorted(stages.items()):
+        durations.sort()
+        lines.append(f"{name:<32}{len(durations):>7}{_percentile(durations, 0.5):>10.1f}"
+                     f"{_percentile(durations, 0.99):>10.1f}{durations[-1]:>10.1f}")
+
+    # Webhook to last notification; the time the user spends paying is not counted
+    totals = []
+    for trace_id, spans in traces.items():
+        spans = [span for span in spans if span['service'] == 'gateway']
+        if not any(span['span'] == 'webhook.process' for span in spans):
+            continue
+        start = min(span['start'] for span in spans)
+        end = max(span['start'] + span['duration_ms'] / 1000 for span in spans)
+        totals.append(((end - start) * 1000, trace_id, max(spans, key=lambda span: span['duration_ms'])))
+    if totals:
+        totals.sort()
+        durations = [total for total, _, _ in totals]
+        lines.append('')
+        lines.append(f"webhook to notification: {len(totals)} registrations, p50 {_percentile(durations, 0.5):.0f} ms, "
+                     f"p99 {_percentile(durations, 0.99):.0f} ms")
+        for total, trace_id, worst in reversed(totals[-slowest:]):
+            lines.append(f"  {trace_id}  {total:>9.0f} ms  slowest stage: {worst['span']} ({worst['duration_ms']:.0f} ms)")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(summarize(sys.argv[1] if len(sys.argv) > 1 else os.getenv('TRACE_FILE', DEFAULT_TRACE_FILE)))
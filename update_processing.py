@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+def ordering_key(update: object) -> Optional[Hashable]:
+    """The user (or chat) whose updates must be handled in arrival order"""
+    if isinstance(update, Update):
+        if update.effective_user:
+            return ('user', update.effective_user.id)
+        if update.effective_chat:
+            return ('chat', update.effective_chat.id)
+        return None
+    user_id = getattr(update, 'user_id', None)  # PaymentEvent and other custom updates
+    return ('user', user_id) if user_id is not None else None
+
+
+class _KeyLock:
+    __slots__ = ('lock', 'users')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Handles updates concurrently while keeping each user's updates in order
+
+    Up to ``concurrency`` handlers run at once. Updates from the same user
+    (or, without a user, the same chat) wait for each other, so one user's
+    taps are still handled in the order they arrived. They wait before they
+    take a handler slot, so a user hammering buttons cannot occupy slots
+    other users need.
+
+    ``max_in_flight`` bounds the updates taken off the update queue and not
+    yet finished. The application's queue must be an ``UpdateQueue`` bound
+    to this processor: once the bound is reached it stops handing out
+    updates, the queue fills up to its ``maxsize`` and producers (the
+    webhook handler, the poller) wait in ``put``.
+    """
+
+    __slots__ = ('concurrency', 'in_flight', '_running', '_keys', '_capacity')
+
+    def __init__(self, concurrency: int, max_in_flight: int):
+        if concurrency < 1 or max_in_flight < concurrency:
+            raise ValueError("concurrency must be positive and no larger than max_in_flight")
+        # The base semaphore never blocks: in-flight updates are already capped by UpdateQueue
+        super().__init__(max(max_in_flight, 2))
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self._running = asyncio.Semaphore(concurrency)
+        self._keys: Dict[Hashable, _KeyLock] = {}
+        self._capacity = asyncio.Semaphore(max_in_flight)
+
+    async def admit(self) -> None:
+        """Wait until another update may be taken off the queue, and count it in flight"""
+        await self._capacity.acquire()
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._capacity.release()
+
+    async def do_process_update(self, update: object, coroutine: 'Awaitable[Any]') -> None:
+        try:
+            key = ordering_key(update)
+            if key is None:
+                async with self._running:
+                    await coroutine
+                return
+
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = _KeyLock()
+            entry.users += 1
+            try:
+                async with entry.lock:
+                    async with self._running:
+                        await coroutine
+            finally:
+                entry.users -= 1
+                if not entry.users:
+                    del self._keys[key]
+        finally:
+            self.release()
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self.in_flight:
+            logger.warning(f"Update processor shut down with {self.in_flight} updates in flight")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_concurrent_updates,
+            'concurrency': self.concurrency,
+            'serialized_keys': len(self._keys)
+        }
+
+
+class UpdateQueue(asyncio.Queue):
+    """Bounded update queue that only releases updates the processor has room for"""
+
+    def __init__(self, processor: PerUserUpdateProcessor, maxsize: int = 0):
+        super().__init__(maxsize)
+        self.processor = processor
+
+    async def get(self) -> Any:
+        await self.processor.admit()
+        try:
+            item = await super().get()
+        except BaseException:
+            self.processor.release()
+            raise
+        # Application's stop signal is a bare object() and is never processed
+        if type(item) is object:
+            self.processor.release()
+        return item
@@ -0,0 +1,116 @@
+import sys
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Final
+
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+# User flags stored as a bit field
+INTERACTED: Final = 1  # has talked to the bot
+WELCOMED: Final = 2  # has been shown the first-tournament welcome
+
+DEFAULT_COOLDOWN: Final = 10 * 60
+DEFAULT_MAX_CACHED: Final = 50_000
+
+
+class UserTracker:
+    """Bounded view of who has used the bot and who is in a /register cooldown
+
+    Every user is one row in the store (flags bit field plus the cooldown's
+    epoch expiry), so tracking survives restarts and memory does not grow
+    with the number of users. In memory there are only two structures:
+
+    * an LRU cache of user flags, capped at ``max_cached`` entries
+    * running cooldowns as ``user_id -> expiry``; every cooldown has the same
+      length, so insertion order is expiry order and expired entries are
+      popped from the front
+    """
+
+    def __init__(self, store: SlotStore, cooldown: int = DEFAULT_COOLDOWN, max_cached: int = DEFAULT_MAX_CACHED):
+        self.store = store
+        self.cooldown = cooldown
+        self.max_cached = max_cached
+        self._flags: 'OrderedDict[int, int]' = OrderedDict()
+        self._cooldowns: 'OrderedDict[int, int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """Load the cooldowns still running from the store"""
+        now = int(time.time())
+        with self._lock:
+            self._cooldowns = OrderedDict(self.store.active_cooldowns(now))
+            self._flags.clear()
+
+    def _get_flags(self, user_id: int) -> int:
+        flags = self._flags.get(user_id)
+        if flags is None:
+            row = self.store.get_user(user_id)
+            flags = row[0] if row else 0
+        self._cache_flags(user_id, flags)
+        return flags
+
+    def _cache_flags(self, user_id: int, flags: int) -> None:
+        self._flags[user_id] = flags
+        self._flags.move_to_end(user_id)
+        while len(self._flags) > self.max_cached:
+            self._flags.popitem(last=False)
+
+    def _add_flags(self, user_id: int, flags: int) -> bool:
+        """Set flags on a user; returns False if they were all set already"""
+        with self._lock:
+            current = self._get_flags(user_id)
+            if current & flags == flags:
+                return False
+            self._cache_flags(user_id, current | flags)
+        self.store.update_user(user_id, flags)
+        return True
+
+    def mark_interacted(self, user_id: int) -> None:
+        self._add_flags(user_id, INTERACTED)
+
+    def first_visit(self, user_id: int) -> bool:
+        """Return True the first time a user is seen here, and remember them"""
+        return self._add_flags(user_id, INTERACTED | WELCOMED)
+
+    def _evict_expired(self, now: int) -> None:
+        while self._cooldowns:
+            user_id, expires_at = next(iter(self._cooldowns.items()))
+            if expires_at > now:
+                break
+            self._cooldowns.popitem(last=False)
+
+    def cooldown_remaining(self, user_id: int) -> int:
+        """Seconds left in a user's cooldown, 0 if they may register"""
+        now = int(time.time())
+        with self._lock:
+            self._evict_expired(now)
+            return max(self._cooldowns.get(user_id, now) - now, 0)
+
+    def start_cooldown(self, user_id: int) -> None:
+        now = int(time.time())
+        expires_at = now + self.cooldown
+        with self._lock:
+            self._evict_expired(now)
+            self._cooldowns[user_id] = expires_at
+            self._cooldowns.move_to_end(user_id)
+        self.store.update_user(user_id, cooldown_until=expires_at)
+
+    def stats(self) -> Dict[str, int]:
+        """Entry counts and the approximate memory held by the in-process structures"""
+        with self._lock:
+            self._evict_expired(int(time.time()))
+            # Small ints are shared, so count dict slots plus one int object per key and value
+            entries = len(self._flags) + len(self._cooldowns)
+            stats = {
+                'cached_users': len(self._flags),
+                'cooldowns': len(self._cooldowns),
+                'memory_bytes': (sys.getsizeof(self._flags) + sys.getsizeof(self._cooldowns)
+                                 + entries * 2 * sys.getsizeof(2 ** 40))
+            }
+        stats['known_users'] = self.store.count_users()
+        return stats
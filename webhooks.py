@@ -0,0 +1,79 @@
+import hmac
+import json
+from typing import NamedTuple, Optional, Union
+
+from tracing import TRACE_NOTE
+
+
+class WebhookEvent(NamedTuple):
+    """The fields of a Razorpay webhook delivery the gateway acts on"""
+    event: str
+    payment_key: Optional[str]  # shared by every delivery of the same payment (see parse_webhook)
+    payment_link_id: Optional[str]
+    amount: int  # rupees
+    status: Optional[str]
+    user_id: Optional[int]
+    authorized_user: Optional[int]  # the user the payment link was issued to
+    requested_tier: Optional[int]  # tournament the link was created for
+    trace_id: Optional[str]
+
+
+def verify_signature(payload: bytes, signature: str, secret: bytes) -> bool:
+    """HMAC-SHA256 of the raw request body, as Razorpay signs it"""
+    return hmac.compare_digest(hmac.digest(secret, payload, 'sha256').hex(), signature)
+
+
+def _notes(entity: dict) -> dict:
+    # Razorpay sends an empty list, not an object, when there are no notes
+    notes = entity.get('notes')
+    return notes if isinstance(notes, dict) else {}
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_webhook(payload: Union[bytes, str]) -> Optional[WebhookEvent]:
+    """Decode a delivery once into a ``WebhookEvent``; None if it is not a JSON object
+
+    ``payment_link.paid`` is read from the payment link, ``payment.captured``
+    from the payment. Entities may be wrapped in ``{"entity": ...}`` or not.
+    User and tier come from the notes the bot puts on every payment link.
+    ``payment_key`` is the payment's ID, which ``payment_link.paid`` and
+    ``payment.captured`` (and Razorpay's retries of either) have in common;
+    the payment link's ID is the fallback.
+    """
+    try:
+        data = json.loads(payload)
+    except ValueError:
+        return None
+    if not data or not isinstance(data, dict):
+        return None
+
+    event = data.get('event')
+    entities = data.get('payload') or {}
+    link = entities.get('payment_link') or {}
+    link = link.get('entity', link)
+    payment = (entities.get('payment') or {}).get('entity') or {}
+
+    if event == 'payment.captured':
+        source, status = payment, 'captured'
+    else:
+        source, status = link, link.get('status')
+    notes = _notes(source) or _notes(link) or _notes(payment)
+    trace_id = notes.get(TRACE_NOTE)
+
+    return WebhookEvent(
+        event,
+        payment.get('id') or link.get('id'),
+        source.get('id'),
+        (source.get('amount') or 0) // 100,
+        status,
+        _int(notes.get('user_id')),
+        _int(notes.get('authorized_user')),
+        _int(notes.get('tournament_type')),
+        str(trace_id) if trace_id else None
+    )
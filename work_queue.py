@@ -0,0 +1,138 @@
+import threading
+import logging
+import time
+from typing import Callable, List, Optional
+
+from store import SlotStore
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Background workers that drain the durable webhook queue
+
+    Events are claimed one at a time from the store, so the number of worker
+    threads is the concurrency bound for slot assignment and notifications.
+    Workers sleep on an event and are woken by ``notify()`` when new work is
+    queued, with a periodic poll as a fallback for events queued by another
+    process. Every ``stale_after / 2`` seconds one worker also puts events
+    that have been 'processing' for longer than ``stale_after`` back in the
+    queue, so an event whose worker was killed (e.g. a gunicorn worker
+    timed out and respawned) is retried without waiting for a restart.
+    Handlers must therefore be safe to run twice for the same event. The
+    same sweep deletes events that finished more than ``retention`` seconds
+    ago, keeping recent 'failed' ones around for inspection.
+    """
+
+    def __init__(self, store: SlotStore, handler: Callable[[bytes], None], workers: int = 4,
+                 max_attempts: int = 5, poll_interval: float = 1.0, stale_after: int = 60,
+                 retention: int = 7 * 24 * 60 * 60):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the worker threads (no-op if already running)"""
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._next_sweep = 0.0
+        self._sweep()
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"webhook-worker-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.workers} webhook workers")
+
+    def notify(self) -> None:
+        """Wake the workers after new work has been queued"""
+        self._wakeup.set()
+
+    def depth(self) -> int:
+        """Number of events waiting in the queue"""
+        return self.store.webhook_queue_depth()
+
+    def in_flight(self) -> int:
+        """Number of events currently being processed"""
+        return self._busy
+
+    def drain(self, timeout: Optional[float] = 30.0) -> bool:
+        """Finish all queued work, then stop the workers
+
+        Returns True if the queue was empty when the workers stopped.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.depth() > 0 or self._busy > 0:
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning(f"Queue drain timed out with {self.depth()} events pending")
+                break
+            self._wakeup.set()
+            time.sleep(0.05)
+
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        return self.depth() == 0
+
+    def _sweep(self) -> None:
+        """Requeue events left in 'processing' by a worker that died and purge old finished ones,
+        at most every ``stale_after / 2``"""
+        now = time.monotonic()
+        with self._sweep_lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.stale_after / 2
+        try:
+            requeued = self.store.requeue_stale_webhooks(self.stale_after, self.max_attempts)
+            if requeued:
+                logger.warning(f"Requeued {requeued} webhook events left in processing")
+        except Exception as e:
+            logger.error(f"Error requeueing stale webhook events: {e}")
+        try:
+            purged = self.store.purge_webhooks(int(time.time()) - self.retention)
+            if purged:
+                logger.info(f"Purged {purged} finished webhook events")
+        except Exception as e:
+            logger.error(f"Error purging finished webhook events: {e}")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._sweep()
+            try:
+                claimed = self.store.claim_webhook()
+            except Exception as e:
+                logger.error(f"Error claiming webhook event: {e}")
+                claimed = None
+
+            if claimed is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            event_id, payload = claimed
+            with self._busy_lock:
+                self._busy += 1
+            try:
+                self.handler(payload)
+                self.store.complete_webhook(event_id)
+            except Exception as e:
+                logger.error(f"Error processing webhook event {event_id}: {e}")
+                self.store.fail_webhook(event_id, str(e), self.max_attempts)
+                # Back off briefly so a poisoned event does not spin the worker
+                self._stopping.wait(self.poll_interval)
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1